@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_background_tasks(settings):
+    """Фоновые задачи (core.tasks) выполняются сразу, в потоке теста.
+
+    Иначе поток пула может писать в тестовую БД и MEDIA_ROOT, пока
+    pytest-django их удаляет.
+    """
+    settings.BACKGROUND_TASKS_EAGER = True
@@ -0,0 +1,100 @@
+"""Сериализация постов и комментариев прямо из строк values().
+
+Каждое поле ответа - это путь ORM, который читается одним запросом
+вместе с остальными полями, без создания экземпляров моделей. Поля,
+которых нет в таблицах (ссылки на картинку и миниатюру), вычисляются
+из уже прочитанных значений; миниатюры всей страницы ищутся одним
+обращением к хранилищу sorl (thumbnail_urls).
+"""
+from django.core.files.storage import default_storage
+
+from posts.thumbnails import ensure_thumbnails
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'group_title': 'group__title',
+    'comments_count': 'comments_count',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'thumbnail': 'image',
+}
+DEFAULT_POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author', 'group', 'comments_count',
+    'thumbnail',
+)
+
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+DEFAULT_COMMENT_FIELDS = tuple(COMMENT_FIELDS)
+
+FIELDS_PARAM = 'fields'
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(request, available, default):
+    """Поля из ?fields=a,b в порядке запроса; без параметра - default."""
+    raw = request.GET.get(FIELDS_PARAM)
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise InvalidFields(', '.join(unknown))
+    return fields
+
+
+def _image_url(name):
+    return default_storage.url(name) if name else None
+
+
+def thumbnail_urls(rows, available, fields):
+    """Ссылки на миниатюры картинок rows: имя -> url или None.
+
+    None - миниатюру еще не построили, ее генерация поставлена в очередь.
+    """
+    if 'thumbnail' not in fields:
+        return {}
+    names = {row[available['thumbnail']] for row in rows} - {None, ''}
+    return {
+        name: thumbnail.url if thumbnail is not None else None
+        for name, thumbnail in ensure_thumbnails(names, 'card').items()
+    }
+
+
+def values_paths(available, fields, required=()):
+    """Пути ORM для values(): запрошенные поля и нужные пагинатору."""
+    paths = [available[name] for name in fields]
+    return list(dict.fromkeys(paths + list(required)))
+
+
+def serialize(rows, available, fields, thumbnails=None):
+    """Словари ответа из строк values() в порядке fields.
+
+    thumbnails - результат thumbnail_urls для тех же строк.
+    """
+    computed = {
+        'image': _image_url,
+        'thumbnail': (thumbnails or {}).get,
+    }
+    return [
+        {
+            name: computed[name](row[available[name]])
+            if name in computed else row[available[name]]
+            for name in fields
+        }
+        for row in rows
+    ]
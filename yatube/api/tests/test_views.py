@@ -0,0 +1,207 @@
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import parse_http_date
+
+from posts.models import Comment, Group, Post
+from posts.tests.utils import make_image
+from posts.thumbnails import cached_thumbnail, generate_thumbnails
+
+from .. import views
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ApiViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='api-slug',
+            description='Тестовое описание',
+        )
+        for i in range(25):
+            cls.post = Post.objects.create(
+                text='Пост ' + str(i),
+                author=cls.user if i % 2 == 0 else cls.other,
+                group=cls.group if i % 2 == 0 else None,
+            )
+        for i in range(15):
+            Comment.objects.create(
+                text='Комментарий ' + str(i), post=cls.post, author=cls.user
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def collect(self, url, params=None):
+        """Все результаты ленты, проходя по ссылкам next."""
+        response = self.client.get(url, params)
+        results = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            results += data['results']
+            if data['next'] is None:
+                return results
+            response = self.client.get(data['next'])
+
+    def test_index_returns_default_fields(self):
+        data = self.client.get(reverse('api:index')).json()
+        self.assertEqual(len(data['results']), 10)
+        first = data['results'][0]
+        self.assertEqual(first['id'], ApiViewTest.post.pk)
+        self.assertEqual(first['author'], 'author')
+        self.assertEqual(first['group'], 'api-slug')
+        self.assertEqual(first['comments_count'], 15)
+        self.assertIsNone(first['thumbnail'])
+        self.assertIsNone(data['previous'])
+
+    def test_feeds_page_through_all_posts(self):
+        expected = list(Post.objects.values_list('pk', flat=True))
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts',
+                    kwargs={'slug': ApiViewTest.group.slug}),
+            reverse('api:profile',
+                    kwargs={'username': ApiViewTest.user.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                ids = [
+                    row['id'] for row in self.collect(url, {'fields': 'id'})
+                ]
+                self.assertEqual(ids, [
+                    pk for pk in expected
+                    if url == urls[0] or Post.objects.get(pk=pk).author_id
+                    == ApiViewTest.user.pk
+                ])
+
+    def test_fields_and_limit_are_kept_in_links(self):
+        data = self.client.get(
+            reverse('api:index'), {'fields': 'id,text', 'limit': 5}
+        ).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertIn('fields=id%2Ctext', data['next'])
+        self.assertIn('limit=5', data['next'])
+
+    def test_unknown_field_is_400(self):
+        response = self.client.get(
+            reverse('api:index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_missing_objects_are_404(self):
+        urls = (
+            reverse('api:group_posts', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+            reverse('api:post_detail', kwargs={'post_id': 10 ** 6}),
+            reverse('api:post_comments', kwargs={'post_id': 10 ** 6}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_post_detail_with_comments(self):
+        post = ApiViewTest.post
+        data = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': post.pk})
+        ).json()
+        self.assertEqual(data['text'], post.text)
+        comments = data['comments']['results']
+        self.assertEqual(comments[0]['text'], 'Комментарий 0')
+        rest = self.collect(data['comments']['next'])
+        self.assertEqual(
+            [comment['text'] for comment in comments + rest],
+            ['Комментарий ' + str(i) for i in range(15)],
+        )
+
+    def test_feed_is_one_query_without_model_instances(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(
+                reverse('api:index'), {'fields': 'id,author,group_title'}
+            )
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if 'posts_post' in query['sql']
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('JOIN', selects[0])
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api:index'))
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ApiThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(
+                text='Пост ' + str(i), author=cls.user,
+                image=make_image(f'photo{i}.jpg')
+            )
+            for i in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def expires_in(self, response):
+        return parse_http_date(response['Expires']) - time.time()
+
+    def test_thumbnails_are_read_in_one_batch(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('api:index'))
+        kvstore_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+
+    def test_response_with_pending_thumbnails_is_cached_briefly(self):
+        url = reverse('api:index')
+        response = self.client.get(url)
+        self.assertIsNone(response.json()['results'][0]['thumbnail'])
+        self.assertLessEqual(
+            self.expires_in(response), views.PENDING_CACHE_TIMEOUT
+        )
+
+        for post in ApiThumbnailTest.posts:
+            generate_thumbnails(post.image.name)
+        response = self.client.get(url)
+        first = response.json()['results'][0]
+        self.assertEqual(
+            first['thumbnail'],
+            cached_thumbnail(ApiThumbnailTest.posts[-1].image, 'card').url
+        )
+        self.assertGreater(
+            self.expires_in(response), views.PENDING_CACHE_TIMEOUT
+        )
@@ -0,0 +1,182 @@
+"""Версия 1 JSON API: ленты и страница поста только для чтения.
+
+Запросы те же, что у HTML-страниц (Post.objects.feed(), ключ пагинации
+(pub_date, id)), но вместо шаблонов строки values() сразу уходят в
+JSON. Ответы кэшируются по тем же областям поколений, что и страницы.
+"""
+from django.conf import settings
+from django.http import JsonResponse, QueryDict
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from posts.cache import (FEED_SCOPE, PAGE_CACHE_TIMEOUT, cache_page_versioned,
+                         group_scope, post_author_scope, post_scope,
+                         profile_scope)
+from posts.models import Comment, Group, Post, User
+from posts.paginators import AFTER_PARAM, BEFORE_PARAM, CursorPaginator
+from posts.views import COMMENT_ORDERING, FEED_ORDERING
+
+from .serializers import (COMMENT_FIELDS, DEFAULT_COMMENT_FIELDS,
+                          DEFAULT_POST_FIELDS, POST_FIELDS, InvalidFields,
+                          parse_fields, serialize, thumbnail_urls,
+                          values_paths)
+
+DEFAULT_LIMIT = 10
+# Ответ, в котором еще нет части миниатюр, кэшируется ненадолго. Обычно
+# его раньше сбросит сама генерация (posts.thumbnails.refresh_pages)
+PENDING_CACHE_TIMEOUT = getattr(settings, 'API_PENDING_CACHE_TIMEOUT', 60)
+MAX_LIMIT = 50
+LIMIT_PARAM = 'limit'
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get(LIMIT_PARAM, DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def page_link(request, param, cursor):
+    """Ссылка на соседнюю страницу с теми же fields и limit."""
+    if cursor is None:
+        return None
+    query = QueryDict(mutable=True)
+    query.update({
+        key: value for key, value in request.GET.items()
+        if key not in (AFTER_PARAM, BEFORE_PARAM)
+    })
+    query[param] = cursor
+    return request.path + '?' + query.urlencode()
+
+
+def json_response(data, thumbnails):
+    """JsonResponse; без части миниатюр - с коротким временем кэша."""
+    response = JsonResponse(data)
+    if None in thumbnails.values():
+        # cache_page берет timeout из max-age ответа
+        patch_cache_control(response, max_age=PENDING_CACHE_TIMEOUT)
+    return response
+
+
+def paginated(request, queryset, available, default, ordering,
+              descending=True):
+    """Страница строк queryset в формате {results, next, previous}
+    и миниатюры ее картинок (thumbnail_urls).
+    """
+    fields = parse_fields(request, available, default)
+    rows = queryset.values(*values_paths(available, fields, ordering))
+    page = CursorPaginator(
+        rows, get_limit(request), ordering, descending
+    ).get_page(request)
+    thumbnails = thumbnail_urls(page, available, fields)
+    return {
+        'results': serialize(page, available, fields, thumbnails),
+        'next': page_link(request, AFTER_PARAM, page.next_cursor),
+        'previous': page_link(request, BEFORE_PARAM, page.previous_cursor),
+    }, thumbnails
+
+
+def feed_response(request, posts):
+    try:
+        data, thumbnails = paginated(
+            request, posts, POST_FIELDS, DEFAULT_POST_FIELDS, FEED_ORDERING
+        )
+    except InvalidFields as exc:
+        return error(400, f'Неизвестные поля: {exc}')
+    return json_response(data, thumbnails)
+
+
+@require_safe
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, FEED_SCOPE, per_user=False
+)
+def index(request):
+    return feed_response(request, Post.objects.feed())
+
+
+@require_safe
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, group_scope('{slug}'), per_user=False
+)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error(404, 'Группа не найдена.')
+    return feed_response(request, group.posts.feed())
+
+
+@require_safe
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, profile_scope('{username}'), per_user=False
+)
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error(404, 'Пользователь не найден.')
+    return feed_response(request, author.posts.feed())
+
+
+@require_safe
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, post_scope('{post_id}'), post_author_scope,
+    per_user=False
+)
+def post_detail(request, post_id):
+    """Пост и первая страница его комментариев.
+
+    ?fields= выбирает поля поста, поля комментариев фиксированы.
+    """
+    try:
+        fields = parse_fields(request, POST_FIELDS, DEFAULT_POST_FIELDS)
+    except InvalidFields as exc:
+        return error(400, f'Неизвестные поля: {exc}')
+    rows = list(Post.objects.detail().filter(pk=post_id).values(
+        *values_paths(POST_FIELDS, fields)
+    ))
+    thumbnails = thumbnail_urls(rows, POST_FIELDS, fields)
+    posts = serialize(rows, POST_FIELDS, fields, thumbnails)
+    if not posts:
+        return error(404, 'Пост не найден.')
+    comments = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).values(
+            *values_paths(COMMENT_FIELDS, DEFAULT_COMMENT_FIELDS)
+        ),
+        DEFAULT_LIMIT, COMMENT_ORDERING, descending=False,
+    ).page()
+    next_comments = None
+    if comments.next_cursor is not None:
+        next_comments = reverse(
+            'api:post_comments', kwargs={'post_id': post_id}
+        ) + '?' + AFTER_PARAM + '=' + comments.next_cursor
+    data = posts[0]
+    data['comments'] = {
+        'results': serialize(comments, COMMENT_FIELDS,
+                             DEFAULT_COMMENT_FIELDS),
+        'next': next_comments,
+    }
+    return json_response(data, thumbnails)
+
+
+@require_safe
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, post_scope('{post_id}'), post_author_scope,
+    per_user=False
+)
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Пост не найден.')
+    try:
+        data, _ = paginated(
+            request, Comment.objects.filter(post_id=post_id),
+            COMMENT_FIELDS, DEFAULT_COMMENT_FIELDS, COMMENT_ORDERING,
+            descending=False,
+        )
+    except InvalidFields as exc:
+        return error(400, f'Неизвестные поля: {exc}')
+    return JsonResponse(data)
@@ -0,0 +1,223 @@
+"""Синтетический набор данных для нагрузочных замеров.
+
+Все случайные величины берутся из random.Random(seed), поэтому один и
+тот же seed дает один и тот же набор. Подписки, авторство постов и
+комментарии распределены по степенному закону: немного популярных
+авторов и вирусных постов, длинный хвост остальных. Строки пишутся
+bulk_create пачками, производные таблицы (ленты подписок, счетчики,
+поисковый индекс) пересобираются командами приложения posts.
+"""
+import io
+import itertools
+import random
+from array import array
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post
+from posts.transfer import explicit_dates
+
+User = get_user_model()
+
+WORDS = (
+    'город', 'вечер', 'книга', 'дорога', 'река', 'музыка', 'кофе', 'поезд',
+    'лето', 'зима', 'друг', 'работа', 'море', 'горы', 'фильм', 'ужин',
+    'рецепт', 'пирог', 'кот', 'собака', 'сад', 'дождь', 'солнце', 'ветер',
+    'утро', 'письмо', 'песня', 'дом', 'окно', 'парк', 'велосипед', 'код',
+)
+
+IMAGE_SIZE = (1280, 720)
+
+
+def power_law_weights(count, alpha):
+    """Накопленные веса 1 / rank^alpha для random.choices(cum_weights=)."""
+    return list(itertools.accumulate(
+        1 / (rank + 1) ** alpha for rank in range(count)
+    ))
+
+
+class Dataset:
+    def __init__(self, users=1000, groups=20, posts=100000,
+                 comments=300000, follows=30, images=20, image_ratio=0.2,
+                 days=365, alpha=1.1, seed=42, batch_size=5000,
+                 stdout=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.images = images
+        self.image_ratio = image_ratio
+        self.days = days
+        self.alpha = alpha
+        self.seed = seed
+        self.batch_size = batch_size
+        self.stdout = stdout or io.StringIO()
+        self.random = random.Random(seed)
+        self.prefix = f'bench{seed}_'
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def exists(self):
+        return User.objects.filter(username__startswith=self.prefix).exists()
+
+    def text(self, low, high):
+        return ' '.join(self.random.choices(
+            WORDS, k=self.random.randint(low, high)
+        )).capitalize()
+
+    def batches(self, objects):
+        iterator = iter(objects)
+        while True:
+            batch = list(itertools.islice(iterator, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def create_users(self):
+        first_id = (User.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0) + 1
+        for batch in self.batches(
+            User(username=f'{self.prefix}{i}', password='!',
+                 first_name='Автор', last_name=str(i))
+            for i in range(self.users)
+        ):
+            User.objects.bulk_create(batch)
+        # Пользователи упорядочены по популярности: первые - звезды
+        self.user_ids = list(User.objects.filter(
+            username__startswith=self.prefix, pk__gte=first_id
+        ).order_by('pk').values_list('pk', flat=True))
+        self.user_weights = power_law_weights(len(self.user_ids), self.alpha)
+        self.log(f'Пользователей: {len(self.user_ids)}')
+
+    def create_groups(self):
+        Group.objects.bulk_create([
+            Group(title=f'Группа {i}', slug=f'{self.prefix}group-{i}',
+                  description=self.text(5, 20))
+            for i in range(self.groups)
+        ])
+        self.group_ids = list(Group.objects.filter(
+            slug__startswith=self.prefix
+        ).order_by('pk').values_list('pk', flat=True))
+        self.log(f'Групп: {len(self.group_ids)}')
+
+    def create_follows(self):
+        """Число подписок пользователя и выбор авторов - степенные."""
+        rows, count = [], 0
+        for user_id in self.user_ids:
+            wanted = min(
+                int(self.random.paretovariate(1.5) * self.follows / 3),
+                len(self.user_ids) - 1,
+            )
+            authors = set(self.random.choices(
+                self.user_ids, cum_weights=self.user_weights, k=wanted
+            ))
+            authors.discard(user_id)
+            rows += [Follow(user_id=user_id, author_id=author_id)
+                     for author_id in authors]
+            if len(rows) >= self.batch_size:
+                Follow.objects.bulk_create(rows)
+                count += len(rows)
+                rows = []
+        Follow.objects.bulk_create(rows)
+        self.log(f'Подписок: {count + len(rows)}')
+
+    def create_images(self):
+        self.image_names = []
+        for i in range(self.images):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            output = io.BytesIO()
+            Image.new('RGB', IMAGE_SIZE, color).save(output, 'JPEG')
+            self.image_names.append(default_storage.save(
+                f'posts/bench/{self.prefix}{i}.jpg',
+                ContentFile(output.getvalue()),
+            ))
+        self.log(f'Картинок: {len(self.image_names)}')
+
+    def post_rows(self, start):
+        # Даты постов возрастают вместе с id, как при обычной работе
+        step = self.days * 86400 / max(self.posts, 1)
+        for i in range(self.posts):
+            image = ''
+            if self.image_names and self.random.random() < self.image_ratio:
+                image = self.random.choice(self.image_names)
+            yield Post(
+                text=self.text(10, 80),
+                author_id=self.random.choices(
+                    self.user_ids, cum_weights=self.user_weights
+                )[0],
+                group_id=(self.random.choice(self.group_ids)
+                          if self.group_ids and self.random.random() < 0.6
+                          else None),
+                pub_date=start + timedelta(seconds=i * step),
+                image=image,
+                image_width=IMAGE_SIZE[0] if image else None,
+                image_height=IMAGE_SIZE[1] if image else None,
+            )
+
+    def create_posts(self):
+        start = timezone.now() - timedelta(days=self.days)
+        first_id = (Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0) + 1
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            for batch in self.batches(self.post_rows(start)):
+                Post.objects.bulk_create(batch)
+        self.post_ids, self.post_dates = array('q'), array('d')
+        for pk, pub_date in Post.objects.filter(pk__gte=first_id).order_by(
+            'pk'
+        ).values_list('pk', 'pub_date').iterator():
+            self.post_ids.append(pk)
+            self.post_dates.append(pub_date.timestamp())
+        self.log(f'Постов: {len(self.post_ids)}')
+
+    def comment_rows(self):
+        # Вирусными делаем случайные посты, а не самые старые
+        order = list(range(len(self.post_ids)))
+        self.random.shuffle(order)
+        weights = power_law_weights(len(order), self.alpha)
+        now = timezone.now().timestamp()
+        for _ in range(self.comments):
+            index = self.random.choices(order, cum_weights=weights)[0]
+            posted = self.post_dates[index]
+            yield Comment(
+                text=self.text(3, 30),
+                post_id=self.post_ids[index],
+                author_id=self.random.choice(self.user_ids),
+                created=datetime.fromtimestamp(
+                    self.random.uniform(posted, now), timezone.utc
+                ),
+            )
+
+    def create_comments(self):
+        if not self.post_ids:
+            return
+        with explicit_dates(Comment._meta.get_field('created')):
+            for batch in self.batches(self.comment_rows()):
+                Comment.objects.bulk_create(batch)
+        self.log(f'Комментариев: {self.comments}')
+
+    def rebuild(self):
+        """Производные таблицы: bulk_create не вызывает сигналы."""
+        for command in ('rebuild_feeds', 'recount_stats',
+                        'rebuild_search_index'):
+            call_command(command, stdout=self.stdout)
+        cache.clear()
+
+    def load(self):
+        self.create_images()
+        with transaction.atomic():
+            self.create_users()
+            self.create_groups()
+            self.create_follows()
+            self.create_posts()
+            self.create_comments()
+        self.rebuild()
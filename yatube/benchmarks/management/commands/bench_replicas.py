@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.replicas import run
+
+
+class Command(BaseCommand):
+    help = ('Доля чтений с актуальных реплик, с отставших и с основной БД '
+            'при учете всех записей и только записей, видных на страницах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration', type=float, default=300,
+            help='Длительность потока запросов, виртуальные секунды.'
+        )
+        parser.add_argument(
+            '--rate', type=int, default=20, help='Запросов в секунду.'
+        )
+        parser.add_argument(
+            '--login-share', type=float, default=0.05,
+            help='Доля входов среди запросов.'
+        )
+        parser.add_argument(
+            '--write-share', type=float, default=0.005,
+            help='Доля записей, видных на страницах.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='REPLICA_SYNC_INTERVAL, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        result = run(
+            duration=options['duration'], rate=options['rate'],
+            login_share=options['login_share'],
+            write_share=options['write_share'],
+            interval=options['interval'],
+        )
+        self.stdout.write(
+            f'{"accounting":<13}{"reads":>7}{"current %":>11}'
+            f'{"lagging %":>11}{"primary %":>11}{"syncs":>7}'
+        )
+        for mode, row in result.items():
+            self.stdout.write(
+                f'{mode:<13}{row["reads"]:>7}{row["current"]:>11.1f}'
+                f'{row["lagging"]:>11.1f}{row["primary"]:>11.1f}'
+                f'{row["syncs"]:>7}'
+            )
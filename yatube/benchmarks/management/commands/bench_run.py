@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import SCENARIOS, compare, run
+
+
+class Command(BaseCommand):
+    help = ('Замеряет страницы чтения: перцентили задержки, SQL-запросы и '
+            'байты на ответ; сохраняет и сравнивает базовые прогоны.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help='Какие страницы замерять: %s (по умолчанию все).'
+                 % ', '.join(SCENARIOS)
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output', help='Сохранить результат в JSON-файл.'
+        )
+        parser.add_argument(
+            '--baseline', help='Сравнить с результатом из JSON-файла.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95, запросов и байтов (доля).'
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['scenarios']) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные сценарии: ' + ', '.join(sorted(unknown))
+            )
+        result = run(
+            scenarios=options['scenarios'] or SCENARIOS,
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+            seed=options['seed'],
+        )
+        if result['meta']['debug']:
+            self.stderr.write('DEBUG=True: замеры завышены.')
+        self.stdout.write(
+            f'{"scenario":<14}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+            f'{"rps":>8}{"queries":>9}{"bytes":>9}{"errors":>7}'
+        )
+        for scenario, row in result['scenarios'].items():
+            self.stdout.write(
+                f'{scenario:<14}{row["p50_ms"]:>9.2f}{row["p95_ms"]:>9.2f}'
+                f'{row["p99_ms"]:>9.2f}{row["rps"]:>8.1f}'
+                f'{row["queries_per_request"]:>9.2f}'
+                f'{row["bytes_per_response"]:>9}{row["errors"]:>7}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                rows, regressions = compare(
+                    json.load(baseline), result, options['tolerance']
+                )
+            for scenario, metric, before, after, change in rows:
+                self.stdout.write(
+                    f'{scenario:<14}{metric:<22}{before:>10} -> '
+                    f'{after:<10}{change:+.1%}'
+                )
+            if regressions:
+                raise CommandError(
+                    'Регрессии относительно базового прогона:\n'
+                    + '\n'.join(regressions)
+                )
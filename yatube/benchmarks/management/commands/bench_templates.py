@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.templates import run
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время отрисовки шаблонов лент на страницу постов '
+            '(без запросов к БД за самой страницей).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        result = run(per_page=options['per_page'], repeat=options['repeat'])
+        self.stdout.write(
+            f'{"feed":<14}{"median ms":>11}{"min ms":>9}{"queries":>9}'
+        )
+        for feed, row in result.items():
+            self.stdout.write(
+                f'{feed:<14}{row["median_ms"]:>11.3f}{row["min_ms"]:>9.3f}'
+                f'{row["queries_per_render"]:>9.2f}'
+            )
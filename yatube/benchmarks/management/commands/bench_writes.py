@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.writes import run
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает конкурентную запись в SQLite через стандартный '
+            'бэкенд Django и core.db.backends.sqlite3.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+            help='Числа пишущих потоков.'
+        )
+        parser.add_argument(
+            '--transactions', type=int, default=200,
+            help='Транзакций на поток.'
+        )
+
+    def handle(self, *args, **options):
+        result = run(options['workers'], options['transactions'])
+        self.stdout.write(
+            f'{"backend":<10}{"workers":>8}{"tps":>10}{"errors":>8}'
+            f'{"p95 ms":>10}'
+        )
+        for backend, rows in result.items():
+            for row in rows:
+                self.stdout.write(
+                    f'{backend:<10}{row["workers"]:>8}{row["tps"]:>10.1f}'
+                    f'{row["errors"]:>8}{row["p95_ms"]:>10.2f}'
+                )
@@ -0,0 +1,153 @@
+"""Бенчмарк чтения с реплик между обновлениями.
+
+Поток запросов на виртуальных часах: чтения страниц, входы (сессия и
+last_login) и записи, которые видны на страницах (комментарии, посты).
+Записи настоящие - в основную БД через обертку core.db.replicas, таймер
+обновления заменен виртуальным: реплика обновляется через
+REPLICA_SYNC_INTERVAL виртуальных секунд после первой учтенной записи.
+
+Итог по двум способам учета записей:
+
+* all_writes - счетчик сдвигает любая запись, как до исключений;
+* page_writes - сессии, хранилище sorl и last_login не учитываются.
+
+Для каждого - доля чтений с актуальной реплики, с отставшей и с
+основной БД. Раньше отставшая реплика не читалась: ее чтения шли на
+основную БД, так что current в all_writes - доля реплик прежней схемы.
+Чтения браузеров с cookie ReplicaStickinessMiddleware одинаковы в обеих
+схемах и не моделируются.
+"""
+import os
+import random
+import re
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from core.db import replicas
+
+User = get_user_model()
+
+ALIAS = 'bench_replica'
+SCHEMA = (
+    'CREATE TABLE bench_replica_write ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+    ' payload TEXT NOT NULL)'
+)
+NEVER = re.compile(r'(?!)')
+
+MODES = {
+    'all_writes': {'REPLICA_IGNORED_TABLES': (), 'LAST_LOGIN_RE': NEVER},
+    'page_writes': {
+        'REPLICA_IGNORED_TABLES': replicas.REPLICA_IGNORED_TABLES,
+        'LAST_LOGIN_RE': replicas.LAST_LOGIN_RE,
+    },
+}
+
+
+def _login():
+    session = SessionStore()
+    session['bench'] = True
+    session.save()
+    User.objects.filter(pk=-1).update(last_login=timezone.now())
+    session.delete()
+
+
+def _page_write(number):
+    with transaction.atomic():
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO bench_replica_write (payload) VALUES (%s)',
+                [f'запись {number}'],
+            )
+
+
+def _read():
+    state, token = replicas.start_request()
+    try:
+        replicas.allow_replica_reads()
+        if replicas.replica_for_read() is None:
+            return 'primary'
+        return 'lagging' if state.replicas_lag else 'current'
+    finally:
+        replicas.end_request(token)
+
+
+def simulate(duration, rate, login_share, write_share, seed):
+    """Один прогон: {'reads', 'current', 'lagging', 'primary', 'syncs'}."""
+    interval = replicas.REPLICA_SYNC_INTERVAL
+    sync_at = None
+    now = 0.0
+
+    def schedule_sync():
+        nonlocal sync_at
+        if sync_at is None:
+            sync_at = now + interval
+
+    counts = {'current': 0, 'lagging': 0, 'primary': 0}
+    syncs = 0
+    generator = random.Random(seed)
+    with mock.patch.object(replicas, 'schedule_sync', schedule_sync):
+        replicas.sync_replicas()
+        for number in range(int(duration * rate)):
+            now = number / rate
+            if sync_at is not None and now >= sync_at:
+                sync_at = None
+                replicas.sync_replicas()
+                syncs += 1
+            kind = generator.random()
+            if kind < login_share:
+                _login()
+            elif kind < login_share + write_share:
+                _page_write(number)
+            else:
+                counts[_read()] += 1
+    reads = sum(counts.values())
+    result = {
+        name: round(100 * count / reads, 1) if reads else 0.0
+        for name, count in counts.items()
+    }
+    result.update(reads=reads, syncs=syncs)
+    return result
+
+
+def run(duration=300, rate=20, login_share=0.05, write_share=0.005,
+        interval=5, seed=1, modes=MODES):
+    """{способ учета: результат simulate}."""
+    directory = tempfile.mkdtemp()
+    connections.databases[ALIAS] = dict(
+        connections.databases[DEFAULT_DB_ALIAS],
+        NAME=os.path.join(directory, 'replica.sqlite3'),
+    )
+    default = connections[DEFAULT_DB_ALIAS]
+    with default.cursor() as cursor:
+        cursor.execute(SCHEMA)
+    results = {}
+    try:
+        with mock.patch.object(replicas, 'DATABASE_REPLICAS', [ALIAS]), \
+                mock.patch.object(
+                    replicas, 'REPLICA_SYNC_INTERVAL', interval):
+            replicas.watch_writes(connection=default)
+            try:
+                for name, overrides in modes.items():
+                    with mock.patch.multiple(replicas, **overrides):
+                        results[name] = simulate(
+                            duration, rate, login_share, write_share, seed
+                        )
+            finally:
+                default.execute_wrappers.remove(replicas._watch_writes)
+    finally:
+        with default.cursor() as cursor:
+            cursor.execute('DROP TABLE bench_replica_write')
+        cache.delete(replicas._synced_key(ALIAS))
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
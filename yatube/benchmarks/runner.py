@@ -0,0 +1,233 @@
+"""Прогон страниц чтения через WSGI-обработчик в том же процессе.
+
+Каждый поток - отдельный клиент django.test.Client со своим
+соединением с БД. Для каждого запроса записываются время ответа,
+число SQL-запросов и размер тела. Итог по сценарию - перцентили
+задержки, запросы и байты на ответ; его можно сохранить в JSON и
+сравнить со следующим прогоном.
+"""
+import platform
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import AuthorStats, Group, Post
+
+SCENARIOS = ('index', 'group_posts', 'profile', 'post_detail',
+             'profile_index')
+
+# Адрес не из INTERNAL_IPS: иначе debug_toolbar встроится в ответы
+CLIENT_ADDR = '192.0.2.1'
+
+# Метрики, рост которых относительно базового прогона - регрессия
+CHECKED_METRICS = ('p95_ms', 'queries_per_request', 'bytes_per_response')
+
+
+def percentile(values, fraction):
+    """Перцентиль с линейной интерполяцией по отсортированным values."""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class Targets:
+    """Случайные, но воспроизводимые адреса страниц для сценариев.
+
+    Профили и страницы постов выбираются среди популярных авторов
+    чаще, как в реальном трафике; часть запросов идет на глубокие
+    страницы лент.
+    """
+
+    def __init__(self, seed=42, sample=200, max_page=5):
+        self.random = random.Random(seed)
+        self.max_page = max_page
+        self.groups = list(Group.objects.order_by('pk').values_list(
+            'slug', flat=True)[:sample])
+        self.authors = list(AuthorStats.objects.filter(
+            posts_count__gt=0
+        ).order_by('-followers_count').values_list(
+            'user__username', flat=True)[:sample])
+        last = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        candidates = [self.random.randint(1, last) for _ in range(sample)]
+        self.posts = sorted(Post.objects.filter(
+            pk__in=candidates).values_list('pk', flat=True))
+        self.readers = list(AuthorStats.objects.filter(
+            following_count__gt=0
+        ).order_by('-following_count').values_list(
+            'user_id', flat=True)[:sample])
+
+    def page(self, url):
+        number = self.random.randint(1, self.max_page)
+        return url if number == 1 else f'{url}?page={number}'
+
+    def skewed(self, items):
+        # Первые элементы (самые популярные) выбираются чаще
+        return items[int(len(items) * self.random.random() ** 2)]
+
+    def available(self, scenario):
+        return bool({
+            'index': True,
+            'group_posts': self.groups,
+            'profile': self.authors,
+            'post_detail': self.posts,
+            'profile_index': self.readers,
+        }[scenario])
+
+    def url(self, scenario):
+        if scenario == 'index':
+            return self.page(reverse('posts:index'))
+        if scenario == 'group_posts':
+            return self.page(reverse(
+                'posts:group_list', args=[self.random.choice(self.groups)]
+            ))
+        if scenario == 'profile':
+            return self.page(reverse(
+                'posts:profile', args=[self.skewed(self.authors)]
+            ))
+        if scenario == 'post_detail':
+            return reverse(
+                'posts:posts', args=[self.random.choice(self.posts)]
+            )
+        return self.page(reverse('posts:follow_index'))
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _body_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def _worker(urls, reader_id):
+    """Выполняет запросы urls одним клиентом, возвращает замеры."""
+    client = Client(REMOTE_ADDR=CLIENT_ADDR)
+    if reader_id is not None:
+        client.force_login(get_user_model().objects.get(pk=reader_id))
+    samples = []
+    try:
+        for url in urls:
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = client.get(url)
+                size = _body_size(response)
+                elapsed = time.perf_counter() - started
+            samples.append(
+                (elapsed, counter.count, size, response.status_code)
+            )
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+    return samples
+
+
+def run_scenario(targets, scenario, requests, concurrency, warmup):
+    """Прогоняет сценарий и возвращает сводку по нему."""
+    urls = [targets.url(scenario) for _ in range(warmup + requests)]
+    readers = [None] * concurrency
+    if scenario == 'profile_index':
+        readers = [targets.readers[i % len(targets.readers)]
+                   for i in range(concurrency)]
+    _worker(urls[:warmup], readers[0])
+    urls = urls[warmup:]
+    shares = [urls[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    if concurrency == 1:
+        samples = _worker(shares[0], readers[0])
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            samples = [
+                sample
+                for part in executor.map(_worker, shares, readers)
+                for sample in part
+            ]
+    wall = time.perf_counter() - started
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    count = len(samples) or 1
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[3] != 200),
+        'rps': round(len(samples) / wall, 1) if wall else 0.0,
+        'mean_ms': round(sum(latencies) / count, 3),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'queries_per_request': round(
+            sum(sample[1] for sample in samples) / count, 2
+        ),
+        'bytes_per_response': round(
+            sum(sample[2] for sample in samples) / count
+        ),
+    }
+
+
+def run(scenarios=SCENARIOS, requests=200, concurrency=4, warmup=20,
+        seed=42):
+    targets = Targets(seed=seed)
+    results = {}
+    for scenario in scenarios:
+        if targets.available(scenario):
+            results[scenario] = run_scenario(
+                targets, scenario, requests, concurrency, warmup
+            )
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'debug': settings.DEBUG,
+            'requests': requests,
+            'concurrency': concurrency,
+            'warmup': warmup,
+            'seed': seed,
+            'max_post_id': Post.objects.order_by('-pk').values_list(
+                'pk', flat=True).first() or 0,
+        },
+        'scenarios': results,
+    }
+
+
+def compare(baseline, current, tolerance):
+    """Строки сравнения и список регрессий относительно baseline.
+
+    Регрессия - рост метрики из CHECKED_METRICS больше чем на tolerance
+    (доля) или появление ошибок.
+    """
+    rows, regressions = [], []
+    for scenario, result in current['scenarios'].items():
+        old = baseline['scenarios'].get(scenario)
+        if old is None:
+            continue
+        for metric in CHECKED_METRICS:
+            before, after = old[metric], result[metric]
+            change = (after - before) / before if before else 0.0
+            rows.append((scenario, metric, before, after, change))
+            if change > tolerance:
+                regressions.append(
+                    f'{scenario}.{metric}: {before} -> {after}'
+                )
+        if result['errors'] > old['errors']:
+            regressions.append(
+                f'{scenario}.errors: {old["errors"]} -> {result["errors"]}'
+            )
+    return rows, regressions
@@ -0,0 +1,65 @@
+"""Микробенчмарк отрисовки лент: время шаблона на одну страницу.
+
+Страница и посты читаются из БД заранее, поэтому замер включает только
+отрисовку шаблона: карточки постов, ссылки, миниатюры (из кэша sorl) и
+навигацию по страницам. Первая отрисовка не учитывается - она
+заполняет кэши шаблонов и миниатюр.
+"""
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import resolve
+
+from posts.models import Group, Post
+
+from .runner import CLIENT_ADDR, QueryCounter
+
+
+def _feed_pages(per_page):
+    """Шаблон, адрес и страница для каждой ленты с постами."""
+    pages = {
+        'index': ('posts/index.html', '/', Post.objects.feed(), {}),
+    }
+    group = Group.objects.filter(posts__isnull=False).first()
+    if group is not None:
+        pages['group_list'] = (
+            'posts/group_list.html', f'/group/{group.slug}/',
+            group.posts.feed(), {'group': group},
+        )
+    for name, (template, url, posts, extra) in pages.items():
+        page = Paginator(posts, per_page).page(1)
+        page.object_list = list(page.object_list)
+        yield name, template, url, dict(extra, page_obj=page)
+
+
+def measure(name, url, context, repeat):
+    """Медиана и минимум времени отрисовки name, мс; SQL-запросы."""
+    request = RequestFactory().get(url, REMOTE_ADDR=CLIENT_ADDR)
+    request.user = AnonymousUser()
+    request.resolver_match = resolve(url)
+    template = get_template(name)
+    template.render(context, request)
+    timings = []
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            template.render(context, request)
+            timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'queries_per_render': round(counter.count / repeat, 2),
+    }
+
+
+def run(per_page=10, repeat=200):
+    return {
+        feed: measure(template, url, context, repeat)
+        for feed, template, url, context in _feed_pages(per_page)
+    }
@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts.models import AuthorStats, Comment, FeedEntry, Follow, Post
+
+from ..runner import SCENARIOS, compare, percentile
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'bench_seed', users=30, groups=3, posts=200, comments=400,
+            follows=5, images=2, stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_builds_dataset_and_derived_tables(self):
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 400)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            200
+        )
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        # Даты постов растут вместе с id
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+
+    def test_seed_refuses_to_load_twice(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_seed', users=1, posts=0, comments=0,
+                         images=0, stdout=StringIO())
+
+    def test_run_saves_and_compares_baseline(self):
+        path = os.path.join(TEMP_MEDIA_ROOT, 'baseline.json')
+        options = {'requests': 10, 'concurrency': 1, 'warmup': 2,
+                   'stdout': StringIO(), 'stderr': StringIO()}
+        call_command('bench_run', output=path, **options)
+        with open(path) as baseline:
+            result = json.load(baseline)
+        self.assertEqual(set(result['scenarios']), set(SCENARIOS))
+        for scenario, row in result['scenarios'].items():
+            with self.subTest(scenario=scenario):
+                self.assertEqual(row['requests'], 10)
+                self.assertEqual(row['errors'], 0)
+                self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+                self.assertLessEqual(row['p95_ms'], row['p99_ms'])
+                self.assertGreater(row['bytes_per_response'], 0)
+        call_command('bench_run', baseline=path, tolerance=100, **options)
+
+    def test_templates_benchmark(self):
+        out = StringIO()
+        call_command('bench_templates', per_page=10, repeat=3, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines[1:]],
+                         ['index', 'group_list'])
+
+    def test_writes_benchmark(self):
+        out = StringIO()
+        call_command('bench_writes', workers=[1, 2], transactions=5,
+                     stdout=out)
+        rows = [line.split() for line in out.getvalue().splitlines()[1:]]
+        self.assertEqual(
+            [row[:2] for row in rows],
+            [['django', '1'], ['django', '2'], ['core', '1'], ['core', '2']]
+        )
+        self.assertEqual([row[3] for row in rows[2:]], ['0', '0'])
+
+    def test_percentile(self):
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(percentile(values, 0.5), 3)
+        self.assertEqual(percentile(values, 0.99), 4.96)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_compare_reports_regressions(self):
+        row = {'p95_ms': 10, 'queries_per_request': 3,
+               'bytes_per_response': 1000, 'errors': 0}
+        baseline = {'scenarios': {'index': row}}
+        current = {'scenarios': {'index': dict(row, queries_per_request=5)}}
+        rows, regressions = compare(baseline, current, 0.2)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(regressions, ['index.queries_per_request: 3 -> 5'])
+
+
+class ReplicaBenchmarkTest(TransactionTestCase):
+    def test_replicas_benchmark(self):
+        out = StringIO()
+        call_command('bench_replicas', duration=20, rate=20, stdout=out)
+        rows = {
+            line.split()[0]: [float(value) for value in line.split()[1:]]
+            for line in out.getvalue().splitlines()[1:]
+        }
+        self.assertEqual(list(rows), ['all_writes', 'page_writes'])
+        reads, current, lagging, primary, syncs = rows['page_writes']
+        self.assertEqual(primary, 0)
+        self.assertEqual(current + lagging, 100)
+        # Входы не сдвигают счетчик: обновлений не больше, чем при учете
+        # всех записей, и актуальные реплики читаются не реже
+        self.assertLessEqual(syncs, rows['all_writes'][4])
+        self.assertGreaterEqual(current, rows['all_writes'][1])
@@ -0,0 +1,101 @@
+"""Бенчмарк конкурентной записи в SQLite.
+
+Сравнивает стандартный бэкенд Django с core.db.backends.sqlite3 на
+отдельных временных файлах БД. Потоки выполняют транзакции "прочитать,
+потом записать" - как post_create, add_comment и profile_follow
+(проверка, затем INSERT). Итог по числу потоков: транзакций в секунду,
+ошибки "database is locked" и p95 длительности транзакции.
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DatabaseError, connections, transaction
+
+from .runner import percentile
+
+ENGINES = {
+    'django': 'django.db.backends.sqlite3',
+    'core': 'core.db.backends.sqlite3',
+}
+
+SCHEMA = (
+    'CREATE TABLE bench_write ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+    ' worker INTEGER NOT NULL,'
+    ' payload TEXT NOT NULL)'
+)
+
+
+def _worker(alias, worker, transactions):
+    timings, errors = [], 0
+    connection = connections[alias]
+    try:
+        for number in range(transactions):
+            started = time.perf_counter()
+            try:
+                with transaction.atomic(using=alias):
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            'SELECT COUNT(*) FROM bench_write '
+                            'WHERE worker = %s', [worker]
+                        )
+                        cursor.execute(
+                            'INSERT INTO bench_write (worker, payload) '
+                            'VALUES (%s, %s)', [worker, f'запись {number}']
+                        )
+            except DatabaseError:
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connection.close()
+    return timings, errors
+
+
+def measure(alias, workers, transactions):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda worker: _worker(alias, worker, transactions),
+            range(workers),
+        ))
+    elapsed = time.perf_counter() - started
+    timings = sorted(
+        timing for worker_timings, _ in results for timing in worker_timings
+    )
+    return {
+        'workers': workers,
+        'committed': len(timings),
+        'errors': sum(errors for _, errors in results),
+        'tps': round(len(timings) / elapsed, 1),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+    }
+
+
+def run(workers=(1, 2, 4, 8), transactions=200, engines=ENGINES):
+    """{бэкенд: [результат для каждого числа потоков]}."""
+    directory = tempfile.mkdtemp()
+    results = {}
+    try:
+        for name, engine in engines.items():
+            alias = f'bench_writes_{name}'
+            connections.databases[alias] = {
+                'ENGINE': engine,
+                'NAME': os.path.join(directory, f'{name}.sqlite3'),
+            }
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(SCHEMA)
+                results[name] = [
+                    measure(alias, count, transactions) for count in workers
+                ]
+            finally:
+                connections[alias].close()
+                del connections[alias]
+                del connections.databases[alias]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
@@ -1,5 +1,33 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def clear_shared_caches(**kwargs):
+    """Очищает общие кэши после migrate и flush.
+
+    Файл кэша переживает перезапуск процессов, а содержимое его
+    выведено из БД: после пересоздания или очистки БД (в том числе
+    тестовой) старые страницы и счетчики недействительны.
+    """
+    from django.core.cache import caches
+
+    from .cache_backends import SQLiteCache
+
+    for cache in caches.all():
+        if isinstance(cache, SQLiteCache):
+            cache.clear()
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db.replicas import watch_writes
+
+        connection_created.connect(
+            watch_writes, dispatch_uid='core.watch_writes'
+        )
+        post_migrate.connect(
+            clear_shared_caches, dispatch_uid='core.clear_shared_caches'
+        )
@@ -0,0 +1,330 @@
+"""Общий для всех процессов кэш в файле SQLite.
+
+Каждый WSGI-воркер открывает один и тот же файл в режиме WAL, поэтому
+страницы, счетчики поколений и инвалидация видны всем процессам узла без
+Redis и memcached. Размер ограничен OPTIONS['MAX_SIZE'] байт, лишнее
+вытесняется по давности последнего чтения (LRU).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ')',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_meta ('
+    ' name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+    "INSERT OR IGNORE INTO cache_meta VALUES ('size', 0)",
+    'CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache'
+    " BEGIN UPDATE cache_meta SET value = value + new.size"
+    " WHERE name = 'size'; END",
+    'CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache'
+    " BEGIN UPDATE cache_meta SET value = value - old.size"
+    " WHERE name = 'size'; END",
+    'CREATE TRIGGER IF NOT EXISTS cache_size_update'
+    ' AFTER UPDATE OF size ON cache'
+    " BEGIN UPDATE cache_meta SET value = value - old.size + new.size"
+    " WHERE name = 'size'; END",
+)
+
+# Ограничение SQLite на число параметров в одном запросе
+MAX_VARIABLES = 900
+
+
+def _encode(value):
+    # Целые числа хранятся как INTEGER, чтобы incr был одним UPDATE
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value, 8
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return sqlite3.Binary(data), len(data)
+
+
+def _decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш Django поверх файла SQLite, общий для процессов узла.
+
+    OPTIONS:
+        MAX_SIZE - предельный суммарный размер значений в байтах;
+        TOUCH_INTERVAL - как часто (в секундах) обновлять время
+            последнего чтения ключа для LRU;
+        BUSY_TIMEOUT - сколько миллисекунд ждать блокировку записи.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._touch_interval = float(options.get('TOUCH_INTERVAL', 60))
+        self._busy_timeout = int(options.get('BUSY_TIMEOUT', 5000))
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # Соединение на поток и на процесс: после fork открываем заново
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout / 1000,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute(f'PRAGMA busy_timeout = {self._busy_timeout}')
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _write(self, callback):
+        """Выполняет callback(connection) в транзакции BEGIN IMMEDIATE."""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = callback(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _store(self, connection, key, value, timeout, only_missing):
+        expires = self._expires(timeout)
+        now = time.time()
+        if expires is not None and expires <= now:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return False
+        data, size = _encode(value)
+        # UPSERT, а не INSERT OR REPLACE: при REPLACE не срабатывает
+        # триггер удаления и суммарный размер в cache_meta расходится.
+        sql = (
+            'INSERT INTO cache (key, value, expires, accessed, size)'
+            ' VALUES (?, ?, ?, ?, ?)'
+            ' ON CONFLICT (key) DO UPDATE SET value = excluded.value,'
+            ' expires = excluded.expires, accessed = excluded.accessed,'
+            ' size = excluded.size'
+        )
+        params = (key, data, expires, now, size)
+        if only_missing:
+            sql += ' WHERE cache.expires IS NOT NULL AND cache.expires <= ?'
+            params += (now,)
+        cursor = connection.execute(sql, params)
+        return cursor.rowcount > 0
+
+    def _cull(self, connection):
+        """Удаляет просроченные, затем давно не читанные ключи."""
+        total = connection.execute(
+            "SELECT value FROM cache_meta WHERE name = 'size'"
+        ).fetchone()[0]
+        if total <= self._max_size:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),),
+        )
+        excess = connection.execute(
+            "SELECT value FROM cache_meta WHERE name = 'size'"
+        ).fetchone()[0] - self._max_size * 0.9
+        victims = []
+        rows = connection.execute(
+            'SELECT key, size FROM cache ORDER BY accessed'
+        )
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        rows.close()
+        connection.executemany('DELETE FROM cache WHERE key = ?', victims)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+
+        def add(connection):
+            added = self._store(connection, key, value, timeout, True)
+            if added:
+                self._cull(connection)
+            return added
+        return self._write(add)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+
+        def store(connection):
+            self._store(connection, key, value, timeout, False)
+            self._cull(connection)
+        self._write(store)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        keys = {self._key(key, version): value for key, value in data.items()}
+
+        def store(connection):
+            for key, value in keys.items():
+                self._store(connection, key, value, timeout, False)
+            self._cull(connection)
+        self._write(store)
+        return []
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def _get_many(self, keys):
+        now = time.time()
+        found, stale = {}, []
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            rows = self._connection.execute(
+                'SELECT key, value, expires, accessed FROM cache'
+                ' WHERE key IN (%s)' % ', '.join('?' * len(chunk)),
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = _decode(value)
+                if accessed < now - self._touch_interval:
+                    stale.append(key)
+        metrics.record_cache(len(found), len(keys) - len(found))
+        if stale:
+            # Время чтения для LRU обновляем не чаще TOUCH_INTERVAL,
+            # чтобы горячие ключи не превращали каждое чтение в запись.
+            self._connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(now, key) for key in stale],
+            )
+        return found
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection.execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), time.time(), key, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+
+        def increment(connection):
+            cursor = connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ?'
+                " AND typeof(value) = 'integer'"
+                ' AND (expires IS NULL OR expires > ?)',
+                (delta, key, time.time()),
+            )
+            if not cursor.rowcount:
+                raise ValueError("Key '%s' not found" % key)
+            return connection.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()[0]
+        return self._write(increment)
+
+    def take_token(self, key, rate, capacity, cost=1, timeout=None,
+                   version=None):
+        """Берет cost жетонов из корзины key (token bucket).
+
+        Корзина вмещает capacity жетонов и пополняется на rate жетонов
+        в секунду; в value хранится остаток, в accessed - время
+        последнего списания. Проверка и списание - один UPSERT, поэтому
+        процессы не обгоняют друг друга. Возвращает (списано ли,
+        через сколько секунд жетонов хватит).
+        """
+        key = self._key(key, version)
+        now = time.time()
+        if timeout is None:
+            # Полная корзина неотличима от отсутствующей
+            timeout = capacity / rate
+        # Просроченная или чужая запись - полная корзина
+        refilled = (
+            'MIN(:capacity, CASE WHEN (cache.expires IS NOT NULL'
+            ' AND cache.expires <= :now)'
+            " OR typeof(cache.value) NOT IN ('integer', 'real')"
+            ' THEN :capacity'
+            ' ELSE cache.value + (:now - cache.accessed) * :rate END)'
+        )
+        rows = self._connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed, size)'
+            ' VALUES (:key, :capacity - :cost, :expires, :now, 8)'
+            ' ON CONFLICT (key) DO UPDATE SET'
+            f' value = CASE WHEN {refilled} >= :cost'
+            f' THEN {refilled} - :cost ELSE cache.value END,'
+            f' accessed = CASE WHEN {refilled} >= :cost'
+            ' THEN :now ELSE cache.accessed END,'
+            ' expires = :expires, size = 8'
+            ' RETURNING value, accessed',
+            {'key': key, 'rate': rate, 'capacity': capacity, 'cost': cost,
+             'now': now, 'expires': now + timeout},
+        ).fetchall()
+        value, accessed = rows[0]
+        if accessed == now:
+            return True, 0.0
+        return False, (cost - value) / rate - (now - accessed)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            self._connection.execute(
+                'DELETE FROM cache WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)),
+                chunk,
+            )
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живет весь поток: открывать файл на каждый запрос
+        # дороже, чем держать его открытым.
+        pass
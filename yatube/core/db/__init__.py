@@ -0,0 +1 @@
+"""Работа с базами данных: реплики для чтения и их маршрутизация."""
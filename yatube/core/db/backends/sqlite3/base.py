@@ -0,0 +1,210 @@
+"""Бэкенд SQLite для нескольких потоков и процессов-писателей.
+
+Отличия от django.db.backends.sqlite3:
+
+* при подключении выставляются PRAGMA (OPTIONS['PRAGMAS'] поверх
+  PRAGMAS): журнал WAL, чтобы читатели не ждали писателя,
+  synchronous = NORMAL, mmap и busy_timeout;
+* писатели одного процесса выстраиваются в очередь (WriteQueue) вместо
+  того, чтобы одновременно ждать блокировку внутри SQLite. Место в
+  очереди берется на время транзакции atomic или одного пишущего
+  запроса вне ее; ждать его дольше WRITE_TIMEOUT секунд нельзя;
+* atomic начинает транзакцию с BEGIN IMMEDIATE: блокировка записи
+  берется сразу, а не при первом INSERT, поэтому транзакция, которая
+  сначала читает, а потом пишет, не падает с "database is locked" при
+  повышении блокировки. BEGIN IMMEDIATE и запрос вне транзакции, не
+  дождавшиеся другого процесса за busy_timeout, повторяются до
+  WRITE_RETRIES раз.
+
+Для БД в памяти (тестовой) очередь записи не используется.
+"""
+import threading
+import time
+from collections import deque
+
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+WRITE_TIMEOUT = 10
+WRITE_RETRIES = 3
+RETRY_DELAY = 0.05
+
+WRITE_STATEMENTS = (
+    'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER',
+)
+
+
+class WriteQueue:
+    """Очередь писателей в одну БД: место отдается в порядке прихода."""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._waiters = deque()
+        self._locked = False
+
+    def acquire(self, timeout):
+        """True - место получено, False - не дождались за timeout."""
+        with self._mutex:
+            if not self._locked:
+                self._locked = True
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(timeout):
+            return True
+        with self._mutex:
+            # Место могли передать между wait и захватом _mutex
+            if waiter.is_set():
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self):
+        with self._mutex:
+            if self._waiters:
+                # Очередь не освобождается, место переходит следующему
+                self._waiters.popleft().set()
+            else:
+                self._locked = False
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def write_queue(name):
+    with _queues_lock:
+        return _queues.setdefault(name, WriteQueue())
+
+
+def is_write(sql):
+    return sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS)
+
+
+def is_locked_error(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class CursorWrapper(base.SQLiteCursorWrapper):
+    """Курсор, который берет место в очереди записи для пишущих запросов."""
+
+    def execute(self, query, params=None):
+        return self.db.run_write(
+            query, lambda: super(CursorWrapper, self).execute(query, params)
+        )
+
+    def executemany(self, query, param_list):
+        return self.db.run_write(
+            query,
+            lambda: super(CursorWrapper, self).executemany(query, param_list)
+        )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**PRAGMAS, **options.get('PRAGMAS', {})}
+        self.write_timeout = float(options.get('WRITE_TIMEOUT', WRITE_TIMEOUT))
+        self.write_retries = int(options.get('WRITE_RETRIES', WRITE_RETRIES))
+        self.write_queue = None
+        self.holds_write_queue = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in ('PRAGMAS', 'WRITE_TIMEOUT', 'WRITE_RETRIES'):
+            kwargs.pop(option, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        if not self.is_in_memory_db():
+            self.write_queue = write_queue(self.settings_dict['NAME'])
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=CursorWrapper)
+        cursor.db = self
+        return cursor
+
+    def acquire_write_queue(self):
+        if self.write_queue is None or self.holds_write_queue:
+            return
+        if not self.write_queue.acquire(self.write_timeout):
+            raise self.Database.OperationalError(
+                f'database is locked: очередь записи не освободилась '
+                f'за {self.write_timeout} с'
+            )
+        self.holds_write_queue = True
+
+    def release_write_queue(self):
+        if self.holds_write_queue:
+            self.holds_write_queue = False
+            self.write_queue.release()
+
+    def _retry(self, func):
+        """func(), повторенная после "database is locked" от других
+        процессов; только для того, что можно безопасно повторить.
+        """
+        for attempt in range(self.write_retries + 1):
+            try:
+                return func()
+            except self.Database.OperationalError as error:
+                if attempt == self.write_retries or not is_locked_error(
+                    error
+                ):
+                    raise
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+
+    def run_write(self, sql, execute):
+        if (self.write_queue is None or self.holds_write_queue
+                or not is_write(sql)):
+            return execute()
+        # Пишущий запрос вне транзакции: место в очереди на один запрос
+        self.acquire_write_queue()
+        try:
+            if self.connection.in_transaction:
+                return execute()
+            return self._retry(execute)
+        finally:
+            if not self.connection.in_transaction:
+                self.release_write_queue()
+
+    def _start_transaction_under_autocommit(self):
+        if self.write_queue is None:
+            return super()._start_transaction_under_autocommit()
+        with self.wrap_database_errors:
+            self.acquire_write_queue()
+            try:
+                self._retry(
+                    lambda: self.connection.execute('BEGIN IMMEDIATE')
+                )
+            except BaseException:
+                self.release_write_queue()
+                raise
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            if not self.connection.in_transaction:
+                self.release_write_queue()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self.release_write_queue()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self.release_write_queue()
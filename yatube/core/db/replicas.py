@@ -0,0 +1,260 @@
+"""Реплики SQLite для чтения.
+
+Реплика - копия файла основной БД (default), которую обновляет SQLite
+backup API. Копия всего файла стоит O(размер БД), поэтому обновление
+идет не после каждой записи: первая транзакция с записью заводит в
+процессе таймер на REPLICA_SYNC_INTERVAL секунд, и все записи за это
+время попадают в реплики одним копированием. Без записей в процессе
+реплики обновляет команда sync_replicas --interval.
+
+Между обновлениями реплики читаются, хоть и отстают: свои записи
+браузер видит благодаря cookie ReplicaStickinessMiddleware. Отставание
+учитывается только при кэшировании: каждая транзакция с записью в любом
+процессе увеличивает счетчик записей в общем кэше, обновление
+запоминает для реплики значение счетчика на момент начала копирования.
+Если запрос читал с отставшей реплики, собранное по ней кладется в
+общий кэш не дольше чем на REPLICA_SYNC_INTERVAL секунд (cache_timeout),
+чтобы не задержаться под уже сдвинутым поколением. Записи, которых
+страницы не показывают (сессии, хранилище ключей sorl, last_login при
+входе), счетчик не сдвигают.
+
+Чтения запроса идут на реплику, только если middleware
+ReplicaStickinessMiddleware разрешил это для вьюхи (allow_replica_reads).
+"""
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.tasks import submit
+
+logger = logging.getLogger(__name__)
+
+DATABASE_REPLICAS = getattr(settings, 'DATABASE_REPLICAS', [])
+# Модели каких приложений читать с реплик и в каких вьюхах
+REPLICA_APPS = getattr(settings, 'REPLICA_APPS', ('posts',))
+REPLICA_VIEW_MODULES = getattr(
+    settings, 'REPLICA_VIEW_MODULES', ('posts.views', 'posts.feeds')
+)
+REPLICA_SYNC_INTERVAL = getattr(settings, 'REPLICA_SYNC_INTERVAL', 5)
+SYNC_TIMEOUT = 30
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+# Записи в эти таблицы не делают реплики отставшими
+REPLICA_IGNORED_TABLES = tuple(getattr(
+    settings, 'REPLICA_IGNORED_TABLES',
+    ('django_session', 'thumbnail_kvstore'),
+))
+# update_last_login при каждом входе
+LAST_LOGIN_RE = re.compile(
+    r'^UPDATE "auth_user" SET "last_login" = %s WHERE', re.IGNORECASE
+)
+
+WRITTEN_KEY = 'core:replicas:written'
+
+_timer_lock = threading.Lock()
+_timer = None
+
+_running = threading.Lock()
+_requested = threading.Event()
+
+
+def _synced_key(alias):
+    return f'core:replicas:synced:{alias}'
+
+
+class RequestState:
+    """Что происходит с БД в текущем запросе."""
+
+    def __init__(self):
+        self.replica_reads = False
+        self.wrote = False
+        self.replicas = None
+        self.replicas_lag = False
+        self.stale_read = False
+
+
+_request = ContextVar('core_db_request', default=None)
+
+
+def start_request():
+    state = RequestState()
+    return state, _request.set(state)
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+def allow_replica_reads(allowed=True):
+    state = _request.get()
+    if state is not None:
+        state.replica_reads = allowed
+
+
+def replica_lags():
+    """Реплики, которые уже обновлялись: alias -> отстает ли она.
+
+    Отстает реплика, уровень которой меньше счетчика записей; нет
+    счетчика - отстают все.
+    """
+    found = cache.get_many(
+        [WRITTEN_KEY] + [_synced_key(alias) for alias in DATABASE_REPLICAS]
+    )
+    written = found.get(WRITTEN_KEY)
+    return {
+        alias: written is None or found[_synced_key(alias)] < written
+        for alias in DATABASE_REPLICAS if _synced_key(alias) in found
+    }
+
+
+def current_replicas():
+    """Реплики, в которых есть все записи всех процессов."""
+    return [alias for alias, lags in replica_lags().items() if not lags]
+
+
+def replica_for_read():
+    """Реплика для чтения в текущем запросе или None - читать с default.
+
+    Реплики проверяются один раз за запрос; актуальные предпочтительнее.
+    """
+    state = _request.get()
+    if (state is None or not state.replica_reads or not DATABASE_REPLICAS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+        return None
+    if state.replicas is None:
+        lags = replica_lags()
+        current = [alias for alias, lag in lags.items() if not lag]
+        state.replicas = current or list(lags)
+        state.replicas_lag = not current
+    if not state.replicas:
+        return None
+    if state.replicas_lag:
+        state.stale_read = True
+    return random.choice(state.replicas)
+
+
+def cache_timeout(timeout):
+    """Время жизни в общем кэше того, что собрано в текущем запросе.
+
+    После чтения с отставшей реплики - не больше REPLICA_SYNC_INTERVAL
+    секунд: к тому времени ее обновит таймер записавшего процесса.
+    """
+    state = _request.get()
+    if state is None or not state.stale_read:
+        return timeout
+    if timeout is None:
+        return REPLICA_SYNC_INTERVAL
+    return min(timeout, REPLICA_SYNC_INTERVAL)
+
+
+def _mark_written():
+    try:
+        cache.incr(WRITTEN_KEY)
+    except ValueError:
+        # Начальное значение от времени: после очистки кэша счетчик не
+        # вернется к уровню, который уже записан для реплик
+        cache.add(WRITTEN_KEY, int(time.time() * 1000), timeout=None)
+
+
+def schedule_sync():
+    """Одно обновление реплик через REPLICA_SYNC_INTERVAL секунд на все
+    записи процесса за это время.
+    """
+    global _timer
+    if not REPLICA_SYNC_INTERVAL:
+        submit(sync_replicas)
+        return
+    with _timer_lock:
+        if _timer is not None and _timer.is_alive():
+            return
+        _timer = threading.Timer(
+            REPLICA_SYNC_INTERVAL, submit, (sync_replicas,)
+        )
+        _timer.daemon = True
+        _timer.start()
+
+
+def _transaction_committed():
+    _mark_written()
+    schedule_sync()
+
+
+def _changes_pages(sql):
+    """Запись видна на страницах: сдвигает счетчик записей."""
+    if LAST_LOGIN_RE.match(sql):
+        return False
+    head = sql[:200]
+    return not any(f'"{table}"' in head for table in REPLICA_IGNORED_TABLES)
+
+
+def _watch_writes(execute, sql, params, many, context):
+    result = execute(sql, params, many, context)
+    sql = sql.lstrip()
+    if sql[:7].upper().startswith(WRITE_STATEMENTS):
+        state = _request.get()
+        if state is not None:
+            state.wrote = True
+        if not _changes_pages(sql):
+            return result
+        connection = context['connection']
+        # Одно обновление реплик на транзакцию, а не на каждый запрос
+        if not any(func is _transaction_committed
+                   for _, func in connection.run_on_commit):
+            transaction.on_commit(
+                _transaction_committed, using=connection.alias
+            )
+    return result
+
+
+def watch_writes(sender=None, connection=None, **kwargs):
+    """Следит за записью в основную БД (сигнал connection_created)."""
+    if (not DATABASE_REPLICAS or connection.alias != DEFAULT_DB_ALIAS
+            or _watch_writes in connection.execute_wrappers):
+        return
+    connection.execute_wrappers.append(_watch_writes)
+
+
+def sync_replica(alias):
+    """Копирует основную БД в файл реплики alias."""
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    target = sqlite3.connect(
+        connections[alias].settings_dict['NAME'], timeout=SYNC_TIMEOUT
+    )
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
+
+
+def sync_replicas():
+    """Обновляет все реплики и записывает их уровень в общий кэш.
+
+    В процессе работает одно обновление; запрос, пришедший во время
+    него, оно выполнит еще одним проходом.
+    """
+    _requested.set()
+    while _requested.is_set() and _running.acquire(blocking=False):
+        try:
+            _requested.clear()
+            # Уровень до копирования: записи во время него попадут в
+            # копию или в следующее обновление
+            written = cache.get(WRITTEN_KEY)
+            if written is None:
+                _mark_written()
+                written = cache.get(WRITTEN_KEY)
+            for alias in DATABASE_REPLICAS:
+                sync_replica(alias)
+            cache.set_many({
+                _synced_key(alias): written for alias in DATABASE_REPLICAS
+            }, timeout=None)
+        finally:
+            _running.release()
@@ -0,0 +1,26 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replicas
+
+
+class ReplicaRouter:
+    """Запись - в основную БД, чтение моделей REPLICA_APPS во вьюхах
+    REPLICA_VIEW_MODULES - со случайной актуальной реплики
+    (core.db.replicas).
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in replicas.REPLICA_APPS:
+            return replicas.replica_for_read() or DEFAULT_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Во всех базах одни и те же строки
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема и данные попадают в реплики копированием
+        return db not in replicas.DATABASE_REPLICAS
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import replicas
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную БД в файлы реплик (DATABASE_REPLICAS).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд; 0 - скопировать один раз.'
+        )
+
+    def handle(self, *args, **options):
+        if not replicas.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены (DATABASE_REPLICAS).')
+        while True:
+            started = time.perf_counter()
+            replicas.sync_replicas()
+            self.stdout.write(
+                f'Реплики обновлены за {time.perf_counter() - started:.3f} с'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
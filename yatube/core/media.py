@@ -0,0 +1,145 @@
+"""Раздача загруженных файлов (MEDIA_ROOT): картинки постов и миниатюры.
+
+serve() отвечает на If-None-Match/If-Modified-Since кодом 304, на
+Range - частью файла (206) и ставит кэш на MEDIA_MAX_AGE секунд. Кэша
+на год (immutable), как у статики, нет: имя миниатюры sorl - хеш имени
+исходника и параметров, а не содержимого, и после удаления картинки
+то же имя может получить другой файл. Запросы сюда направляет
+core.middleware.MediaFilesMiddleware, минуя сессию и пользователя.
+
+С MEDIA_SENDFILE = 'x-accel-redirect' (nginx) или 'x-sendfile' (Apache,
+lighttpd) воркер только проверяет файл и ставит заголовки, а байты
+отдает прокси; Range он тоже обрабатывает сам. Для nginx внутренний
+location MEDIA_ACCEL_PREFIX должен смотреть в MEDIA_ROOT:
+
+    location /protected-media/ {
+        internal;
+        alias /path/to/media/;
+    }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+MEDIA_MAX_AGE = getattr(settings, 'MEDIA_MAX_AGE', 60 * 60)
+MEDIA_SENDFILE = getattr(settings, 'MEDIA_SENDFILE', None)
+MEDIA_ACCEL_PREFIX = getattr(
+    settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/'
+)
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Диапазон (start, end) включительно из заголовка Range.
+
+    None - отдать файл целиком: заголовка нет, он не разобран или просит
+    несколько диапазонов (так можно по RFC 7233). Диапазон за концом
+    файла - RangeNotSatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        if not int(last):
+            raise RangeNotSatisfiable
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable
+    if end < start:
+        return None
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _sendfile(path, fullpath):
+    response = HttpResponse()
+    if MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = MEDIA_ACCEL_PREFIX + quote(path)
+    else:
+        response['X-Sendfile'] = fullpath
+    return response
+
+
+def _file_response(request, fullpath, size, etag, last_modified):
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or if_range in (etag, last_modified):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        return FileResponse(open(fullpath, 'rb'))
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(fullpath, start, end - start + 1), status=206
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Отдает файл path из MEDIA_ROOT."""
+    # Путь вне MEDIA_ROOT: SuspiciousFileOperation, ответ 400
+    fullpath = safe_join(settings.MEDIA_ROOT, path)
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    last_modified = http_date(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        if MEDIA_SENDFILE:
+            response = _sendfile(path, fullpath)
+        else:
+            response = _file_response(
+                request, fullpath, stat.st_size, etag, last_modified
+            )
+        content_type, encoding = mimetypes.guess_type(fullpath)
+        # Сжатый файл (.gz) отдается как есть, без Content-Encoding
+        if encoding or not content_type:
+            content_type = 'application/octet-stream'
+        response['Content-Type'] = content_type
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}'
+    return response
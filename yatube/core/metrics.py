@@ -0,0 +1,61 @@
+"""Замеры одного запроса: БД, шаблоны, кэш.
+
+Сборщик живет в contextvars на время запроса, выбранного в выборку
+(REQUEST_METRICS_SAMPLE_RATE). Точки замера - обертка execute_wrapper
+соединений, бэкенд шаблонов core.template_backends и кэш
+core.cache_backends - вызывают функции record_*; вне выборки они
+сводятся к одному ContextVar.get.
+"""
+import time
+from contextvars import ContextVar
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper: время и число SQL-запросов."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_count += 1
+
+
+def start():
+    """Начинает сбор для текущего запроса, возвращает сборщик и токен."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record_template(seconds):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.template_time += seconds
+
+
+def record_cache(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
@@ -0,0 +1,158 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import media, metrics, staticfiles
+from .db import replicas
+
+logger = logging.getLogger('core.metrics')
+
+
+class StaticFilesMiddleware:
+    """Отдает статику из STATIC_ROOT (core.staticfiles.serve).
+
+    Стоит первым: запросу за файлом не нужны ни сессия, ни пользователь,
+    ни замеры. Без STATIC_ROOT или с STATIC_URL на другом хосте (CDN)
+    не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not settings.STATIC_URL.startswith('/'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.prefix):
+            return staticfiles.serve(
+                request, request.path_info[len(self.prefix):]
+            )
+        return self.get_response(request)
+
+
+class MediaFilesMiddleware:
+    """Отдает загруженные файлы из MEDIA_ROOT (core.media.serve).
+
+    Стоит сразу за StaticFilesMiddleware по той же причине. С MEDIA_URL
+    на другом хосте не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEDIA_URL.startswith('/'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.MEDIA_URL
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.prefix):
+            return media.serve(
+                request, request.path_info[len(self.prefix):]
+            )
+        return self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """Замеры запроса в лог (JSON) и в заголовок Server-Timing.
+
+    Замеряется доля запросов REQUEST_METRICS_SAMPLE_RATE (0..1); для
+    остальных middleware стоит один вызов random(). Заголовок можно
+    отключить REQUEST_METRICS_SERVER_TIMING = False, если время ответа
+    БД не должно быть видно клиентам.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(
+            settings, 'REQUEST_METRICS_SAMPLE_RATE', 0.01
+        )
+        self.server_timing = getattr(
+            settings, 'REQUEST_METRICS_SERVER_TIMING', True
+        )
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return self.get_response(request)
+        collector, token = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(collector)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop(token)
+        self.report(request, response, collector)
+        return response
+
+    def report(self, request, response, collector):
+        elapsed = collector.elapsed()
+        match = request.resolver_match
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_queries': collector.db_count,
+            'db_ms': round(collector.db_time * 1000, 2),
+            'template_ms': round(collector.template_time * 1000, 2),
+            'cache_hits': collector.cache_hits,
+            'cache_misses': collector.cache_misses,
+            'bytes': None if response.streaming else len(response.content),
+        }
+        logger.info(json.dumps(data), extra={'metrics': data})
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={data["db_ms"]};desc="{collector.db_count} queries"',
+                f'tpl;dur={data["template_ms"]}',
+                f'cache;desc="{collector.cache_hits} hits, '
+                f'{collector.cache_misses} misses"',
+                f'app;dur={data["duration_ms"]}',
+            ))
+
+
+class ReplicaStickinessMiddleware:
+    """Разрешает чтение с реплик (core.db) и закрепляет за основной БД
+    того, кто только что писал.
+
+    Реплики читают только GET и HEAD запросы к вьюхам
+    REPLICA_VIEW_MODULES. Ответ на запрос с записью в БД ставит cookie
+    на REPLICA_STICKY_SECONDS: пока она жива, запросы этого браузера
+    читают с основной БД и видят свой пост или комментарий, даже если
+    реплика еще не обновилась. Стоит до SessionMiddleware, чтобы
+    замечать и запись сессии. Без реплик не подключается.
+    """
+
+    cookie_name = 'db_primary'
+
+    def __init__(self, get_response):
+        if not replicas.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+    def __call__(self, request):
+        state, token = replicas.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.end_request(token)
+        if state.wrote:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.sticky_seconds,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas.allow_replica_reads(
+            request.method in ('GET', 'HEAD')
+            and view_func.__module__ in replicas.REPLICA_VIEW_MODULES
+            and self.cookie_name not in request.COOKIES
+        )
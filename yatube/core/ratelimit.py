@@ -0,0 +1,138 @@
+"""Ограничение частоты запросов: token bucket в общем кэше.
+
+Корзина на каждую пару (область, кто): область - обычно имя вьюхи,
+кто - id вошедшего пользователя или IP-адрес. За обратным прокси
+REMOTE_ADDR у всех запросов один; адрес клиента берется из заголовка
+RATE_LIMIT_PROXY_HEADER, только если запрос пришел с адреса из
+RATE_LIMIT_TRUSTED_PROXIES (иначе заголовок подделает любой).
+
+Правило '10/m' - не больше 10 запросов подряд и дальше по 10 в минуту.
+Проверка - одна атомарная операция кэша SQLiteCache.take_token; с другим
+бэкендом кэша корзина читается и пишется отдельно, без атомарности.
+
+Вьюхи ограничиваются декоратором ratelimit, чужие вьюхи (users,
+django.contrib.auth) - middleware RateLimitMiddleware по RATE_LIMITS.
+Отказ - ответ 429 с заголовком Retry-After.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .views import too_many_requests
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+RATE_LIMIT_TRUSTED_PROXIES = frozenset(
+    getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', [])
+)
+RATE_LIMIT_PROXY_HEADER = getattr(
+    settings, 'RATE_LIMIT_PROXY_HEADER', 'HTTP_X_FORWARDED_FOR'
+)
+
+
+def parse_rate(rate):
+    """'10/m' -> (10 жетонов, 10 / 60 жетона в секунду)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+def client_ip(request):
+    """Адрес клиента: REMOTE_ADDR или, за доверенным прокси, последний
+    недоверенный адрес из RATE_LIMIT_PROXY_HEADER.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    if address not in RATE_LIMIT_TRUSTED_PROXIES:
+        return address
+    # Каждый прокси дописывает адрес справа: левее - то, что прислал
+    # клиент, и этому уже нельзя верить
+    forwarded = request.META.get(RATE_LIMIT_PROXY_HEADER, '').split(',')
+    for hop in reversed(forwarded):
+        hop = hop.strip()
+        if not hop:
+            break
+        address = hop
+        if hop not in RATE_LIMIT_TRUSTED_PROXIES:
+            break
+    return address
+
+
+def identity(request, by):
+    """Кто делает запрос: by = 'user' (для анонимов - IP) или 'ip'."""
+    user = getattr(request, 'user', None)
+    if by == 'user' and user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def take(key, rate, cost=1):
+    """(разрешен ли запрос, через сколько секунд повторить)."""
+    capacity, per_second = parse_rate(rate)
+    if hasattr(cache, 'take_token'):
+        return cache.take_token(key, per_second, capacity, cost)
+    now = time.time()
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * per_second)
+    allowed = tokens >= cost
+    if allowed:
+        tokens -= cost
+    cache.set(key, (tokens, now), timeout=capacity / per_second)
+    return allowed, 0.0 if allowed else (cost - tokens) / per_second
+
+
+def check(request, scope, rate, by='user'):
+    """None, если запрос разрешен, иначе ответ 429."""
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+    allowed, retry_after = take(
+        f'ratelimit:{scope}:{identity(request, by)}', rate
+    )
+    if allowed:
+        return None
+    response = too_many_requests(request)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def ratelimit(rate, by='user', methods=('POST',), scope=None):
+    """Декоратор вьюхи: не больше rate запросов методами methods
+    (None - любыми) от одного пользователя или IP (by).
+    """
+    def decorator(view):
+        view_scope = scope or f'{view.__module__}.{view.__qualname__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                response = check(request, view_scope, rate, by)
+                if response is not None:
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitMiddleware:
+    """Ограничения из RATE_LIMITS по имени вьюхи (namespace:name):
+
+    RATE_LIMITS = {'auth:login': [('10/m', 'ip', ['POST'])]}
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limits = getattr(settings, 'RATE_LIMITS', {})
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        for rate, by, methods in self.limits.get(match.view_name, ()):
+            if methods is None or request.method in methods:
+                response = check(request, match.view_name, rate, by)
+                if response is not None:
+                    return response
+        return None
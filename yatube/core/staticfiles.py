@@ -0,0 +1,202 @@
+"""Статика с хешем в имени, заранее сжатыми копиями и долгим кэшем.
+
+collectstatic через CompressedManifestStaticFilesStorage копирует файлы
+в STATIC_ROOT под именами с хешем содержимого (css/bootstrap.min.css ->
+css/bootstrap.min.<md5>.css), пишет манифест staticfiles.json и кладет
+рядом со сжимаемыми файлами .gz и, если установлен пакет brotli, .br.
+Тег {% static %} берет имена из манифеста; файла, которого в манифесте
+нет (collectstatic еще не запускали), отдается исходное имя.
+
+serve() отдает файл из STATIC_ROOT: выбирает сжатую копию по
+Accept-Encoding, файлы из манифеста отдает с кэшем на год (immutable),
+остальные - на STATIC_MAX_AGE секунд.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_MAX_AGE = getattr(settings, 'STATIC_MAX_AGE', 60)
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _gzip(data):
+    # mtime=0: одинаковый файл дает одинаковый архив при каждой сборке
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+# Кодировки в порядке предпочтения: (Content-Encoding, суффикс, сжатие)
+ENCODINGS = [('gzip', '.gz', _gzip)]
+if brotli is not None:
+    ENCODINGS.insert(0, ('br', '.br', _brotli))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который пишет и сжатые копии файлов."""
+
+    compress_patterns = (
+        '*.css', '*.js', '*.map', '*.svg', '*.ico', '*.json', '*.txt',
+        '*.xml', '*.html', '*.ttf', '*.otf', '*.eot',
+    )
+    compress_min_size = 256
+    # Копия, которая меньше оригинала не больше чем на 5%, не пишется
+    compress_min_ratio = 0.95
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            logger.debug('Файла %s нет в манифесте статики', name)
+            return name
+
+    def is_immutable(self, name):
+        """Имя с хешем из манифеста: содержимое по нему не меняется."""
+        names = getattr(self, '_immutable_names', None)
+        if names is None:
+            names = self._immutable_names = set(self.hashed_files.values())
+        return name in names
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        self._immutable_names = None
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if matches_patterns(name, self.compress_patterns):
+                self.compress(name)
+
+    def compress(self, name):
+        """Пишет рядом с name сжатые копии; возвращает их кодировки."""
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < self.compress_min_size:
+            return []
+        written = []
+        for encoding, suffix, compress in ENCODINGS:
+            compressed = compress(data)
+            if len(compressed) > len(data) * self.compress_min_ratio:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+            written.append(encoding)
+        return written
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с q > 0."""
+    weights = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        weight = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    default = weights.get('*', 0.0)
+    return {
+        encoding for encoding, _, _ in ENCODINGS
+        if weights.get(encoding, default) > 0
+    }
+
+
+def _is_immutable(name):
+    check = getattr(staticfiles_storage, 'is_immutable', None)
+    return check is not None and check(name)
+
+
+def _choose_variant(request, fullpath, stat):
+    """Файл для ответа с учетом Accept-Encoding.
+
+    Возвращает (путь, stat, кодировка или None, есть ли сжатые копии).
+    """
+    compressible = False
+    accepted = accepted_encodings(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    for encoding, suffix, _ in ENCODINGS:
+        try:
+            variant = os.stat(fullpath + suffix)
+        except OSError:
+            continue
+        compressible = True
+        if encoding in accepted:
+            return fullpath + suffix, variant, encoding, True
+    return fullpath, stat, None, compressible
+
+
+def _file_response(request, fullpath, stat, encoding, content_type):
+    """304 по ETag/Last-Modified или ответ с файлом fullpath."""
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}'
+    etag += f'-{encoding}"' if encoding else '"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = FileResponse(open(fullpath, 'rb'))
+        if encoding:
+            # FileResponse угадал тип по имени сжатой копии (.gz)
+            response['Content-Type'] = (
+                content_type or 'application/octet-stream'
+            )
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+@require_safe
+def serve(request, path, document_root=None):
+    """Отдает файл статики path из document_root (по умолчанию
+    STATIC_ROOT) со сжатой копией и заголовками кэширования.
+    """
+    document_root = document_root or settings.STATIC_ROOT
+    # Путь вне document_root: SuspiciousFileOperation, ответ 400
+    fullpath = safe_join(document_root, path)
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(fullpath)
+    variant, stat, encoding, compressible = _choose_variant(
+        request, fullpath, stat
+    )
+    response = _file_response(request, variant, stat, encoding, content_type)
+    if _is_immutable(path):
+        response['Cache-Control'] = (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+    if compressible:
+        response['Vary'] = 'Accept-Encoding'
+    return response
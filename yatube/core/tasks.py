@@ -0,0 +1,56 @@
+"""Фоновые задачи в пуле потоков процесса.
+
+Для коротких задач, которые не должны выполняться на пути запроса:
+подготовка миниатюр, очистка удаленных данных. Задача ставится после
+коммита транзакции, чтобы фоновый поток видел записанные строки.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+            thread_name_prefix='yatube-task',
+        )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась с ошибкой', func)
+
+
+def _run(func, args, kwargs):
+    try:
+        _call(func, args, kwargs)
+    finally:
+        # У потока пула свои соединения с БД: не оставляем их открытыми
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Ставит func в очередь пула или выполняет сразу при
+    BACKGROUND_TASKS_EAGER (удобно в тестах и командах). Ошибка задачи
+    в обоих случаях только пишется в лог.
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        _call(func, args, kwargs)
+        return
+    _get_executor().submit(_run, func, args, kwargs)
+
+
+def submit_on_commit(func, *args, **kwargs):
+    """submit после успешного коммита текущей транзакции."""
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))
@@ -0,0 +1,79 @@
+"""Бэкенд шаблонов Django, замеряющий время отрисовки (core.metrics),
+и прогрев кэширующего загрузчика шаблонов при старте процесса.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates, Template
+from django.template.loaders.cached import Loader as CachedLoader
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.record_template(time.perf_counter() - started)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, который сообщает время render в core.metrics.
+
+    Вложенные include и inclusion-теги отрисовываются внутри шаблона
+    верхнего уровня и в замер входят один раз.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            super().from_string(template_code).template, self
+        )
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(
+            super().get_template(template_name).template, self
+        )
+
+
+def _template_names(loader):
+    for source_loader in loader.loaders:
+        for directory in source_loader.get_dirs():
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith(('.html', '.txt')):
+                        path = os.path.join(root, name)
+                        yield os.path.relpath(path, directory).replace(
+                            os.sep, '/'
+                        )
+
+
+def warm_up():
+    """Разбирает все шаблоны в кэш загрузчика cached.Loader.
+
+    Вызывается из wsgi.py, чтобы первые запросы каждого процесса не
+    разбирали шаблоны с диска. Без кэширующего загрузчика (DEBUG = True)
+    ничего не делает. Возвращает число разобранных шаблонов.
+    """
+    warmed = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for loader in engine.template_loaders:
+            if not isinstance(loader, CachedLoader):
+                continue
+            for name in set(_template_names(loader)):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    # Например, шаблоны приложений без их библиотек тегов
+                    logger.debug('Шаблон %s не разобран', name, exc_info=True)
+                else:
+                    warmed += 1
+    return warmed
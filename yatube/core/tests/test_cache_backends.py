@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache_backends import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_add_only_missing_or_expired(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+        self.cache.set('short', 'old', timeout=0.05)
+        time.sleep(0.1)
+        self.assertTrue(self.cache.add('short', 'new'))
+        self.assertEqual(self.cache.get('short'), 'new')
+
+    def test_get_many(self):
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'}
+        )
+
+    def test_timeout(self):
+        self.cache.set('key', 'value', timeout=0.05)
+        self.assertTrue(self.cache.has_key('key'))
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('key'))
+        self.cache.set('forever', 'value', timeout=None)
+        self.assertEqual(self.cache.get('forever'), 'value')
+
+    def test_incr_is_atomic_across_connections(self):
+        self.cache.set('counter', 0, timeout=None)
+        other = self.make_cache()
+
+        def work(cache):
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [
+            threading.Thread(target=work, args=(cache,))
+            for cache in (self.cache, other, self.cache, other)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(other.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_take_token_is_atomic_across_connections(self):
+        other = self.make_cache()
+        allowed = []
+
+        def work(cache):
+            for _ in range(10):
+                allowed.append(cache.take_token('bucket', 0.001, 15)[0])
+
+        threads = [
+            threading.Thread(target=work, args=(cache,))
+            for cache in (self.cache, other, self.cache, other)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 15)
+        taken, retry_after = self.cache.take_token('bucket', 0.001, 15)
+        self.assertFalse(taken)
+        self.assertGreater(retry_after, 900)
+
+    def test_take_token_refills(self):
+        self.assertEqual(self.cache.take_token('bucket', 20, 1), (True, 0.0))
+        self.assertFalse(self.cache.take_token('bucket', 20, 1)[0])
+        time.sleep(0.06)
+        self.assertTrue(self.cache.take_token('bucket', 20, 1)[0])
+        # Значение другого типа под тем же ключом - полная корзина
+        self.cache.set('bucket', 'value')
+        self.assertTrue(self.cache.take_token('bucket', 20, 1)[0])
+
+    def test_shared_between_instances(self):
+        other = self.make_cache()
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        other.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_lru_eviction(self):
+        cache = self.make_cache(MAX_SIZE=4000, TOUCH_INTERVAL=0)
+        cache.set('hot', 'x' * 1000)
+        for i in range(10):
+            cache.get('hot')
+            cache.set(f'cold-{i}', 'x' * 1000)
+        self.assertEqual(cache.get('hot'), 'x' * 1000)
+        self.assertIsNone(cache.get('cold-0'))
+        self.assertLessEqual(
+            len(cache.get_many([f'cold-{i}' for i in range(10)])), 3
+        )
+
+    def test_size_accounting(self):
+        self.cache.set('key', 'x' * 1000)
+        self.cache.set('key', 'x' * 10)
+        self.cache.delete('key')
+        connection = self.cache._connection
+        total = connection.execute(
+            "SELECT value FROM cache_meta WHERE name = 'size'"
+        ).fetchone()[0]
+        self.assertEqual(total, 0)
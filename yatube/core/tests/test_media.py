@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from .. import media
+from ..media import RangeNotSatisfiable, parse_range
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+CONTENT = bytes(range(256)) * 40
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/photo.jpg', 'posts/фото.jpg',
+                     'cache/ab/cd/0123abcd.jpg'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get(self, name, **headers):
+        return self.client.get(settings.MEDIA_URL + name, **headers)
+
+    def test_whole_file(self):
+        response = self.get('posts/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(int(response['Content-Length']), len(CONTENT))
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+        response = self.get(
+            'posts/photo.jpg', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_thumbnails_are_revalidated(self):
+        # Имя миниатюры не зависит от содержимого: кэш не immutable
+        response = self.get('cache/ab/cd/0123abcd.jpg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        response = self.get(
+            'cache/ab/cd/0123abcd.jpg', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_served_without_session_and_user(self):
+        user = get_user_model().objects.create_user(username='reader')
+        self.client.force_login(user)
+        with self.assertNumQueries(0):
+            response = self.get('posts/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+
+    def test_byte_range(self):
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=100-1099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response['Content-Range'], f'bytes 100-1099/{len(CONTENT)}'
+        )
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertEqual(
+            b''.join(response.streaming_content), CONTENT[100:1100]
+        )
+
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=-10')
+        self.assertEqual(
+            b''.join(response.streaming_content), CONTENT[-10:]
+        )
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.get(
+            'posts/photo.jpg', HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"stale"',
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.get(
+            'posts/photo.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag
+        )
+        self.assertEqual(response.status_code, 206)
+
+    def test_unsatisfiable_range(self):
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=99999-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    @mock.patch.object(media, 'MEDIA_SENDFILE', 'x-accel-redirect')
+    def test_accel_redirect(self):
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/photo.jpg'
+        )
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('ETag', response)
+        self.assertEqual(response.content, b'')
+
+        response = self.get('posts/фото.jpg')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/posts/%D1%84%D0%BE%D1%82%D0%BE.jpg',
+        )
+
+    @mock.patch.object(media, 'MEDIA_SENDFILE', 'x-sendfile')
+    def test_sendfile(self):
+        response = self.get('posts/photo.jpg')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'photo.jpg'),
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.get('posts/missing.jpg').status_code, 404)
+        self.assertEqual(self.get('posts/').status_code, 404)
+        self.assertEqual(self.get('../manage.py').status_code, 400)
+        response = self.client.post(settings.MEDIA_URL + 'posts/photo.jpg')
+        self.assertEqual(response.status_code, 405)
+
+
+class ParseRangeTest(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        # Не разобранный заголовок и несколько диапазонов: весь файл
+        for header in ('', 'bytes=-', 'bytes=5-1', 'items=0-1',
+                       'bytes=0-1,5-9'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+        for header in ('bytes=100-', 'bytes=-0'):
+            with self.subTest(header=header):
+                with self.assertRaises(RangeNotSatisfiable):
+                    parse_range(header, 100)
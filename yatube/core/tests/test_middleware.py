@@ -0,0 +1,67 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import middleware
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+class RequestMetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, url):
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            response = self.client.get(url)
+        self.assertEqual(len(logs.records), 1)
+        return response, json.loads(logs.records[0].getMessage())
+
+    def test_records_cold_and_cached_page(self):
+        response, data = self.get(reverse('posts:index'))
+        self.assertEqual(data['view'], 'posts:index')
+        self.assertEqual(data['status'], 200)
+        self.assertGreater(data['db_queries'], 0)
+        self.assertGreater(data['template_ms'], 0)
+        self.assertGreater(data['cache_misses'], 0)
+        self.assertEqual(data['bytes'], len(response.content))
+        self.assertGreaterEqual(data['duration_ms'], data['db_ms'])
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{data["db_queries"]} queries"', timing)
+        self.assertIn('app;dur=', timing)
+
+        response, data = self.get(reverse('posts:index'))
+        self.assertEqual(data['db_queries'], 0)
+        self.assertEqual(data['template_ms'], 0)
+        self.assertGreater(data['cache_hits'], 0)
+
+    def test_unresolved_path(self):
+        response, data = self.get('/no-such-page/')
+        self.assertEqual(data['status'], 404)
+        self.assertIsNone(data['view'])
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        response, data = self.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        with mock.patch.object(middleware, 'logger') as logger:
+            response = self.client.get(reverse('posts:index'))
+        logger.info.assert_not_called()
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from .. import ratelimit
+
+User = get_user_model()
+
+
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:add_comment', args=[self.post.pk])
+
+    def comment(self, client=None):
+        return (client or self.client).post(self.url, {'text': 'Комментарий'})
+
+    def test_decorator_limits_per_user(self):
+        for _ in range(10):
+            self.assertEqual(self.comment().status_code, 302)
+        response = self.comment()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '6')
+        self.assertEqual(Comment.objects.count(), 10)
+
+        other = Client()
+        other.force_login(self.other)
+        self.assertEqual(self.comment(other).status_code, 302)
+        # GET не ограничен, и у других вьюх своя корзина
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=['other'])
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_middleware_limits_login_per_ip(self):
+        client = Client()
+        url = reverse('users:login')
+        data = {'username': 'author', 'password': 'wrong'}
+        for _ in range(10):
+            self.assertEqual(client.post(url, data).status_code, 200)
+        response = client.post(url, data)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '6')
+        self.assertEqual(client.get(url).status_code, 200)
+        other = Client(REMOTE_ADDR='192.0.2.10')
+        self.assertEqual(other.post(url, data).status_code, 200)
+
+    @mock.patch.object(
+        ratelimit, 'RATE_LIMIT_TRUSTED_PROXIES', {'10.0.0.1', '10.0.0.2'}
+    )
+    def test_client_address_behind_trusted_proxy(self):
+        url = reverse('users:login')
+        data = {'username': 'author', 'password': 'wrong'}
+        proxy = Client(REMOTE_ADDR='10.0.0.1')
+
+        def login(forwarded):
+            return proxy.post(url, data, HTTP_X_FORWARDED_FOR=forwarded)
+
+        for _ in range(10):
+            login('192.0.2.1, 10.0.0.2')
+        self.assertEqual(login('192.0.2.1').status_code, 429)
+        # Другой клиент за тем же прокси - своя корзина; подделанный
+        # клиентом адрес левее настоящего не учитывается
+        self.assertEqual(login('192.0.2.1, 192.0.2.2').status_code, 200)
+        # Без доверенного прокси заголовок игнорируется
+        direct = Client(REMOTE_ADDR='192.0.2.3')
+        for _ in range(10):
+            direct.post(url, data, HTTP_X_FORWARDED_FOR='192.0.2.4')
+        response = direct.post(url, data, HTTP_X_FORWARDED_FOR='192.0.2.5')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_can_be_disabled(self):
+        for _ in range(11):
+            self.assertEqual(self.comment().status_code, 302)
@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..db import replicas
+from ..db.routers import ReplicaRouter
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ReplicaRoutingTest(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.databases[REPLICA] = dict(
+            connections.databases[DEFAULT_DB_ALIAS],
+            NAME=os.path.join(cls.replica_dir, 'replica.sqlite3'),
+            TEST={},
+        )
+        cls.patchers = [
+            mock.patch.object(replicas, 'DATABASE_REPLICAS', [REPLICA]),
+            mock.patch.object(replicas, 'REPLICA_SYNC_INTERVAL', 0),
+        ]
+        for patcher in cls.patchers:
+            patcher.start()
+        replicas.watch_writes(connection=connections[DEFAULT_DB_ALIAS])
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[DEFAULT_DB_ALIAS].execute_wrappers.remove(
+            replicas._watch_writes
+        )
+        for patcher in cls.patchers:
+            patcher.stop()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Первый пост', author=self.user)
+        self.client = Client()
+
+    def get(self, url, client=None):
+        client = client or self.client
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            response = client.get(url)
+        return response, len(queries)
+
+    def test_views_read_from_synced_replica(self):
+        self.assertEqual(replicas.current_replicas(), [REPLICA])
+        response, replica_queries = self.get(reverse('posts:index'))
+        self.assertContains(response, 'Первый пост')
+        self.assertGreater(replica_queries, 0)
+
+    def test_stale_replica_is_read_but_not_cached_long(self):
+        self.get(reverse('posts:index'))
+        # Запись другого процесса: его таймер реплику еще не обновил
+        with mock.patch.object(replicas, 'schedule_sync'):
+            Post.objects.create(text='Второй пост', author=self.user)
+        self.assertEqual(replicas.current_replicas(), [])
+        # Страница со старой реплики не кэшируется дольше
+        # REPLICA_SYNC_INTERVAL (здесь 0)
+        response, replica_queries = self.get(reverse('posts:index'))
+        self.assertGreater(replica_queries, 0)
+        self.assertNotContains(response, 'Второй пост')
+        replicas.sync_replicas()
+        response, replica_queries = self.get(reverse('posts:index'))
+        self.assertContains(response, 'Второй пост')
+        self.assertGreater(replica_queries, 0)
+
+    def test_cache_timeout_after_stale_read(self):
+        state, token = replicas.start_request()
+        try:
+            with mock.patch.object(replicas, 'REPLICA_SYNC_INTERVAL', 5):
+                self.assertEqual(replicas.cache_timeout(3600), 3600)
+                state.stale_read = True
+                self.assertEqual(replicas.cache_timeout(3600), 5)
+                self.assertEqual(replicas.cache_timeout(None), 5)
+                self.assertEqual(replicas.cache_timeout(2), 2)
+        finally:
+            replicas.end_request(token)
+
+    def test_session_and_login_writes_keep_replicas_current(self):
+        self.user.set_password('password')
+        self.user.save()
+        replicas.sync_replicas()
+        with mock.patch.object(replicas, 'schedule_sync') as schedule:
+            self.assertTrue(
+                self.client.login(username='author', password='password')
+            )
+        schedule.assert_not_called()
+        self.assertEqual(replicas.current_replicas(), [REPLICA])
+
+    def test_writer_sticks_to_primary(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Мой комментарий'},
+        )
+        self.assertIn('db_primary', response.cookies)
+        self.assertEqual(replicas.current_replicas(), [REPLICA])
+        url = reverse('posts:posts', args=[self.post.pk])
+        response, replica_queries = self.get(url, client)
+        self.assertContains(response, 'Мой комментарий')
+        self.assertEqual(replica_queries, 0)
+
+        response, replica_queries = self.get(reverse('posts:index'))
+        self.assertNotIn('db_primary', response.cookies)
+        self.assertGreater(replica_queries, 0)
+
+    def test_syncs_are_coalesced(self):
+        with mock.patch.object(replicas, 'REPLICA_SYNC_INTERVAL', 60), \
+                mock.patch.object(replicas, 'submit') as submit:
+            replicas.schedule_sync()
+            timer = replicas._timer
+            replicas.schedule_sync()
+            self.assertIs(replicas._timer, timer)
+            timer.cancel()
+            timer.join()
+        submit.assert_not_called()
+
+    def test_writes_go_to_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        self.assertFalse(router.allow_migrate(REPLICA, 'posts'))
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'posts'))
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.db import connection, connections
+from django.test import SimpleTestCase
+
+from benchmarks.writes import ENGINES, run
+
+from ..db.backends.sqlite3.base import WriteQueue
+
+ALIAS = 'sqlite_backend_test'
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    databases = {'default', ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[ALIAS] = {
+            'ENGINE': ENGINES['core'],
+            'NAME': os.path.join(cls.directory, 'test.sqlite3'),
+            'OPTIONS': {'PRAGMAS': {'mmap_size': 1024 * 1024}},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def pragma(self, name, using=ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('mmap_size'), 1024 * 1024)
+
+    def test_in_memory_db_has_no_write_queue(self):
+        connection.ensure_connection()
+        connections[ALIAS].ensure_connection()
+        self.assertTrue(connection.is_in_memory_db())
+        self.assertIsNone(connection.write_queue)
+        self.assertIsNotNone(connections[ALIAS].write_queue)
+
+    def test_concurrent_read_then_write_transactions(self):
+        result = run(workers=[4], transactions=50,
+                     engines={'core': ENGINES['core']})
+        row, = result['core']
+        self.assertEqual(row['errors'], 0)
+        self.assertEqual(row['committed'], 200)
+
+
+class WriteQueueTest(SimpleTestCase):
+    def test_waiters_are_served_in_order(self):
+        queue = WriteQueue()
+        self.assertTrue(queue.acquire(0))
+        served = []
+
+        def writer(number):
+            queue.acquire(5)
+            served.append(number)
+            queue.release()
+
+        threads = []
+        for number in range(3):
+            thread = threading.Thread(target=writer, args=[number])
+            thread.start()
+            threads.append(thread)
+            while len(queue._waiters) <= number:
+                time.sleep(0.001)
+        queue.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(served, [0, 1, 2])
+        self.assertTrue(queue.acquire(0))
+
+    def test_bounded_wait(self):
+        queue = WriteQueue()
+        queue.acquire(0)
+        self.assertFalse(queue.acquire(0.01))
+        self.assertFalse(queue._waiters)
+        queue.release()
+        self.assertTrue(queue.acquire(0))
@@ -0,0 +1,109 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from ..staticfiles import accepted_encodings
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+CSS = 'css/bootstrap.min.css'
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticFilesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def read(self, name):
+        with open(os.path.join(TEMP_STATIC_ROOT, name), 'rb') as file:
+            return file.read()
+
+    def test_collect_hashes_and_compresses(self):
+        hashed = staticfiles_storage.stored_name(CSS)
+        self.assertRegex(hashed, r'^css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        self.assertEqual(
+            staticfiles_storage.url(CSS), settings.STATIC_URL + hashed
+        )
+        self.assertEqual(
+            gzip.decompress(self.read(hashed + '.gz')), self.read(CSS)
+        )
+        self.assertTrue(os.path.exists(
+            os.path.join(TEMP_STATIC_ROOT, CSS + '.gz')
+        ))
+        # PNG уже сжат
+        logo = staticfiles_storage.stored_name('img/logo.png')
+        self.assertFalse(os.path.exists(
+            os.path.join(TEMP_STATIC_ROOT, logo + '.gz')
+        ))
+
+    def test_missing_manifest_entry_falls_back(self):
+        self.assertEqual(
+            staticfiles_storage.url('img/missing.png'),
+            settings.STATIC_URL + 'img/missing.png',
+        )
+
+    def test_serves_precompressed_immutable_file(self):
+        url = staticfiles_storage.url(CSS)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertEqual(gzip.decompress(body), self.read(CSS))
+
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_serves_plain_file_with_short_cache(self):
+        response = self.client.get(settings.STATIC_URL + CSS)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(
+            b''.join(response.streaming_content), self.read(CSS)
+        )
+
+    def test_missing_and_outside_files(self):
+        for path in ('img/missing.png', 'css/'):
+            with self.subTest(path=path):
+                response = self.client.get(settings.STATIC_URL + path)
+                self.assertEqual(response.status_code, 404)
+        response = self.client.get(settings.STATIC_URL + '../manage.py')
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_safe_methods(self):
+        response = self.client.post(settings.STATIC_URL + CSS)
+        self.assertEqual(response.status_code, 405)
+
+
+class AcceptedEncodingsTest(SimpleTestCase):
+    def test_weights(self):
+        self.assertIn('gzip', accepted_encodings('gzip, deflate'))
+        self.assertIn('gzip', accepted_encodings('*'))
+        self.assertNotIn('gzip', accepted_encodings('gzip;q=0, *'))
+        self.assertNotIn('gzip', accepted_encodings('identity'))
+        self.assertNotIn('gzip', accepted_encodings(''))
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase
+
+from ..template_backends import warm_up
+
+
+class WarmUpTest(SimpleTestCase):
+    def test_fills_cached_loader(self):
+        # Тесты идут с DEBUG = False, загрузчик шаблонов кэширующий
+        loader, = engines.all()[0].engine.template_loaders
+        loader.reset()
+        self.assertGreater(warm_up(), 0)
+        self.assertIn('posts/index.html', loader.get_template_cache)
+        self.assertIn('includes/post_card.html', loader.get_template_cache)
+
+    def test_skipped_without_cached_loader(self):
+        options = dict(settings.TEMPLATES[0]['OPTIONS'], loaders=[
+            'django.template.loaders.filesystem.Loader',
+        ])
+        with self.settings(TEMPLATES=[dict(
+            settings.TEMPLATES[0], APP_DIRS=False, OPTIONS=options
+        )]):
+            self.assertEqual(warm_up(), 0)
@@ -17,3 +17,7 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def too_many_requests(request):
+    return render(request, 'core/429.html', status=429)
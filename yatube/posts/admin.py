@@ -1,15 +1,48 @@
 from django.contrib import admin
 
 from .models import Follow, Group, Post, Comment
+from .purge import delete_post
+from .search import build_match, matching_ids
 
 
-class PostAdmin(admin.ModelAdmin):
+class TombstoneAdminMixin:
+    """Удаление из админки через пометку (posts.purge).
+
+    Страница подтверждения не собирает каскад связанных строк: для
+    автора с тысячами постов это само по себе долгий запрос.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        model_count = {self.model._meta.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, set(), []
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_model(request, obj)
+
+
+class PostAdmin(TombstoneAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
     list_editable = ('group', 'author')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_admin()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу FTS5 вместо LIKE '%...%' по всей таблице
+        if not search_term.strip():
+            return queryset, False
+        if not build_match(search_term):
+            return queryset.none(), False
+        return queryset.filter(pk__in=matching_ids(search_term)), False
+
+    def delete_model(self, request, obj):
+        delete_post(obj)
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
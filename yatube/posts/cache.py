@@ -0,0 +1,254 @@
+"""Кэш страниц с ключами по счетчикам поколений.
+
+Каждая страница зависит от нескольких областей (scope): вся лента,
+группа, профиль автора, пост. Номер поколения области входит в ключ
+кэша, а сигналы увеличивают его при записи. Кроме своих областей каждая
+страница зависит от NAMES_SCOPE: смена имени пользователя или названия
+группы сбрасывает все страницы. Старые страницы становятся
+недостижимыми сразу и вытесняются кэшем сами, поэтому страницы могут
+жить часами.
+
+Те же поколения дают валидаторы условного GET: ETag - хэш номеров
+поколений (и пользователя), Last-Modified - время последнего сдвига
+любой из областей. Ответ 304 отдается до чтения кэша страницы и БД.
+
+Страницы для вошедшего пользователя кэшируются отдельно для каждой его
+сессии: в них имя, кнопки подписки и CSRF-токен. Анонимные посетители
+делят одну копию.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_max_age, patch_cache_control
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core.db import replicas
+
+from .models import Post
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 60 * 6)
+
+FEED_SCOPE = 'posts'
+# Имена пользователей и названия групп: выводятся почти на всех
+# страницах, поэтому от этой области зависит каждая страница
+NAMES_SCOPE = 'names'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def _generation_key(scope):
+    return f'posts:generation:{scope}'
+
+
+def _modified_key(scope):
+    return f'posts:modified:{scope}'
+
+
+def _seed():
+    # Начальное значение от времени: после вытеснения счетчика или
+    # очистки кэша поколение не повторит уже использованный номер.
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    """Номера поколений областей в порядке scopes и время их изменения.
+
+    Время - максимум по областям (timestamp). Отсутствующие в кэше
+    значения заводятся текущими: лишний полный ответ лучше ложного 304.
+    """
+    generations, modified, _ = get_versioned(None, scopes)
+    return generations, modified
+
+
+def get_versioned(value_key, scopes):
+    """get_versions и значение value_key, сохраненное set_versioned,
+    одним чтением кэша. Значение None, если его нет или оно сохранено
+    для других поколений scopes.
+    """
+    scopes = [NAMES_SCOPE, *scopes]
+    keys = [_generation_key(scope) for scope in scopes]
+    modified_keys = [_modified_key(scope) for scope in scopes]
+    found = cache.get_many(
+        keys + modified_keys + ([value_key] if value_key else [])
+    )
+    for key in keys:
+        if key not in found:
+            cache.add(key, _seed(), timeout=None)
+            found[key] = cache.get(key)
+    for key in modified_keys:
+        if key not in found:
+            cache.add(key, time.time(), timeout=None)
+            found[key] = cache.get(key)
+    generations = [found[key] for key in keys]
+    stored_generations, value = found.get(value_key, (None, None))
+    if stored_generations != generations:
+        value = None
+    return (
+        generations,
+        max(found[key] for key in modified_keys),
+        value,
+    )
+
+
+def set_versioned(key, generations, value, timeout=PAGE_CACHE_TIMEOUT):
+    """Сохраняет value для поколений generations (get_versioned)."""
+    cache.set(key, (generations, value), replicas.cache_timeout(timeout))
+
+
+def get_generations(scopes):
+    """Текущие номера поколений областей в порядке scopes."""
+    return get_versions(scopes)[0]
+
+
+def bump_generations(*scopes):
+    """Сбрасывает кэш страниц, зависящих от scopes."""
+    scopes = set(scopes)
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _seed(), timeout=None)
+    now = time.time()
+    cache.set_many(
+        {_modified_key(scope): now for scope in scopes}, timeout=None
+    )
+
+
+def _resolve(scopes, request, kwargs):
+    """Области запроса; в шаблоне доступен и request ('{request.user}')."""
+    return [
+        scope(**kwargs) if callable(scope)
+        else scope.format(request=request, **kwargs)
+        for scope in scopes
+    ]
+
+
+def _etag(request, generations, per_user):
+    parts = [str(generation) for generation in generations]
+    if per_user:
+        # В шаблонах есть имя пользователя, кнопки подписки и формы
+        parts.append(str(request.user.pk))
+    return hashlib.md5('.'.join(parts).encode()).hexdigest()
+
+
+def _key_prefix(request, generations, per_user):
+    parts = ['posts'] + [str(generation) for generation in generations]
+    if per_user and request.user.is_authenticated:
+        # Vary: Cookie ставит SessionMiddleware уже после cache_page, и
+        # в ключ сохраненной копии он не попадает
+        parts.append(f'u{request.user.pk}-{request.session.session_key}')
+    return '.'.join(parts)
+
+
+def conditional_response(view, request, args, kwargs, generations,
+                         modified, per_user):
+    """304, если копия клиента актуальна, иначе ответ view.
+
+    generations и modified - из get_versions или get_versioned.
+    """
+    etag = _etag(request, generations, per_user)
+    last_modified = datetime.fromtimestamp(modified, timezone.utc)
+    response = condition(
+        etag_func=lambda *args, **kwargs: etag,
+        last_modified_func=lambda *args, **kwargs: last_modified,
+    )(view)(request, *args, **kwargs)
+    # Без этого cache_page разрешил бы браузеру не спрашивать сервер
+    # весь timeout: клиент должен каждый раз сверять ETag.
+    if per_user:
+        patch_cache_control(response, max_age=0, private=True)
+    else:
+        patch_cache_control(response, max_age=0)
+    return response
+
+
+def _replica_lag_limited(view, timeout):
+    """view, ответ которой после чтения с отставшей реплики кэшируется
+    не дольше replicas.cache_timeout.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        limit = replicas.cache_timeout(timeout)
+        if limit != timeout:
+            # cache_page берет timeout из max-age ответа
+            max_age = get_max_age(response)
+            patch_cache_control(
+                response,
+                max_age=limit if max_age is None else min(max_age, limit),
+            )
+        return response
+    return wrapper
+
+
+def cache_page_versioned(timeout, *scopes, per_user=True):
+    """cache_page, в префикс ключа которого входят поколения scopes.
+
+    Область - строка-шаблон, которая форматируется аргументами view
+    ('group:{slug}'), или функция, получающая эти аргументы. Ответ
+    получает ETag и Last-Modified по тем же поколениям; per_user=False -
+    ответ не зависит от пользователя (JSON API).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            generations, modified = get_versions(
+                _resolve(scopes, request, kwargs)
+            )
+            key_prefix = _key_prefix(request, generations, per_user)
+            cached_view = cache_page(timeout, key_prefix=key_prefix)(
+                _replica_lag_limited(view, timeout)
+            )
+            return conditional_response(cached_view, request, args,
+                                        kwargs, generations, modified,
+                                        per_user)
+        return wrapper
+    return decorator
+
+
+def condition_versioned(*scopes, per_user=True):
+    """Только условный GET по поколениям scopes, без кэша страницы."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            generations, modified = get_versions(
+                _resolve(scopes, request, kwargs)
+            )
+            return conditional_response(view, request, args, kwargs,
+                                        generations, modified, per_user)
+        return wrapper
+    return decorator
+
+
+def post_author_scope(post_id):
+    """Область профиля автора поста: счетчик его постов на странице поста.
+
+    Имя автора запоминается в кэше, чтобы не читать пост из БД до
+    проверки кэша страницы.
+    """
+    key = f'posts:author-of:{post_id}'
+    username = cache.get(key)
+    if username is None:
+        # Без ORDER BY: first() добавил бы сортировку одной строки
+        usernames = list(Post.objects.filter(pk=post_id).order_by(
+        ).values_list('author__username', flat=True)[:1])
+        if not usernames:
+            return post_scope(post_id)
+        username = usernames[0]
+        cache.set(key, username, timeout=None)
+    return profile_scope(username)
@@ -0,0 +1,59 @@
+"""Карточки постов для лент, подготовленные на всю страницу сразу.
+
+Шаблон карточки не вызывает {% url %} и не ищет миниатюру для каждого
+поста: адреса считаются здесь (reverse один раз на автора, группу и
+пост), а миниатюры всех картинок страницы читаются одним запросом к
+кэшу (thumbnails.ensure_thumbnails).
+"""
+from django.templatetags.static import static
+from django.urls import reverse
+
+from .thumbnails import ensure_thumbnails
+
+PLACEHOLDER = 'img/placeholder.svg'
+
+
+class PostCard:
+    def __init__(self, post, url, author_url, group_url, image_url,
+                 group_footer):
+        self.post = post
+        self.url = url
+        self.author_url = author_url
+        self.group_url = group_url
+        self.image_url = image_url
+        # Ссылка на все записи группы не нужна на странице самой группы
+        self.group_footer = group_footer
+
+
+def build_cards(posts, view_name=None):
+    """PostCard для каждого поста страницы в том же порядке."""
+    posts = list(posts)
+    urls = {}
+
+    def url(name, arg):
+        if (name, arg) not in urls:
+            urls[name, arg] = reverse(name, args=[arg])
+        return urls[name, arg]
+
+    thumbnails = ensure_thumbnails(
+        [post.image.name for post in posts if post.image], 'card'
+    )
+    placeholder = static(PLACEHOLDER)
+    cards = []
+    for post in posts:
+        image_url = None
+        if post.image:
+            thumbnail = thumbnails[post.image.name]
+            image_url = thumbnail.url if thumbnail else placeholder
+        group_url = None
+        if post.group_id is not None:
+            group_url = url('posts:group_list', post.group.slug)
+        cards.append(PostCard(
+            post,
+            url('posts:posts', post.pk),
+            url('posts:profile', post.author.username),
+            group_url,
+            image_url,
+            group_url is not None and view_name != 'posts:group_list',
+        ))
+    return cards
@@ -0,0 +1,176 @@
+"""Ленты RSS и Atom: общая, группы и автора.
+
+XML отдается потоком (StreamingHttpResponse): заголовок ленты и каждая
+запись уходят клиенту по мере генерации, а собранный ответ после
+последней части сохраняется в кэш под поколениями тех же областей, что
+и HTML-страница (posts.cache). Опрос ленты - одно чтение кэша: номера
+поколений и готовый XML читаются вместе (get_versioned), а при
+совпадении ETag клиент получает 304.
+"""
+import io
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import (Atom1Feed, Rss201rev2Feed,
+                                        SimplerXMLGenerator)
+from django.utils.text import Truncator
+
+from .cache import (FEED_SCOPE, conditional_response, get_versioned,
+                    group_scope, profile_scope, set_versioned)
+from .models import Group, Post, User
+
+FEED_ITEMS = getattr(settings, 'FEED_ITEMS', 20)
+
+
+class StreamingFeedMixin:
+    """write() генератора лент по частям: начало, записи, конец.
+
+    Начало и конец документа пишут start_document(handler) и
+    end_document(handler) класса формата.
+    """
+
+    item_element = None
+
+    def stream(self, encoding='utf-8'):
+        buffer = io.StringIO()
+        handler = SimplerXMLGenerator(buffer, encoding)
+
+        def flush():
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return data.encode(encoding)
+
+        self.start_document(handler)
+        yield flush()
+        for item in self.items:
+            handler.startElement(self.item_element, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield flush()
+        self.end_document(handler)
+        yield flush()
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+    def start_document(self, handler):
+        handler.startDocument()
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_document(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+    def start_document(self, handler):
+        handler.startDocument()
+        handler.startElement('feed', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_document(self, handler):
+        handler.endElement('feed')
+
+
+FORMATS = {
+    'rss': StreamingRssFeed,
+    'atom': StreamingAtomFeed,
+}
+
+
+def build_feed(request, feed_format, title, page_url, posts):
+    """Лента из последних FEED_ITEMS постов posts."""
+    absolute = request.build_absolute_uri
+    feed = FORMATS[feed_format](
+        title=title,
+        link=absolute(page_url),
+        description=title,
+        feed_url=absolute(request.path),
+        language='ru',
+    )
+    for post in posts.feed()[:FEED_ITEMS]:
+        link = absolute(reverse('posts:posts', args=[post.pk]))
+        feed.add_item(
+            title=Truncator(post.text).chars(60),
+            link=link,
+            description=post.text,
+            author_name=post.author.get_full_name() or post.author.username,
+            author_link=absolute(
+                reverse('posts:profile', args=[post.author.username])
+            ),
+            pubdate=post.pub_date,
+            unique_id=link,
+            categories=[post.group.title] if post.group_id else None,
+        )
+    return feed
+
+
+def _cache_stream(chunks, key, generations):
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    set_versioned(key, generations, b''.join(parts))
+
+
+def feed_response(request, name, scopes, feed_format, build):
+    """Ответ с лентой build() из кэша или потоком с записью в кэш."""
+    # В XML абсолютные ссылки, поэтому хост входит в ключ
+    key = f'posts:feed:{name}:{feed_format}:{request.get_host()}'
+    generations, modified, body = get_versioned(key, scopes)
+    content_type = FORMATS[feed_format].content_type
+
+    def view(request):
+        if body is not None:
+            return HttpResponse(body, content_type=content_type)
+        feed = build()
+        return StreamingHttpResponse(
+            _cache_stream(feed.stream(), key, generations),
+            content_type=content_type,
+        )
+    return conditional_response(view, request, (), {}, generations,
+                                modified, per_user=False)
+
+
+def index_feed(request, feed_format):
+    return feed_response(
+        request, 'index', [FEED_SCOPE], feed_format,
+        lambda: build_feed(
+            request, feed_format, 'Последние обновления на сайте',
+            reverse('posts:index'), Post.objects.all(),
+        ),
+    )
+
+
+def group_feed(request, slug, feed_format):
+    def build():
+        group = get_object_or_404(Group, slug=slug)
+        return build_feed(
+            request, feed_format, group.title,
+            reverse('posts:group_list', args=[slug]), group.posts.all(),
+        )
+    return feed_response(
+        request, f'group:{slug}', [group_scope(slug)], feed_format, build
+    )
+
+
+def profile_feed(request, username, feed_format):
+    def build():
+        author = get_object_or_404(User, username=username)
+        return build_feed(
+            request, feed_format,
+            f'Посты пользователя {author.get_full_name() or username}',
+            reverse('posts:profile', args=[username]), author.posts.all(),
+        )
+    return feed_response(
+        request, f'profile:{username}', [profile_scope(username)],
+        feed_format, build,
+    )
@@ -1,9 +1,32 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Comment, Post
+from .images import ingest_image
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
+    ingested_image = None
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            self.ingested_image = ingest_image(image)
+            return self.ingested_image.file
+        return image
+
+    def save(self, commit=True):
+        post = super().save(commit=False)
+        if self.ingested_image is not None:
+            post.image_width = self.ingested_image.width
+            post.image_height = self.ingested_image.height
+        elif not post.image:
+            post.image_width = post.image_height = None
+        if commit:
+            post.save()
+            self._save_m2m()
+        return post
+
     class Meta:
         model = Post
         fields = [
@@ -31,3 +54,12 @@ class CommentForm(forms.ModelForm):
                                    ),
 
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200, required=False)
+    group = forms.ModelChoiceField(
+        Group.objects.all(), to_field_name='slug', required=False,
+        label='Группа', empty_label='Все группы',
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
@@ -0,0 +1,109 @@
+"""Прием картинок постов.
+
+Загрузка приходит во временный файл (TemporaryFileUploadHandler), а не
+в память. Размер в пикселях проверяется по заголовку до декодирования,
+JPEG декодируется сразу в уменьшенном масштабе (draft), затем картинка
+ужимается до POST_IMAGE_MAX_SIDE, теряет метаданные (EXIF, GPS, ICC
+и т.п.) и перекодируется. В хранилище попадает файл ограниченного
+размера, поэтому и миниатюры потом строятся быстро.
+"""
+import logging
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+POST_IMAGE_MAX_UPLOAD_SIZE = getattr(
+    settings, 'POST_IMAGE_MAX_UPLOAD_SIZE', 20 * 1024 * 1024
+)
+POST_IMAGE_MAX_PIXELS = getattr(settings, 'POST_IMAGE_MAX_PIXELS', 40000000)
+POST_IMAGE_MAX_SIDE = getattr(settings, 'POST_IMAGE_MAX_SIDE', 1920)
+POST_IMAGE_QUALITY = getattr(settings, 'POST_IMAGE_QUALITY', 85)
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+class IngestedImage:
+    """Результат приема: файл для ImageField и его параметры."""
+
+    def __init__(self, file, width, height, size):
+        self.file = file
+        self.width = width
+        self.height = height
+        self.size = size
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def ingest_image(upload):
+    """Проверяет и перекодирует загруженную картинку.
+
+    Возвращает IngestedImage или поднимает ValidationError.
+    """
+    if upload.size > POST_IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': POST_IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)},
+        )
+    upload.seek(0)
+    try:
+        # open читает только заголовок: пиксели еще не декодированы
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Не удалось прочитать картинку.',
+                              code='invalid_image')
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Поддерживаются только JPEG, PNG, GIF и WEBP.',
+            code='invalid_format',
+        )
+    source_width, source_height = image.size
+    if source_width * source_height > POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)d мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': POST_IMAGE_MAX_PIXELS // 1000000},
+        )
+
+    side = POST_IMAGE_MAX_SIDE
+    # Для JPEG декодер сразу уменьшает картинку в 2-8 раз
+    image.draft('RGB', (side, side))
+    try:
+        image = ImageOps.exif_transpose(image)
+        keep_alpha = _has_alpha(image)
+        image = image.convert('RGBA' if keep_alpha else 'RGB')
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError('Не удалось прочитать картинку.',
+                              code='invalid_image')
+    image.thumbnail((side, side), Image.LANCZOS)
+
+    # Сохраняем без exif/icc_profile/pnginfo: метаданные отбрасываются
+    output = SpooledTemporaryFile(max_size=1024 * 1024)
+    if keep_alpha:
+        image.save(output, 'PNG', optimize=True)
+        extension = '.png'
+    else:
+        image.save(output, 'JPEG', quality=POST_IMAGE_QUALITY,
+                   optimize=True, progressive=True)
+        extension = '.jpg'
+    size = output.tell()
+    output.seek(0)
+
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    logger.info(
+        'Картинка %s: %dx%d, %d байт -> %s: %dx%d, %d байт',
+        upload.name, source_width, source_height, upload.size,
+        name, image.width, image.height, size,
+    )
+    return IngestedImage(File(output, name=name), image.width, image.height,
+                         size)
@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+
+FEED_INBOX_SIZE = getattr(settings, 'FEED_INBOX_SIZE', 1000)
+# Посты авторов с большим числом подписчиков по лентам не раскладываются:
+# подписчики читают их из кольца автора (posts.timeline)
+FEED_FANOUT_LIMIT = getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+# Пользователей в одном DELETE: у SQLite не больше 999 параметров
+TRIM_BATCH_SIZE = 500
+
+
+def is_pulled(author_id):
+    """Ленты подписчиков автора читают его посты из кольца."""
+    return AuthorStats.objects.filter(
+        user_id=author_id, followers_count__gt=FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def pulled_author_ids_of(author_ids):
+    """Популярные авторы из author_ids."""
+    return AuthorStats.objects.filter(
+        user_id__in=author_ids, followers_count__gt=FEED_FANOUT_LIMIT
+    ).values_list('user_id', flat=True)
+
+
+def pulled_author_ids(user_id):
+    """Авторы из подписок user_id, чьи посты читаются из колец."""
+    return list(
+        Follow.objects.filter(
+            user_id=user_id,
+            author__stats__followers_count__gt=FEED_FANOUT_LIMIT,
+        ).values_list('author_id', flat=True)
+    )
+
+
+def trim_inboxes(user_ids, size=FEED_INBOX_SIZE):
+    """Оставляет в лентах пользователей только size последних записей.
+
+    Один DELETE на пачку пользователей; записи нумеруются по
+    (pub_date, post_id), поэтому при равных pub_date граница точная,
+    а ленты не длиннее size не трогаются.
+    """
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), TRIM_BATCH_SIZE):
+        batch = user_ids[start:start + TRIM_BATCH_SIZE]
+        placeholders = ', '.join(['%s'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                ' SELECT id FROM ('
+                '  SELECT id, ROW_NUMBER() OVER ('
+                '   PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+                '  ) AS position'
+                f'  FROM {table} WHERE user_id IN ('
+                f'   SELECT user_id FROM {table}'
+                f'   WHERE user_id IN ({placeholders})'
+                '   GROUP BY user_id HAVING COUNT(*) > %s'
+                '  )'
+                ' ) WHERE position > %s'
+                ')',
+                [*batch, size, size],
+            )
+
+
+def trim_inbox(user_id, size=FEED_INBOX_SIZE):
+    """Оставляет в ленте пользователя только size последних записей."""
+    trim_inboxes([user_id], size)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            'user_id', flat=True
+        )
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids
+        ],
+        ignore_conflicts=True,
+    )
+    trim_inboxes(follower_ids)
+
+
+def backfill_inbox(user_id, author_id, size=FEED_INBOX_SIZE):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:size]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim_inbox(user_id, size)
+
+
+def stopped_pulling(author_id):
+    """Отписка только что опустила число подписчиков автора до
+    FEED_FANOUT_LIMIT: его посты снова раскладываются по лентам.
+    """
+    return AuthorStats.objects.filter(
+        user_id=author_id, followers_count=FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def backfill_followers(author_id, size=FEED_INBOX_SIZE):
+    """Добавляет последние size постов автора в ленты всех его подписчиков.
+
+    Нужна, когда автор перестал быть популярным: посты, вышедшие, пока
+    ленты читали их из кольца, в FeedEntry не попали. Одна вставка
+    INSERT ... SELECT и обрезка лент до size.
+    """
+    if is_pulled(author_id):
+        return
+    quote = connection.ops.quote_name
+    entries = quote(FeedEntry._meta.db_table)
+    follows = quote(Follow._meta.db_table)
+    posts = quote(Post._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR IGNORE INTO {entries} (user_id, post_id, pub_date)'
+            ' SELECT follow.user_id, post.id, post.pub_date'
+            f' FROM {follows} AS follow, ('
+            f'  SELECT id, pub_date FROM {posts}'
+            '  WHERE author_id = %s AND deleted_at IS NULL'
+            '  ORDER BY pub_date DESC, id DESC LIMIT %s'
+            ' ) AS post'
+            ' WHERE follow.author_id = %s',
+            [author_id, size, author_id],
+        )
+    trim_inboxes(
+        Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        ),
+        size,
+    )
+
+
+def prune_inbox(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild_inbox(user_id, size=FEED_INBOX_SIZE):
+    """Пересобирает ленту пользователя с нуля по таблице подписок."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author__following__user_id=user_id
+    ).exclude(
+        author__stats__followers_count__gt=FEED_FANOUT_LIMIT
+    ).values_list('pk', 'pub_date')[:size]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
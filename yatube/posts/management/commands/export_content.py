@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import MODELS, export_lines
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSONL '
+            'кусками по первичному ключу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='Файл для выгрузки ("-" - стандартный вывод).'
+        )
+        parser.add_argument(
+            '--models', default=','.join(MODELS),
+            help='Какие модели выгрузить, через запятую: %s.'
+                 % ', '.join(MODELS)
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Сколько строк читать из БД за раз.'
+        )
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['models'].split(',')]
+        unknown = set(names) - set(MODELS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные модели: ' + ', '.join(sorted(unknown))
+            )
+        # Порядок выгрузки - порядок MODELS, чтобы загрузка видела ссылки
+        names = [name for name in MODELS if name in names]
+        lines = export_lines(names, options['chunk_size'])
+        if options['output'] == '-':
+            sys.stdout.writelines(lines)
+            return
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stderr.write(f'Выгружено записей: {count}')
@@ -0,0 +1,60 @@
+import os
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts.transfer import Importer
+
+
+class Command(BaseCommand):
+    help = ('Загружает JSONL из export_content пачками bulk_create и '
+            'пересобирает ленты, счетчики и поисковый индекс.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл, созданный export_content.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько строк записывать в одной транзакции.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки (по умолчанию <input>.checkpoint).'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Загрузить файл с начала, не глядя на контрольную точку.'
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересобирать производные таблицы после загрузки.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['checkpoint'] or options['input'] + '.checkpoint'
+        start = 0
+        if os.path.exists(path) and not options['restart']:
+            with open(path) as checkpoint:
+                start = int(checkpoint.read().strip() or 0)
+            self.stdout.write(f'Продолжаем после строки {start}')
+
+        def save_checkpoint(number):
+            with open(path, 'w') as checkpoint:
+                checkpoint.write(str(number))
+
+        importer = Importer(options['batch_size'])
+        with open(options['input'], encoding='utf-8') as lines:
+            last = importer.load(lines, start, save_checkpoint)
+        for name, count in importer.loaded.items():
+            self.stdout.write(f'{name}: {count}')
+        if importer.skipped:
+            self.stdout.write(
+                f'Пропущено записей без пользователя: {importer.skipped}'
+            )
+        self.stdout.write(f'Загружено строк: {last}')
+        if not options['skip_rebuild']:
+            # Сигналы при bulk_create не срабатывают
+            for command in ('rebuild_feeds', 'recount_stats',
+                            'rebuild_search_index'):
+                call_command(command, stdout=self.stdout)
+            cache.clear()
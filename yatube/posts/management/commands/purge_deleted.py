@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.purge import (PURGE_BATCH_SIZE, PURGE_BATCH_TIME, PURGE_PAUSE,
+                         Purger)
+
+
+class Command(BaseCommand):
+    help = ('Удаляет помеченные посты и пользователей вместе со связанными '
+            'строками и картинками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=PURGE_BATCH_SIZE,
+            help='Наибольшее число строк в одной транзакции.'
+        )
+        parser.add_argument(
+            '--batch-time', type=float, default=PURGE_BATCH_TIME,
+            help='Желаемая длительность транзакции, секунд.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=PURGE_PAUSE,
+            help='Пауза между транзакциями, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        deleted = Purger(
+            options['batch_size'], options['batch_time'], options['pause']
+        ).run()
+        for name, count in deleted.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(f'Удалено строк: {sum(deleted.values())}')
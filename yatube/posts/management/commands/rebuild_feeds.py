@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.inbox import FEED_INBOX_SIZE, rebuild_inbox
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок (FeedEntry) по таблице Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пересобрать только ленты этих пользователей.'
+        )
+        parser.add_argument(
+            '--size', type=int, default=FEED_INBOX_SIZE,
+            help='Сколько последних записей хранить в ленте.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько пользователей читать из БД за раз.'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        last_pk, rebuilt = 0, 0
+        while True:
+            chunk = list(
+                users.filter(pk__gt=last_pk).values_list('pk', flat=True)[
+                    :options['chunk_size']
+                ]
+            )
+            if not chunk:
+                break
+            for user_id in chunk:
+                with transaction.atomic():
+                    rebuild_inbox(user_id, options['size'])
+            last_pk = chunk[-1]
+            rebuilt += len(chunk)
+        self.stdout.write(f'Пересобрано лент: {rebuilt}')
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.stats import recount_comments, recount_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счетчики AuthorStats и Post.comments_count с таблицами '
+            'постов, подписок и комментариев.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько пользователей или постов пересчитывать за раз.'
+        )
+
+    def handle(self, *args, **options):
+        last_pk, recounted = 0, 0
+        while True:
+            chunk = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', flat=True
+                )[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                recounted += recount_stats(chunk)
+            last_pk = chunk[-1]
+        self.stdout.write(f'Пересчитано пользователей: {recounted}')
+        last_pk, recounted = 0, 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', flat=True
+                )[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            recounted += recount_comments(
+                Post.objects.filter(pk__range=(chunk[0], chunk[-1]))
+            )
+            last_pk = chunk[-1]
+        self.stdout.write(f'Пересчитано постов: {recounted}')
@@ -4,6 +4,36 @@ from django.db import models
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    """Заготовки запросов под шаблоны, которые выводят посты."""
+
+    def feed(self):
+        """Лента: карточка поста читает автора и группу."""
+        return self.select_related('author', 'group')
+
+    def detail(self):
+        """Страница поста: автор, его счетчики и группа."""
+        return self.select_related('author__stats', 'group')
+
+    def for_admin(self):
+        """Список в админке: столбцы author и group."""
+        return self.select_related('author', 'group')
+
+    def inbox(self, user):
+        """Посты из ленты подписок user в порядке записей FeedEntry."""
+        return self.filter(feed_entries__user=user).order_by(
+            models.F('feed_entries__pub_date').desc(),
+            models.F('feed_entries__post').desc(),
+        )
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
+    """Посты без удаленных: строки с deleted_at ждут фоновой очистки."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at=None)
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -29,12 +59,45 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    image_width = models.PositiveIntegerField(null=True, blank=True,
+                                              editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True,
+                                               editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = PostManager()
+    all_objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        # Индексы лент частичные: помеченные строки в них не попадают, а
+        # запросы Post.objects с условием deleted_at IS NULL их используют
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_date_idx',
+                condition=models.Q(deleted_at=None)
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+                condition=models.Q(deleted_at=None)
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+                condition=models.Q(deleted_at=None)
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                name='post_deleted_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
+        ]
 
 
 class Group(models.Model):
@@ -63,6 +126,14 @@ class Comment(models.Model):
         related_name='comments'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -76,5 +147,81 @@ class Follow(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+
     def __str__(self):
         return f'{self.user.username} > подписан на > {self.author.username}'
+
+
+class FeedEntry(models.Model):
+    """Запись в ленте подписок пользователя (fan-out on write).
+
+    Заполняется сигналами при публикации поста и подписке, поэтому лента
+    читается одним диапазоном по индексу (user, pub_date).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_entry_user_date_idx'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счетчики пользователя для страниц профиля и поста.
+
+    Обновляются сигналами через F-выражения, сверяются командой
+    recount_stats.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class DeletedUser(models.Model):
+    """Пользователь, удаленный с сайта; его строки удалит posts.purge."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='deletion'
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Удален {self.user_id}'
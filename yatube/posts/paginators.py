@@ -0,0 +1,197 @@
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    raw = json.dumps(
+        [value.isoformat() if hasattr(value, 'isoformat') else value
+         for value in values],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """Распаковывает токен, созданный encode_cursor."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor(token)
+    decoded = []
+    for value in values:
+        if isinstance(value, str):
+            value = parse_datetime(value)
+            if value is None:
+                raise InvalidCursor(token)
+        elif not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise InvalidCursor(token)
+        decoded.append(value)
+    return decoded
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    В отличие от Page не знает общего числа объектов и номера страницы,
+    только токены соседних страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %d objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинация по ключу (keyset) без COUNT(*) и OFFSET.
+
+    Объекты упорядочены по убыванию полей ``ordering`` (последним должно
+    идти уникальное поле), поэтому запрос любой страницы - это
+    индексированное чтение диапазона ``WHERE key < cursor LIMIT n + 1``.
+    При ``descending=False`` порядок обратный - по возрастанию ключа.
+
+    ``ordering`` может быть словарем псевдоним -> выражение: тогда ключ
+    берется из аннотаций, например из полей связанной таблицы.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('pub_date', 'id'),
+                 descending=True):
+        if isinstance(ordering, dict):
+            queryset = queryset.annotate(**ordering)
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.descending = descending
+
+    def _order_by(self, forward):
+        prefix = '-' if forward == self.descending else ''
+        return [prefix + field for field in self.ordering]
+
+    def _seek(self, values, forward):
+        """Условие "строго после values" в направлении обхода."""
+        lookup = 'lt' if forward == self.descending else 'gt'
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            for prev_field, prev_value in zip(self.ordering[:position],
+                                              values[:position]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        return condition
+
+    def key(self, obj):
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.ordering]
+        return [getattr(obj, field) for field in self.ordering]
+
+    def cursor(self, obj):
+        """Токен ``after`` для страницы, следующей за объектом obj."""
+        return encode_cursor(self.key(obj))
+
+    def page(self, after=None, before=None):
+        """Возвращает страницу после токена ``after`` или до ``before``.
+
+        Некорректный токен трактуется как запрос первой страницы.
+        """
+        forward = before is None
+        token = after if forward else before
+        queryset = self.queryset
+        if token:
+            try:
+                values = decode_cursor(token, self.ordering)
+            except InvalidCursor:
+                token, forward = None, True
+            else:
+                queryset = queryset.filter(self._seek(values, forward))
+        rows = list(
+            queryset.order_by(*self._order_by(forward))[:self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, self, None, None)
+        first, last = encode_cursor(self.key(rows[0])), encode_cursor(
+            self.key(rows[-1]))
+        if forward:
+            next_cursor = last if has_more else None
+            previous_cursor = first if token else None
+        else:
+            next_cursor = last
+            previous_cursor = first if has_more else None
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def get_page(self, request):
+        return self.page(
+            after=request.GET.get(AFTER_PARAM),
+            before=request.GET.get(BEFORE_PARAM),
+        )
+
+
+class NumberedPaginator(Paginator):
+    """Пагинация по номеру страницы, совместимая с курсорной.
+
+    Объекты страницы несут ключ сортировки cursor_paginator, поэтому у
+    страницы есть next_cursor - переход в курсорный режим. COUNT(*)
+    считается по исходному queryset: аннотации ключа в нем не нужны.
+    """
+
+    def __init__(self, queryset, cursor_paginator):
+        super().__init__(cursor_paginator.queryset, cursor_paginator.per_page)
+        self.count_queryset = queryset
+        self.cursor_paginator = cursor_paginator
+
+    @cached_property
+    def count(self):
+        return self.count_queryset.count()
+
+    def page(self, number):
+        page = super().page(number)
+        page.next_cursor = None
+        if page.has_next():
+            page.next_cursor = self.cursor_paginator.cursor(page[-1])
+        return page
+
+
+def is_cursor_request(request):
+    return AFTER_PARAM in request.GET or BEFORE_PARAM in request.GET
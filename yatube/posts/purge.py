@@ -0,0 +1,231 @@
+"""Удаление постов и пользователей в два шага.
+
+Запрос на удаление только помечает строки: у поста ставится
+deleted_at, пользователь деактивируется и попадает в DeletedUser, а все
+его посты помечаются одним UPDATE. Менеджер Post.objects помеченных
+постов не видит, поэтому из лент, поиска и API они пропадают сразу, а
+запрос не держит блокировку записи SQLite на каскадном удалении.
+
+Строки, картинки и миниатюры удаляет фоновая очистка: небольшими
+пачками, каждая в своей транзакции, с паузой между пачками, чтобы другие
+писатели успевали получить блокировку. Размер пачки подстраивается так,
+чтобы транзакция укладывалась в PURGE_BATCH_TIME секунд. Обработчики
+удаления комментариев и подписок на время очистки отключены: счетчики
+пачки пересчитываются парой запросов, а кэш страниц сбрасывается один
+раз в конце прохода.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_thumbnails
+
+from core.tasks import submit_on_commit
+
+from . import inbox, search, timeline
+from .cache import (FEED_SCOPE, bump_generations, group_scope, post_scope,
+                    profile_scope)
+from .models import (AuthorStats, Comment, DeletedUser, FeedEntry, Follow,
+                     Post, User)
+from .signals import deletions_muted, post_scopes
+from .stats import change_stats, recount_comments, recount_stats
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = getattr(settings, 'PURGE_BATCH_SIZE', 500)
+PURGE_BATCH_TIME = getattr(settings, 'PURGE_BATCH_TIME', 0.1)
+PURGE_PAUSE = getattr(settings, 'PURGE_PAUSE', 0.05)
+
+_running = threading.Lock()
+_requested = threading.Event()
+
+
+def delete_post(post):
+    """Помечает пост удаленным и ставит очистку после коммита."""
+    with transaction.atomic():
+        if not Post.objects.filter(pk=post.pk).update(
+            deleted_at=timezone.now()
+        ):
+            return
+        search.unindex_post(post.pk)
+        change_stats(post.author_id, posts_count=-1)
+    timeline.forget_ring(post.author_id)
+    bump_generations(*post_scopes(post))
+    submit_on_commit(purge_deleted)
+
+
+def delete_user(user):
+    """Деактивирует пользователя, скрывает его посты, ставит очистку.
+
+    Страницы постов пользователя зависят от области его профиля
+    (post_author_scope), поэтому достаточно сбросить ее, ленту и группы.
+    """
+    with transaction.atomic():
+        _, created = DeletedUser.objects.get_or_create(user=user)
+        if not created:
+            return
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        user.is_active = False
+        slugs = set(
+            Post.objects.filter(author=user).exclude(group=None).values_list(
+                'group__slug', flat=True
+            )
+        )
+        search.unindex_author(user.pk)
+        Post.objects.filter(author=user).update(deleted_at=timezone.now())
+        AuthorStats.objects.filter(user=user).update(posts_count=0)
+    timeline.forget_ring(user.pk)
+    bump_generations(
+        FEED_SCOPE, profile_scope(user.username),
+        *[group_scope(slug) for slug in slugs]
+    )
+    submit_on_commit(purge_deleted)
+
+
+def _purge_steps():
+    """Что удалять, в порядке очистки: сначала зависимые строки."""
+    deleted_posts = {'post__deleted_at__isnull': False}
+    return (
+        ('feed entries', FeedEntry.objects.filter(**deleted_posts)),
+        ('feed entries', FeedEntry.objects.filter(
+            user__deletion__isnull=False
+        )),
+        ('comments', Comment.objects.filter(**deleted_posts)),
+        ('comments', Comment.objects.filter(author__deletion__isnull=False)),
+        ('follows', Follow.objects.filter(user__deletion__isnull=False)),
+        ('follows', Follow.objects.filter(author__deletion__isnull=False)),
+        ('posts', Post.all_objects.filter(deleted_at__isnull=False)),
+        ('users', User.objects.filter(deletion__isnull=False)),
+    )
+
+
+def delete_images(names):
+    """Удаляет картинки и их миниатюры, если на них не ссылаются посты."""
+    used = set(
+        Post.all_objects.filter(image__in=names).values_list(
+            'image', flat=True
+        )
+    )
+    for name in set(names) - used:
+        try:
+            delete_thumbnails(name)
+        except Exception:
+            logger.exception('Не удалось удалить картинку %s', name)
+
+
+class Purger:
+    """Удаляет помеченные строки пачками с паузами между транзакциями."""
+
+    def __init__(self, batch_size=PURGE_BATCH_SIZE,
+                 batch_time=PURGE_BATCH_TIME, pause=PURGE_PAUSE):
+        self.max_batch_size = batch_size
+        self.batch_size = batch_size
+        self.batch_time = batch_time
+        self.pause = pause
+        self.deleted = {}
+        self.scopes = set()
+
+    def purge_batch(self):
+        """Удаляет одну пачку; False - удалять больше нечего."""
+        started = time.perf_counter()
+        for name, queryset in _purge_steps():
+            ids = list(
+                queryset.order_by().values_list('pk', flat=True)[
+                    :self.batch_size
+                ]
+            )
+            if ids:
+                break
+        else:
+            return False
+        model = queryset.model
+        images = []
+        if model is Post:
+            images = list(
+                Post.all_objects.filter(pk__in=ids).exclude(
+                    image=''
+                ).values_list('image', flat=True)
+            )
+        with transaction.atomic(), deletions_muted():
+            recount = self._affected(model, ids)
+            model._base_manager.filter(pk__in=ids).delete()
+            recount()
+        self._resize(time.perf_counter() - started)
+        self.deleted[name] = self.deleted.get(name, 0) + len(ids)
+        if images:
+            delete_images(images)
+        return True
+
+    def _affected(self, model, ids):
+        """Запоминает области кэша, которые задевает удаление строк ids,
+        и возвращает пересчет их счетчиков после удаления.
+        """
+        if model is Comment:
+            rows = Comment.objects.filter(pk__in=ids).values_list(
+                'author_id', 'post_id'
+            )
+            user_ids = {author_id for author_id, _ in rows}
+            post_ids = {post_id for _, post_id in rows}
+            self.scopes.update(post_scope(post_id) for post_id in post_ids)
+
+            def recount():
+                recount_stats(user_ids)
+                recount_comments(Post.objects.filter(pk__in=post_ids))
+            return recount
+        if model is Follow:
+            rows = Follow.objects.filter(pk__in=ids).values_list(
+                'user_id', 'user__username', 'author_id', 'author__username'
+            )
+            user_ids, author_ids = set(), set()
+            for user_id, username, author_id, author in rows:
+                user_ids.update((user_id, author_id))
+                author_ids.add(author_id)
+                self.scopes.update(
+                    (profile_scope(username), profile_scope(author))
+                )
+            pulled = set(inbox.pulled_author_ids_of(author_ids))
+
+            def recount():
+                recount_stats(user_ids)
+                # Как в signals.follow_deleted: автор перестал быть
+                # популярным - его посты снова нужны в лентах
+                for author_id in pulled:
+                    if not inbox.is_pulled(author_id):
+                        submit_on_commit(inbox.backfill_followers, author_id)
+            return recount
+        return lambda: None
+
+    def _resize(self, elapsed):
+        if elapsed > self.batch_time:
+            self.batch_size = max(1, self.batch_size // 2)
+        elif elapsed < self.batch_time / 4:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    def run(self):
+        """Чистит, пока есть что удалять; возвращает счетчики по видам."""
+        try:
+            while self.purge_batch():
+                time.sleep(self.pause)
+        finally:
+            if self.scopes:
+                bump_generations(*self.scopes)
+                self.scopes = set()
+        return self.deleted
+
+
+def purge_deleted():
+    """Фоновая задача очистки.
+
+    В процессе работает одна очистка; запрос, пришедший во время ее
+    работы, она выполнит еще одним проходом.
+    """
+    _requested.set()
+    while _requested.is_set() and _running.acquire(blocking=False):
+        try:
+            _requested.clear()
+            Purger().run()
+        finally:
+            _running.release()
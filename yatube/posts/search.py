@@ -0,0 +1,167 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Текст поста хранится в виртуальной таблице posts_post_fts, rowid строки
+равен id поста. Сигналы обновляют строку при сохранении и удалении
+поста, команда rebuild_search_index пересобирает таблицу целиком.
+Результаты упорядочены по bm25 (меньше - лучше) и id, поэтому страницы
+выдаются по ключу (rank, id) без OFFSET.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .paginators import (AFTER_PARAM, BEFORE_PARAM, CursorPage,
+                         InvalidCursor, decode_cursor, encode_cursor)
+
+SEARCH_TABLE = 'posts_post_fts'
+
+TERM = re.compile(r'\w+')
+
+
+def build_match(query):
+    """Выражение MATCH из пользовательского запроса.
+
+    Каждое слово берется в кавычки, поэтому синтаксис FTS5 (AND, NEAR,
+    скобки, двоеточия) в запросе не работает и не приводит к ошибке.
+    Последнее слово ищется как префикс. Пустая строка - нечего искать.
+    """
+    terms = TERM.findall(query)
+    if not terms:
+        return ''
+    quoted = ['"%s"' % term for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def index_post(post):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, text)'
+            ' VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def unindex_author(author_id):
+    """Убирает из индекса все посты автора одним запросом."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN'
+            ' (SELECT id FROM posts_post WHERE author_id = %s)',
+            [author_id],
+        )
+
+
+def rebuild_index():
+    """Заполняет индекс заново по таблице постов, возвращает число строк."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text)'
+            ' SELECT id, text FROM posts_post WHERE deleted_at IS NULL'
+        )
+        indexed = cursor.rowcount
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
+
+
+def matching_ids(query):
+    """Подзапрос id постов, подходящих под запрос, для filter(pk__in=)."""
+    return RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        (build_match(query),),
+    )
+
+
+class SearchPaginator:
+    """Постраничная выдача результатов поиска по ключу (rank, id)."""
+
+    ordering = ('rank', 'id')
+
+    def __init__(self, queryset, query, per_page, group_id=None,
+                 author_id=None):
+        self.queryset = queryset
+        self.match = build_match(query)
+        self.per_page = int(per_page)
+        self.group_id = group_id
+        self.author_id = author_id
+
+    def _ranked(self, values, forward):
+        """Список (id, rank) следующих per_page + 1 результатов."""
+        where = [f'{SEARCH_TABLE} MATCH %s']
+        params = [self.match]
+        if self.group_id is not None:
+            where.append('p.group_id = %s')
+            params.append(self.group_id)
+        if self.author_id is not None:
+            where.append('p.author_id = %s')
+            params.append(self.author_id)
+        rank = f'bm25({SEARCH_TABLE})'
+        if values is not None:
+            sign = '>' if forward else '<'
+            where.append(
+                f'({rank} {sign} %s OR ({rank} = %s AND p.id {sign} %s))'
+            )
+            params += [values[0], values[0], values[1]]
+        direction = '' if forward else ' DESC'
+        sql = (
+            f'SELECT p.id, {rank} AS rank FROM {SEARCH_TABLE}'
+            f' JOIN posts_post p ON p.id = {SEARCH_TABLE}.rowid'
+            f' WHERE {" AND ".join(where)}'
+            f' ORDER BY rank{direction}, p.id{direction} LIMIT %s'
+        )
+        params.append(self.per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def page(self, after=None, before=None):
+        """Страница после токена after или до before."""
+        if not self.match:
+            return CursorPage([], self, None, None)
+        forward = before is None
+        token = after if forward else before
+        values = None
+        if token:
+            try:
+                values = decode_cursor(token, self.ordering)
+            except InvalidCursor:
+                token, forward = None, True
+        rows = self._ranked(values, forward)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        if not rows:
+            return CursorPage([], self, None, None)
+        posts = self.queryset.in_bulk([post_id for post_id, _ in rows])
+        object_list = []
+        for post_id, rank in rows:
+            if post_id in posts:
+                posts[post_id].search_rank = rank
+                object_list.append(posts[post_id])
+        first = encode_cursor([rows[0][1], rows[0][0]])
+        last = encode_cursor([rows[-1][1], rows[-1][0]])
+        if forward:
+            next_cursor = last if has_more else None
+            previous_cursor = first if token else None
+        else:
+            next_cursor = last
+            previous_cursor = first if has_more else None
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
+
+    def get_page(self, request):
+        return self.page(
+            after=request.GET.get(AFTER_PARAM),
+            before=request.GET.get(BEFORE_PARAM),
+        )
@@ -0,0 +1,158 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.tasks import submit_on_commit
+
+from . import inbox, search, timeline
+from .cache import (FEED_SCOPE, NAMES_SCOPE, bump_generations, group_scope,
+                    post_scope, profile_scope)
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .stats import change_comments_count, change_stats
+from .thumbnails import schedule_thumbnails
+
+_local = threading.local()
+
+
+@contextmanager
+def deletions_muted():
+    """Обработчики post_delete ничего не делают в этом потоке.
+
+    Для массовой очистки (purge): счетчики и кэш она обновляет сама,
+    на всю пачку сразу, а не на каждую строку.
+    """
+    _local.muted = True
+    try:
+        yield
+    finally:
+        _local.muted = False
+
+
+def _muted():
+    return getattr(_local, 'muted', False)
+
+
+def post_scopes(post):
+    scopes = [FEED_SCOPE, profile_scope(post.author.username)]
+    if post.pk is not None:
+        scopes.append(post_scope(post.pk))
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group.slug))
+    return scopes
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    # Вход сохраняет только last_login: кэш страниц не трогаем
+    if created or raw:
+        return
+    if update_fields is None or NAME_FIELDS & set(update_fields):
+        bump_generations(NAMES_SCOPE)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    # При смене группы сбрасываем и страницу прежней группы
+    if instance.pk is None or raw:
+        return
+    old_slug = Post.objects.filter(pk=instance.pk).exclude(
+        group_id=instance.group_id
+    ).values_list('group__slug', flat=True).first()
+    if old_slug is not None:
+        bump_generations(group_scope(old_slug))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        inbox.fan_out_post(instance)
+        timeline.forget_ring(instance.author_id)
+        change_stats(instance.author_id, posts_count=1)
+    schedule_thumbnails(instance.image)
+    bump_generations(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, update_fields=None, **kwargs):
+    # Индекс поиска нужен и для постов из фикстур (raw)
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    # Помеченный пост уже убран из индекса, счетчиков и кэша (purge)
+    if instance.deleted_at is not None or _muted():
+        return
+    search.unindex_post(instance.pk)
+    timeline.forget_ring(instance.author_id)
+    change_stats(instance.author_id, posts_count=-1)
+    bump_generations(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        inbox.backfill_inbox(instance.user_id, instance.author_id)
+        change_stats(instance.user_id, following_count=1)
+        change_stats(instance.author_id, followers_count=1)
+        bump_generations(
+            profile_scope(instance.user.username),
+            profile_scope(instance.author.username),
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if _muted():
+        return
+    inbox.prune_inbox(instance.user_id, instance.author_id)
+    change_stats(instance.user_id, following_count=-1)
+    change_stats(instance.author_id, followers_count=-1)
+    if inbox.stopped_pulling(instance.author_id):
+        # Посты, вышедшие, пока автор был популярным, есть только в его
+        # кольце; без них они пропали бы из лент подписчиков
+        submit_on_commit(inbox.backfill_followers, instance.author_id)
+    bump_generations(
+        profile_scope(instance.user.username),
+        profile_scope(instance.author.username),
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, comments_count=1)
+        change_comments_count(instance.post_id, 1)
+        bump_generations(post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if _muted():
+        return
+    change_stats(instance.author_id, comments_count=-1)
+    change_comments_count(instance.post_id, -1)
+    bump_generations(post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, raw=False, **kwargs):
+    # Название группы выводится в карточках всех лент и на страницах
+    # постов
+    if not raw:
+        bump_generations(NAMES_SCOPE, group_scope(instance.slug))
@@ -0,0 +1,79 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+STATS_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def _shifted(field, delta):
+    # Счетчик мог разойтись с таблицами (bulk_create, loaddata, загрузка
+    # без пересборки): уменьшение не опускает его ниже нуля
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def change_stats(user_id, **deltas):
+    """Атомарно сдвигает счетчики пользователя одним UPDATE.
+
+    Отсутствующую строку не создает: ее досчитает recount_stats или
+    первое чтение через stats_for.
+    """
+    AuthorStats.objects.filter(user_id=user_id).update(**{
+        field: _shifted(field, delta) for field, delta in deltas.items()
+    })
+
+
+def recount_stats(user_ids):
+    """Пересчитывает счетчики пользователей по исходным таблицам."""
+    user_ids = list(user_ids)
+    counts = {
+        user_id: {field: 0 for field in STATS_COUNTERS}
+        for user_id in user_ids
+    }
+    for field, (model, lookup) in STATS_COUNTERS.items():
+        rows = model.objects.filter(**{f'{lookup}__in': user_ids}).order_by(
+        ).values(lookup).annotate(total=Count('pk'))
+        for row in rows:
+            counts[row[lookup]][field] = row['total']
+    existing = AuthorStats.objects.in_bulk(user_ids)
+    missing = []
+    for user_id, values in counts.items():
+        stats = existing.get(user_id)
+        if stats is None:
+            missing.append(AuthorStats(user_id=user_id, **values))
+            continue
+        for field, value in values.items():
+            setattr(stats, field, value)
+    AuthorStats.objects.bulk_update(existing.values(), list(STATS_COUNTERS))
+    AuthorStats.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(counts)
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shifted('comments_count', delta)
+    )
+
+
+def recount_comments(posts):
+    """Пересчитывает Post.comments_count для постов queryset posts."""
+    counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(total=Count('pk')).values('total')
+    return posts.update(comments_count=Coalesce(Subquery(counts), 0))
+
+
+def stats_for(user):
+    """Счетчики пользователя; недостающую строку досчитывает на лету."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        recount_stats([user.pk])
+        return AuthorStats.objects.get(user_id=user.pk)
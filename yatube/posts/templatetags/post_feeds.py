@@ -0,0 +1,42 @@
+from django import template
+
+from ..cards import build_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов ленты, подготовленные на всю страницу.
+
+    {% post_cards page_obj as cards %}
+    """
+    match = getattr(context.get('request'), 'resolver_match', None)
+    return build_cards(posts, match.view_name if match else None)
+
+
+@register.inclusion_tag('includes/post_card.html')
+def post_card(card):
+    """{% post_card card %}"""
+    return {'card': card}
+
+
+@register.simple_tag
+def page_window(page_obj, size=2):
+    """Номера страниц для навигации: первая, последняя и size соседних
+    с текущей; None - пропуск между ними.
+
+    {% page_window page_obj as pages %}
+    """
+    last = page_obj.paginator.num_pages
+    numbers = {1, last} | set(range(
+        max(1, page_obj.number - size),
+        min(last, page_obj.number + size) + 1,
+    ))
+    pages, previous = [], 0
+    for number in sorted(numbers):
+        if number - previous > 1:
+            pages.append(None)
+        pages.append(number)
+        previous = number
+    return pages
@@ -0,0 +1,14 @@
+from django import template
+
+from ..thumbnails import ensure_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, alias):
+    """Готовая миниатюра картинки поста или None, пока ее строят.
+
+    {% post_thumbnail item.image 'card' as im %}
+    """
+    return ensure_thumbnail(image, alias)
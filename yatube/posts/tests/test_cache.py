@@ -3,7 +3,7 @@ from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -25,6 +25,7 @@ class CacheTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
         self.authorized_client = Client()
@@ -34,26 +35,198 @@ class CacheTest(TestCase):
         """ Тестирование работы кэша.
         1.  Запрашиваю главную страницу, считаю количество объектов,
             которые переданы в нее
-        2.  Убеждаюсь, что количество объектов в БД равно 1,
-            как и количество объектов переданных на страницу
-            при запросе
-        3.  Удаляю запись из БД, повторяю запрос к главной странице,
-            убеждаюсь, что в БД больше нет записей, но не смотря на это
-            в контенте страницы есть данные поста
-        4.  После очистки кэша никаких данных удаленного поста на
-            странице больше нет
+        2.  Меняю текст поста в обход сигналов, повторяю запрос к главной
+            странице: страница отдается из кэша со старым текстом
+        3.  После очистки кэша на странице новый текст
         """
         response = self.authorized_client.get(reverse('posts:index'))
         count_page_objects = len(response.context['page_obj'])
         self.assertEqual(Post.objects.count(), 1)
         self.assertEqual(count_page_objects, 1)
 
-        CacheTest.post.delete()
+        Post.objects.filter(pk=CacheTest.post.pk).update(text='changed')
 
         response = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(Post.objects.count(), 0)
-        self.assertIn(CacheTest.post.text, str(response.content))
+        self.assertIsNone(response.context)
+        self.assertIn(CacheTest.post.text, response.content.decode())
 
         cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotIn(CacheTest.post.text, str(response.content))
+        self.assertIn('changed', response.content.decode())
+
+    def test_write_invalidates_cached_pages(self):
+        """ Запись поста или комментария сразу сбрасывает кэш страниц,
+        на которых они выводятся
+        """
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': CacheTest.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': CacheTest.user.username}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        new_post = Post.objects.create(
+            text='свежий пост', author=CacheTest.user, group=CacheTest.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn(new_post.text, response.content.decode())
+
+        detail_url = reverse('posts:posts', kwargs={'post_id': new_post.pk})
+        self.guest_client.get(detail_url)
+        Comment.objects.create(
+            text='свежий комментарий', post=new_post, author=CacheTest.user
+        )
+        response = self.guest_client.get(detail_url)
+        self.assertIn('свежий комментарий', response.content.decode())
+
+        new_post.delete()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn(new_post.text, response.content.decode())
+
+    def test_cached_page_is_not_shared_between_users(self):
+        other = User.objects.create_user(username='other_reader')
+        other_client = Client()
+        other_client.force_login(other)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile',
+                    kwargs={'username': CacheTest.user.username}),
+            reverse('posts:posts', kwargs={'post_id': CacheTest.post.pk}),
+        )
+
+        def header_name(user):
+            # Имя вошедшего пользователя в шапке страницы
+            return f'>  {user.username} </a>'
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                response = other_client.get(url)
+                self.assertContains(response, header_name(other))
+                self.assertNotContains(response, header_name(CacheTest.user))
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, header_name(CacheTest.user))
+                self.assertNotContains(response, 'Выйти')
+
+    def cached_pages(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': CacheTest.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': CacheTest.user.username}),
+            reverse('posts:posts', kwargs={'post_id': CacheTest.post.pk}),
+        )
+
+    def test_group_rename_refreshes_all_pages(self):
+        for url in self.cached_pages():
+            self.guest_client.get(url)
+        group = CacheTest.group
+        group.title = 'Переименованная группа'
+        group.save()
+        for url in self.cached_pages():
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Переименованная группа'
+                )
+
+    def test_user_rename_refreshes_all_pages(self):
+        for url in self.cached_pages():
+            self.guest_client.get(url)
+        user = CacheTest.user
+        user.first_name, user.last_name = 'Новое', 'Имя'
+        user.save()
+        for url in self.cached_pages():
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Новое Имя')
+
+    def test_login_keeps_cached_pages(self):
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        Post.objects.filter(pk=CacheTest.post.pk).update(text='changed')
+        Client().force_login(CacheTest.user)
+        self.assertNotContains(self.guest_client.get(url), 'changed')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='etag-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(ConditionalGetTest.user)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': ConditionalGetTest.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': ConditionalGetTest.author.username}),
+            reverse('posts:follow_index'),
+            reverse('posts:posts',
+                    kwargs={'post_id': ConditionalGetTest.post.pk}),
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_unchanged_page_is_304_without_queries(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('max-age=0', response['Cache-Control'])
+                # Сессия и пользователь - единственные запросы к БД
+                with self.assertNumQueries(2):
+                    response = self.revalidate(url, response)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_write_changes_validators(self):
+        responses = {url: self.client.get(url) for url in self.urls()}
+        post = ConditionalGetTest.post
+        Comment.objects.create(text='Новый', post=post, author=self.user)
+        post.text = 'Исправленный пост'
+        post.save()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                response = self.revalidate(url, response)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Исправленный пост')
+
+    def test_etag_depends_on_user(self):
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        guest = Client()
+        self.assertEqual(
+            guest.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            200
+        )
+
+    def test_follow_changes_inbox_validators(self):
+        url = reverse('posts:follow_index')
+        response = self.client.get(url)
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
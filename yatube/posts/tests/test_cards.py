@@ -0,0 +1,93 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cards import build_cards
+from ..models import Group, Post
+from ..templatetags.post_feeds import page_window
+from ..thumbnails import cached_thumbnails, generate_thumbnails
+from .utils import make_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cards', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.user, group=cls.group,
+            image=make_image('card-1.jpg', (400, 300)),
+        )
+        cls.other = Post.objects.create(
+            text='Пост без группы', author=cls.user,
+            image=make_image('card-2.jpg', (400, 300)),
+        )
+        generate_thumbnails(cls.post.image.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_carry_urls(self):
+        card, other = build_cards([self.post, self.other])
+        self.assertEqual(card.url, reverse('posts:posts', args=[self.post.pk]))
+        self.assertEqual(
+            card.author_url, reverse('posts:profile', args=['author'])
+        )
+        self.assertEqual(
+            card.group_url, reverse('posts:group_list', args=['cards'])
+        )
+        self.assertTrue(card.group_footer)
+        self.assertIsNone(other.group_url)
+        self.assertFalse(other.group_footer)
+
+    def test_group_page_hides_group_footer(self):
+        card, = build_cards([self.post], 'posts:group_list')
+        self.assertFalse(card.group_footer)
+        response = self.client.get(
+            reverse('posts:group_list', args=['cards'])
+        )
+        self.assertNotContains(response, 'все записи группы')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'все записи группы')
+
+    def test_thumbnails_are_read_in_one_query(self):
+        names = [self.post.image.name, self.other.image.name]
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails = cached_thumbnails(names, 'card')
+        self.assertEqual(len(queries), 1)
+        self.assertIsNotNone(thumbnails[self.post.image.name])
+        self.assertIsNone(thumbnails[self.other.image.name])
+        with CaptureQueriesContext(connection) as queries:
+            cached_thumbnails(names, 'card')
+        self.assertEqual(len(queries), 0)
+
+    def test_page_window(self):
+        paginator = Paginator(range(100), 10)
+        self.assertEqual(
+            page_window(paginator.page(5)), [1, None, 3, 4, 5, 6, 7, None, 10]
+        )
+        self.assertEqual(page_window(paginator.page(1)), [1, 2, 3, None, 10])
+        self.assertEqual(
+            page_window(Paginator(range(30), 10).page(2)), [1, 2, 3]
+        )
@@ -1,8 +1,13 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import Client, TestCase
 from django.urls import reverse
 
 from ..models import Comment, Group, Post
+from ..views import DISPLAY_COMMENTS
 
 User = get_user_model()
 
@@ -89,6 +94,81 @@ class CommentViewTest(TestCase):
             )
         )
         self.assertEqual(
-            response.context['comments'].first(),
+            response.context['comments'][0],
             Comment.objects.first()
         )
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(text='Вирусный пост', author=cls.user)
+        for i in range(45):
+            Comment.objects.create(
+                text='Комментарий ' + str(i), author=cls.user, post=cls.post
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_detail_renders_first_page_and_counter(self):
+        post = CommentPaginationTest.post
+        response = self.client.get(
+            reverse('posts:posts', kwargs={'post_id': post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), DISPLAY_COMMENTS)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, 'Комментарии: 45')
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', kwargs={'post_id': post.pk})
+            + '?after=' + response.context['comments_page'].next_cursor
+        )
+
+    def test_fragments_return_remaining_comments_in_order(self):
+        post = CommentPaginationTest.post
+        page = self.client.get(
+            reverse('posts:posts', kwargs={'post_id': post.pk})
+        ).context['comments_page']
+        texts = [comment.text for comment in page]
+        while page.has_next():
+            response = self.client.get(
+                reverse('posts:post_comments', kwargs={'post_id': post.pk}),
+                {'after': page.next_cursor},
+            )
+            self.assertTemplateUsed(response, 'includes/comment_list.html')
+            self.assertNotContains(response, '<html')
+            page = response.context['comments_page']
+            texts += [comment.text for comment in page]
+        self.assertEqual(
+            texts, ['Комментарий ' + str(i) for i in range(45)]
+        )
+
+    def test_fragment_of_missing_post_is_404(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_counter_follows_comments(self):
+        post = Post.objects.create(text='Новый пост', author=self.user)
+        comment = Comment.objects.create(
+            text='Первый', author=self.user, post=post
+        )
+        Comment.objects.create(text='Второй', author=self.user, post=post)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_command_fixes_counter(self):
+        post = CommentPaginationTest.post
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        call_command('recount_stats', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 45)
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..feeds import StreamingAtomFeed, StreamingRssFeed
+from ..models import Group, Post
+from ..purge import delete_post
+
+User = get_user_model()
+
+
+def content(response):
+    if response.streaming:
+        return b''.join(response.streaming_content).decode()
+    return response.content.decode()
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='feeds', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.user, group=cls.group
+        )
+        cls.other = Post.objects.create(
+            text='Пост <без> группы', author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_stream_matches_feedgenerator(self):
+        for feed_class in (StreamingRssFeed, StreamingAtomFeed):
+            with self.subTest(feed=feed_class.__name__):
+                feed = feed_class('Лента', 'http://testserver/', 'Лента')
+                feed.add_item('Первая', 'http://testserver/1/', '<b>1</b>',
+                              pubdate=self.post.pub_date,
+                              categories=['Группа'])
+                feed.add_item('Вторая', 'http://testserver/2/', 'Текст',
+                              pubdate=self.other.pub_date)
+                self.assertEqual(
+                    b''.join(feed.stream()).decode(),
+                    feed.writeString('utf-8'),
+                )
+
+    def test_feeds(self):
+        cases = {
+            reverse('posts:index_rss'): ['Пост в группе', 'Пост &lt;без&gt;'],
+            reverse('posts:index_atom'): ['Пост в группе', 'Пост &lt;без&gt;'],
+            reverse('posts:group_rss', args=['feeds']): ['Пост в группе'],
+            reverse('posts:profile_atom', args=['author']): [
+                'Пост в группе', 'Пост &lt;без&gt;'
+            ],
+        }
+        for url, texts in cases.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.streaming)
+                body = content(response)
+                for text in texts:
+                    self.assertIn(text, body)
+        self.assertNotIn(
+            'без', content(self.client.get(
+                reverse('posts:group_atom', args=['feeds'])
+            ))
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:group_rss', args=['missing'])
+            ).status_code,
+            404
+        )
+
+    def test_cached_feed_and_conditional_get(self):
+        url = reverse('posts:group_rss', args=['feeds'])
+        body = content(self.client.get(url))
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content.decode(), body)
+        self.assertEqual(response['Content-Type'],
+                         'application/rss+xml; charset=utf-8')
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate_feeds(self):
+        url = reverse('posts:profile_rss', args=['author'])
+        content(self.client.get(url))
+        Post.objects.create(text='Новый пост', author=self.user)
+        self.assertIn('Новый пост', content(self.client.get(url)))
+        delete_post(self.other)
+        self.assertNotIn('без', content(self.client.get(url)))
@@ -1,14 +1,19 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from ..images import ingest_image
 from ..models import Group, Post
+from .utils import make_image
 
 User = get_user_model()
 
@@ -78,3 +83,49 @@ class ImagesViewTest(TestCase):
         )
         self.assertEqual(response.context['post'].image,
                          Post.objects.first().image)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageIngestionTest(TestCase):
+    def test_large_photo_is_downscaled_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Test camera'
+        upload = make_image('photo.jpeg', (4000, 3000), exif=exif.tobytes())
+        ingested = ingest_image(upload)
+        self.assertEqual((ingested.width, ingested.height), (1920, 1440))
+        self.assertEqual(ingested.file.name, 'photo.jpg')
+        saved = Image.open(ingested.file)
+        self.assertEqual(saved.size, (1920, 1440))
+        self.assertNotIn('exif', saved.info)
+        ingested.file.seek(0)
+        self.assertEqual(ingested.size, len(ingested.file.read()))
+
+    def test_transparency_is_kept_as_png(self):
+        upload = make_image('logo.png', (50, 50), 'RGBA', 'PNG')
+        ingested = ingest_image(upload)
+        self.assertEqual(ingested.file.name, 'logo.png')
+        self.assertEqual(Image.open(ingested.file).mode, 'RGBA')
+
+    def test_too_many_pixels_rejected_before_decoding(self):
+        upload = make_image('huge.jpeg', (200, 200))
+        with mock.patch('posts.images.POST_IMAGE_MAX_PIXELS', 100 * 100):
+            with mock.patch.object(Image.Image, 'load') as load:
+                with self.assertRaises(ValidationError) as error:
+                    ingest_image(upload)
+        self.assertEqual(error.exception.code, 'too_many_pixels')
+        load.assert_not_called()
+
+    def test_create_post_records_saved_image(self):
+        user = User.objects.create_user(username='photographer')
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с большой картинкой',
+                'image': make_image('big.jpeg', (3000, 1000)),
+            },
+        )
+        post = Post.objects.get(author=user)
+        self.assertEqual(post.image.name, 'posts/big.jpg')
+        self.assertEqual((post.image_width, post.image_height), (1920, 640))
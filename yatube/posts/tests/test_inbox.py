@@ -0,0 +1,145 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import inbox
+from ..models import FeedEntry, Follow, Post
+from ..purge import Purger
+
+User = get_user_model()
+
+
+class FeedInboxTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(FeedInboxTest.reader)
+
+    def inbox_posts(self, user):
+        return list(
+            FeedEntry.objects.filter(user=user).order_by(
+                '-pub_date', '-post'
+            ).values_list('post_id', flat=True)
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(
+            user=FeedInboxTest.reader, author=FeedInboxTest.author
+        )
+        post = Post.objects.create(text='новый', author=FeedInboxTest.author)
+        Post.objects.create(text='чужой', author=FeedInboxTest.other)
+        self.assertEqual(self.inbox_posts(FeedInboxTest.reader), [post.pk])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        posts = [
+            Post.objects.create(text=str(i), author=FeedInboxTest.author)
+            for i in range(3)
+        ]
+        follow = Follow.objects.create(
+            user=FeedInboxTest.reader, author=FeedInboxTest.author
+        )
+        self.assertEqual(
+            self.inbox_posts(FeedInboxTest.reader),
+            [post.pk for post in reversed(posts)]
+        )
+        follow.delete()
+        self.assertEqual(self.inbox_posts(FeedInboxTest.reader), [])
+
+    def test_deleted_post_leaves_inbox(self):
+        Follow.objects.create(
+            user=FeedInboxTest.reader, author=FeedInboxTest.author
+        )
+        post = Post.objects.create(text='пост', author=FeedInboxTest.author)
+        self.client.force_login(FeedInboxTest.author)
+        self.client.get(
+            reverse('posts:post_delete', kwargs={'post_id': post.pk})
+        )
+        self.assertFalse(Post.objects.inbox(FeedInboxTest.reader).exists())
+        Purger(pause=0).run()
+        self.assertEqual(self.inbox_posts(FeedInboxTest.reader), [])
+
+    def test_inbox_is_capped(self):
+        Follow.objects.create(
+            user=FeedInboxTest.reader, author=FeedInboxTest.author
+        )
+        posts = [
+            Post.objects.create(text=str(i), author=FeedInboxTest.author)
+            for i in range(5)
+        ]
+        inbox.trim_inbox(FeedInboxTest.reader.pk, size=2)
+        self.assertEqual(
+            self.inbox_posts(FeedInboxTest.reader),
+            [posts[4].pk, posts[3].pk]
+        )
+
+    def test_trim_keeps_exactly_size_entries_with_equal_dates(self):
+        posts = [
+            Post.objects.create(text=str(i), author=FeedInboxTest.author)
+            for i in range(5)
+        ]
+        same_date = posts[0].pub_date
+        for user in (FeedInboxTest.reader, FeedInboxTest.other):
+            FeedEntry.objects.bulk_create([
+                FeedEntry(user=user, post=post, pub_date=same_date)
+                for post in posts
+            ])
+        inbox.trim_inboxes(
+            [FeedInboxTest.reader.pk, FeedInboxTest.other.pk], size=3
+        )
+        for user in (FeedInboxTest.reader, FeedInboxTest.other):
+            with self.subTest(user=user):
+                self.assertCountEqual(
+                    self.inbox_posts(user),
+                    [posts[4].pk, posts[3].pk, posts[2].pk]
+                )
+
+    def test_fan_out_trims_in_one_statement(self):
+        followers = [
+            User.objects.create_user(username=f'follower{i}')
+            for i in range(5)
+        ]
+        Follow.objects.bulk_create([
+            Follow(user=user, author=FeedInboxTest.author)
+            for user in followers
+        ])
+        post = Post.objects.create(text='пост', author=FeedInboxTest.author)
+        # Автор, подписчики, вставка записей и один DELETE
+        with self.assertNumQueries(4):
+            inbox.fan_out_post(post)
+
+    def test_rebuild_feeds_command(self):
+        Follow.objects.create(
+            user=FeedInboxTest.reader, author=FeedInboxTest.author
+        )
+        post = Post.objects.create(text='пост', author=FeedInboxTest.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self.inbox_posts(FeedInboxTest.reader), [post.pk])
+
+    def test_follow_page_cursor_walk(self):
+        Follow.objects.create(
+            user=FeedInboxTest.reader, author=FeedInboxTest.author
+        )
+        posts = [
+            Post.objects.create(text=str(i), author=FeedInboxTest.author)
+            for i in range(12)
+        ]
+        url = reverse('posts:follow_index')
+        first = self.client.get(url + '?after=').context['page_obj']
+        second = self.client.get(
+            url + '?after=' + first.next_cursor
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in list(first) + list(second)],
+            [post.pk for post in reversed(posts)]
+        )
+        self.assertFalse(second.has_next())
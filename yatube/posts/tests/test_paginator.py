@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
 from ..models import Group, Post
+from ..paginators import CursorPaginator
 
 User = get_user_model()
 
@@ -74,3 +76,117 @@ class PaginatorViewTest(TestCase):
             ) + '?page=2'
         )
         self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CursorPaginatorViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='test description'
+        )
+        Post.objects.bulk_create([
+            Post(
+                text='Тестовый пост-' + str(i),
+                author=cls.user,
+                group=cls.group
+            )
+            for i in range(23)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(CursorPaginatorViewTest.user)
+
+    def walk(self, url):
+        """Проходит ленту по курсорам вперед, возвращает все страницы."""
+        pages = []
+        response = self.client.get(url + '?after=')
+        pages.append(response.context['page_obj'])
+        while pages[-1].has_next():
+            response = self.client.get(
+                url + '?after=' + pages[-1].next_cursor
+            )
+            pages.append(response.context['page_obj'])
+        return pages
+
+    def test_cursor_pages_cover_feed_in_order(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': CursorPaginatorViewTest.group.slug}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': CursorPaginatorViewTest.user.username}
+            ),
+        )
+        expected = list(Post.objects.values_list('pk', flat=True))
+        for url in urls:
+            with self.subTest(url=url):
+                pages = self.walk(url)
+                self.assertEqual([len(page) for page in pages], [10, 10, 3])
+                self.assertEqual(
+                    [post.pk for page in pages for post in page],
+                    expected
+                )
+
+    def test_cursor_previous_page(self):
+        url = reverse('posts:index')
+        first, second, _ = self.walk(url)
+        response = self.client.get(url + '?before=' + second.previous_cursor)
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), list(first))
+        self.assertFalse(page_obj.has_previous())
+        self.assertTrue(page_obj.has_next())
+
+    def test_cursor_page_skips_count(self):
+        url = reverse('posts:index')
+        _, second, _ = self.walk(url)
+        with self.assertNumQueries(1):
+            page = CursorPaginator(Post.objects.all(), 10).page(
+                after=second.next_cursor
+            )
+            self.assertEqual(len(page), 3)
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?after=bad!')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.all()[:10])
+        )
+
+    def test_numbered_page_links_into_cursor_mode(self):
+        url = reverse('posts:index')
+        first, _, _ = self.walk(url)
+        response = self.client.get(url + '?page=1')
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'href="?after={next_cursor}"')
+        self.assertEqual(next_cursor, first.next_cursor)
+
+    def test_inbox_numbered_page_links_into_cursor_mode(self):
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        self.client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username_follow': CursorPaginatorViewTest.user.username}
+        ))
+        url = reverse('posts:follow_index')
+        numbered = self.client.get(url).context['page_obj']
+        page_obj = self.client.get(
+            url + '?after=' + numbered.next_cursor
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            list(Post.objects.values_list('pk', flat=True)[10:20])
+        )
+
+    def test_first_link_stays_in_cursor_mode(self):
+        url = reverse('posts:index')
+        _, second, _ = self.walk(url)
+        response = self.client.get(url + '?after=' + second.previous_cursor)
+        self.assertContains(response, 'href="?after=">Первая</a>')
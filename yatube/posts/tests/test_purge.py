@@ -0,0 +1,195 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import purge, signals
+from ..cache import post_scope, profile_scope
+from ..models import (AuthorStats, Comment, DeletedUser, FeedEntry, Follow,
+                      Post)
+from ..purge import Purger, delete_user
+from ..search import SearchPaginator
+from ..thumbnails import cached_thumbnail, generate_thumbnails
+from .utils import make_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PurgeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост про пироги', author=cls.author
+        )
+        cls.other = Post.objects.create(
+            text='Второй пост про пироги', author=cls.reader
+        )
+        for post in (cls.post, cls.other):
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий'
+            )
+            Comment.objects.create(
+                post=post, author=cls.author, text='Ответ'
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(PurgeTest.author)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def add_image(self, post):
+        # Файлы не откатываются вместе с транзакцией теста: у каждого свой
+        post.image = make_image()
+        post.save()
+        return post.image.name
+
+    def test_deleted_post_is_hidden_then_purged(self):
+        post = PurgeTest.post
+        image = self.add_image(post)
+        generate_thumbnails(image)
+        cache.clear()
+        thumbnail = cached_thumbnail(post.image, 'card')
+        self.assertTrue(default_storage.exists(thumbnail.name))
+        detail = reverse('posts:posts', kwargs={'post_id': post.pk})
+        self.client.get(detail)
+
+        self.client.get(
+            reverse('posts:post_delete', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse(
+                'api:post_detail', kwargs={'post_id': post.pk}
+            )).status_code, 404
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(post, response.context['page_obj'].object_list)
+        found = SearchPaginator(Post.objects.all(), 'пироги', 10).page()
+        self.assertEqual(list(found.object_list), [PurgeTest.other])
+        self.assertEqual(self.stats(PurgeTest.author).posts_count, 0)
+        self.assertTrue(Post.all_objects.filter(pk=post.pk).exists())
+
+        deleted = Purger(pause=0).run()
+        self.assertEqual(deleted, {
+            'feed entries': 1, 'comments': 2, 'posts': 1,
+        })
+        self.assertFalse(Post.all_objects.filter(pk=post.pk).exists())
+        self.assertFalse(default_storage.exists(image))
+        self.assertFalse(default_storage.exists(thumbnail.name))
+        self.assertEqual(self.stats(PurgeTest.author).posts_count, 0)
+        self.assertEqual(self.stats(PurgeTest.author).comments_count, 1)
+
+    def test_shared_image_is_kept(self):
+        image = self.add_image(PurgeTest.post)
+        Post.objects.create(
+            text='Та же картинка', author=PurgeTest.reader, image=image
+        )
+        self.client.get(reverse(
+            'posts:post_delete', kwargs={'post_id': PurgeTest.post.pk}
+        ))
+        Purger(pause=0).run()
+        self.assertTrue(default_storage.exists(image))
+
+    def test_deleted_user_is_hidden_then_purged(self):
+        author = PurgeTest.author
+        delete_user(author)
+        delete_user(author)
+        author.refresh_from_db()
+        self.assertFalse(author.is_active)
+        self.assertFalse(Post.objects.filter(author=author).exists())
+        self.assertEqual(self.stats(author).posts_count, 0)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': author.username})
+        )
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+        deleted = Purger(batch_size=1, pause=0).run()
+        self.assertEqual(deleted, {
+            'feed entries': 1, 'comments': 3, 'follows': 1, 'posts': 1,
+            'users': 1,
+        })
+        self.assertFalse(User.objects.filter(pk=author.pk).exists())
+        self.assertFalse(DeletedUser.objects.exists())
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(
+            list(Comment.objects.values_list('post_id', 'author_id')),
+            [(PurgeTest.other.pk, PurgeTest.reader.pk)]
+        )
+        reader_stats = self.stats(PurgeTest.reader)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(reader_stats.comments_count, 1)
+
+    def test_purge_bumps_generations_once(self):
+        author = PurgeTest.author
+        for i in range(5):
+            Comment.objects.create(
+                post=PurgeTest.other, author=author, text=str(i)
+            )
+        delete_user(author)
+        with mock.patch.object(
+            purge, 'bump_generations', wraps=purge.bump_generations
+        ) as bump, mock.patch.object(
+            signals, 'bump_generations'
+        ) as signal_bump:
+            Purger(batch_size=2, pause=0).run()
+        bump.assert_called_once()
+        self.assertIn(post_scope(PurgeTest.other.pk), bump.call_args[0])
+        self.assertIn(profile_scope('reader'), bump.call_args[0])
+        signal_bump.assert_not_called()
+        self.assertEqual(
+            Post.objects.get(pk=PurgeTest.other.pk).comments_count, 1
+        )
+        self.assertEqual(self.stats(PurgeTest.reader).following_count, 0)
+
+    def test_batch_shrinks_to_time_budget(self):
+        delete_user(PurgeTest.author)
+        purger = Purger(batch_size=8, batch_time=0, pause=0)
+        self.assertTrue(purger.purge_batch())
+        self.assertEqual(purger.batch_size, 4)
+        purger.run()
+        self.assertEqual(purger.batch_size, 1)
+
+    def test_admin_delete_marks_user(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        url = reverse(
+            'admin:auth_user_delete', args=(PurgeTest.author.pk,)
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.post(url, {'post': 'yes'})
+        self.assertTrue(
+            DeletedUser.objects.filter(user=PurgeTest.author).exists()
+        )
+        self.assertTrue(User.objects.filter(pk=PurgeTest.author.pk).exists())
+
+    def test_purge_command(self):
+        delete_user(PurgeTest.author)
+        out = StringIO()
+        call_command('purge_deleted', pause=0, stdout=out)
+        self.assertIn('users: 1', out.getvalue())
+        self.assertFalse(User.objects.filter(pk=PurgeTest.author.pk).exists())
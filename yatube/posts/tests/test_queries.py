@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Бюджет запросов на страницу для авторизованного пользователя.
+# Не зависит от количества постов и комментариев на странице.
+# Считается для холодного кэша страниц.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    # + список популярных авторов в подписках (posts.timeline)
+    'posts:follow_index': 5,
+    'posts:posts': 5,
+}
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='budget-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryBudgetTest.user)
+
+    def add_content(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text='Пост ' + str(i),
+                author=QueryBudgetTest.author,
+                group=QueryBudgetTest.group,
+            )
+            Comment.objects.create(
+                text='Комментарий ' + str(i),
+                post=post,
+                author=QueryBudgetTest.user,
+            )
+        return post
+
+    def urls(self, post):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list',
+                kwargs={'slug': QueryBudgetTest.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile',
+                kwargs={'username': QueryBudgetTest.author.username}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:posts': reverse(
+                'posts:posts', kwargs={'post_id': post.pk}
+            ),
+        }
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_views_fit_query_budget(self):
+        post = self.add_content(1)
+        for name, url in self.urls(post).items():
+            with self.subTest(view=name):
+                self.assertLessEqual(
+                    self.count_queries(url), QUERY_BUDGETS[name]
+                )
+
+    def test_query_count_does_not_grow_with_content(self):
+        post = self.add_content(1)
+        small = {
+            name: self.count_queries(url)
+            for name, url in self.urls(post).items()
+        }
+        post = self.add_content(15)
+        for name, url in self.urls(post).items():
+            with self.subTest(view=name):
+                self.assertEqual(self.count_queries(url), small[name])
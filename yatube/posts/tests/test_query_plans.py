@@ -0,0 +1,88 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный проход по таблице без индекса: "SCAN posts_post" или
+# "SCAN TABLE posts_post" в старых версиях SQLite.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTest(TestCase):
+    """Основные запросы страниц читают таблицы только по индексам."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='plan-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(30):
+            cls.post = Post.objects.create(
+                text='Пост ' + str(i),
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            Comment.objects.create(
+                text='Комментарий', post=cls.post, author=cls.user
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryPlanTest.user)
+
+    def urls(self):
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': QueryPlanTest.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': QueryPlanTest.author.username}),
+            reverse('posts:follow_index'),
+        ]
+        pages = []
+        for url in feeds:
+            pages += [url, url + '?page=2']
+            cursor = self.client.get(url + '?after=').context[
+                'page_obj'].next_cursor
+            pages.append(url + '?after=' + cursor)
+        pages += [
+            reverse('posts:posts', kwargs={'post_id': QueryPlanTest.post.pk}),
+            reverse('posts:index_rss'),
+            reverse('posts:group_atom', args=[QueryPlanTest.group.slug]),
+            reverse('posts:profile_rss', args=[QueryPlanTest.author.username]),
+        ]
+        return pages
+
+    def test_view_queries_use_indexes(self):
+        for url in self.urls():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                for step in explain(query['sql']):
+                    with self.subTest(url=url, sql=query['sql'], step=step):
+                        self.assertIsNone(FULL_SCAN.match(step))
+                        self.assertNotIn(TEMP_SORT, step)
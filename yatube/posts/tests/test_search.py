@@ -0,0 +1,167 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..search import SEARCH_TABLE, build_match
+
+User = get_user_model()
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='search-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text='Рецепт пирога номер ' + str(i),
+                author=cls.author if i % 2 else cls.user,
+                group=cls.group if i % 3 == 0 else None,
+            )
+            for i in range(25)
+        ]
+        cls.best = Post.objects.create(
+            text='Пирог, пирог и еще раз пирог',
+            author=cls.user,
+        )
+        cls.other = Post.objects.create(text='Про котов', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, **params):
+        return self.client.get(reverse('posts:search'), params)
+
+    def collect(self, **params):
+        """Все найденные посты, проходя страницы по курсору."""
+        found = []
+        response = self.search(**params)
+        while True:
+            page_obj = response.context['page_obj']
+            found += [post.pk for post in page_obj]
+            if not page_obj.has_next():
+                return found
+            response = self.search(after=page_obj.next_cursor, **params)
+
+    def test_page_without_query_has_no_results(self):
+        response = self.search()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_best_match_comes_first(self):
+        page_obj = self.search(q='пирог').context['page_obj']
+        self.assertEqual(page_obj[0], SearchViewTest.best)
+        self.assertNotIn(SearchViewTest.other, list(page_obj))
+
+    def test_pages_cover_all_matches_once(self):
+        found = self.collect(q='пирог')
+        expected = [post.pk for post in SearchViewTest.posts]
+        expected.append(SearchViewTest.best.pk)
+        self.assertEqual(len(found), len(expected))
+        self.assertCountEqual(found, expected)
+
+    def test_previous_page_returns_same_posts(self):
+        first = self.search(q='пирог').context['page_obj']
+        second = self.search(
+            q='пирог', after=first.next_cursor
+        ).context['page_obj']
+        back = self.search(
+            q='пирог', before=second.previous_cursor
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_group_and_author_filters(self):
+        found = self.collect(q='рецепт', group=SearchViewTest.group.slug)
+        self.assertCountEqual(found, [
+            post.pk for post in SearchViewTest.posts
+            if post.group_id == SearchViewTest.group.pk
+        ])
+        found = self.collect(q='рецепт', author='writer')
+        self.assertCountEqual(found, [
+            post.pk for post in SearchViewTest.posts
+            if post.author_id == SearchViewTest.author.pk
+        ])
+        self.assertEqual(self.collect(q='рецепт', author='nobody'), [])
+
+    def test_last_word_is_prefix(self):
+        found = self.collect(q='реце')
+        self.assertEqual(len(found), len(SearchViewTest.posts))
+
+    def test_query_syntax_is_not_interpreted(self):
+        for query in ('"пирог', 'пирог AND (', 'NEAR(', 'text:кот', '***'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(q=query).status_code, 200)
+
+    def test_next_link_keeps_query(self):
+        response = self.search(q='пирог', group='')
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(
+            response, f'href="?q=%D0%BF%D0%B8%D1%80%D0%BE%D0%B3'
+                      f'&amp;after={next_cursor}"'
+        )
+        self.assertContains(
+            response, 'href="?q=%D0%BF%D0%B8%D1%80%D0%BE%D0%B3&amp;after="'
+        )
+
+
+class SearchIndexTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    def indexed(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE}'
+                f' WHERE {SEARCH_TABLE} MATCH %s', [build_match(query)]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_signals_keep_index_in_sync(self):
+        post = Post.objects.create(text='Старый текст', author=self.user)
+        self.assertEqual(self.indexed('старый'), [post.pk])
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.indexed('старый'), [])
+        self.assertEqual(self.indexed('новый'), [post.pk])
+        post_id = post.pk
+        post.delete()
+        self.assertEqual(self.indexed('новый'), [])
+        self.assertNotIn(post_id, self.indexed('текст'))
+
+    def test_rebuild_command_restores_index(self):
+        post = Post.objects.create(text='Потерянный пост', author=self.user)
+        Post.objects.filter(pk=post.pk).update(text='Обновленный пост')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.indexed('обновленный'), [post.pk])
+        self.assertEqual(self.indexed('потерянный'), [])
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        post = Post.objects.create(text='Искомый пост', author=self.user)
+        Post.objects.create(text='Другой пост', author=self.user)
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'искомый'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [post]
+        )
+        sql = str(response.context['cl'].queryset.query)
+        self.assertIn(SEARCH_TABLE, sql)
+        self.assertNotIn('LIKE', sql)
@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(AuthorStatsTest.reader)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        author, reader = AuthorStatsTest.author, AuthorStatsTest.reader
+        post = Post.objects.create(text='пост', author=author)
+        follow = Follow.objects.create(user=reader, author=author)
+        Comment.objects.create(text='комментарий', post=post, author=reader)
+        self.assertEqual(self.stats(author).posts_count, 1)
+        self.assertEqual(self.stats(author).followers_count, 1)
+        self.assertEqual(self.stats(reader).following_count, 1)
+        self.assertEqual(self.stats(reader).comments_count, 1)
+
+        follow.delete()
+        post.delete()
+        self.assertEqual(self.stats(author).posts_count, 0)
+        self.assertEqual(self.stats(author).followers_count, 0)
+        self.assertEqual(self.stats(reader).following_count, 0)
+        self.assertEqual(self.stats(reader).comments_count, 0)
+
+    def test_drifted_counter_does_not_go_below_zero(self):
+        author = AuthorStatsTest.author
+        # bulk_create не вызывает сигналы: счетчик остается нулевым
+        Post.objects.bulk_create([Post(text='пост', author=author)])
+        post = Post.objects.get(author=author)
+        self.client.force_login(author)
+        response = self.client.post(
+            reverse('posts:post_delete', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.stats(author).posts_count, 0)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_profile_reads_counters(self):
+        author = AuthorStatsTest.author
+        Post.objects.create(text='пост', author=author)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': author.username})
+        )
+        self.assertEqual(response.context['stats'].posts_count, 1)
+
+    def test_missing_stats_are_recounted_on_read(self):
+        author = AuthorStatsTest.author
+        post = Post.objects.create(text='пост', author=author)
+        AuthorStats.objects.filter(user=author).delete()
+        response = self.client.get(
+            reverse('posts:posts', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.context['author_stats'].posts_count, 1)
+
+    def test_recount_stats_command(self):
+        author = AuthorStatsTest.author
+        Post.objects.create(text='пост', author=author)
+        AuthorStats.objects.filter(user=author).update(posts_count=42)
+        call_command('recount_stats', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(author).posts_count, 1)
@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..thumbnails import _lock_key, cached_thumbnail, generate_thumbnails
+from .utils import make_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой', author=cls.user,
+            image=make_image(size=(1200, 800))
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        post = ThumbnailTest.post
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn(
+            staticfiles_storage.url('img/placeholder.svg'),
+            response.content.decode(),
+        )
+        self.assertIsNone(cached_thumbnail(post.image, 'card'))
+
+        generate_thumbnails(post.image.name)
+        cache.clear()
+        card = cached_thumbnail(post.image, 'card')
+        detail = cached_thumbnail(post.image, 'detail')
+        self.assertIsNotNone(card)
+        self.assertIsNotNone(detail)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn(card.url, response.content.decode())
+        response = self.client.get(
+            reverse('posts:posts', kwargs={'post_id': post.pk})
+        )
+        self.assertIn(detail.url, response.content.decode())
+
+    def test_generation_refreshes_cached_pages(self):
+        post = ThumbnailTest.post
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': post.author}),
+            reverse('posts:posts', kwargs={'post_id': post.pk}),
+        )
+        placeholder = staticfiles_storage.url('img/placeholder.svg')
+        for url in urls:
+            self.assertIn(placeholder, self.client.get(url).content.decode())
+
+        generate_thumbnails(post.image.name)
+        card = cached_thumbnail(post.image, 'card')
+        detail = cached_thumbnail(post.image, 'detail')
+        for url, thumbnail in zip(urls, (card, card, detail)):
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertIn(thumbnail.url, content)
+                self.assertNotIn(placeholder, content)
+
+    def test_generation_is_single_flight(self):
+        post = ThumbnailTest.post
+        cache.add(_lock_key(post.image.name), 1)
+        generate_thumbnails(post.image.name)
+        self.assertIsNone(cached_thumbnail(post.image, 'card'))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_thumbnails_are_built_on_create(self):
+        self.client.force_login(ThumbnailTest.user)
+        pending = len(connection.run_on_commit)
+        self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Новый пост', 'image': make_image('new.jpg')},
+        )
+        # TestCase не коммитит транзакцию: выполняем отложенное вручную
+        for _, callback in connection.run_on_commit[pending:]:
+            callback()
+        post = Post.objects.first()
+        self.assertIsNotNone(cached_thumbnail(post.image, 'card'))
@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import inbox, purge, signals, timeline
+from ..models import FeedEntry, Follow, Post
+from ..paginators import CursorPage
+from ..purge import Purger, delete_post, delete_user
+
+User = get_user_model()
+
+
+class FollowTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.regular = User.objects.create_user(username='regular')
+        cls.star = User.objects.create_user(username='star')
+        cls.stranger = User.objects.create_user(username='stranger')
+
+    def setUp(self):
+        cache.clear()
+        # Автор с двумя подписчиками уже считается популярным, а в его
+        # кольце только три последних поста
+        for patcher in (
+            mock.patch.object(inbox, 'FEED_FANOUT_LIMIT', 1),
+            mock.patch.object(timeline, 'FEED_AUTHOR_RING_SIZE', 3),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        cls = FollowTimelineTest
+        for user in (cls.reader, cls.fan):
+            Follow.objects.create(user=user, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.regular)
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.star if i % 3 else cls.regular,
+            )
+            if i % 5 == 0:
+                Post.objects.create(text='Чужой', author=cls.stranger)
+        self.client = Client()
+        self.client.force_login(cls.reader)
+
+    def expected(self):
+        return list(Post.objects.filter(
+            author__in=[FollowTimelineTest.regular, FollowTimelineTest.star]
+        ).values_list('pk', flat=True))
+
+    def collect(self, feed):
+        pages, page = [], feed.page()
+        while True:
+            pages.append([post.pk for post in page])
+            if not page.has_next():
+                return pages, page
+            page = feed.page(after=page.next_cursor)
+
+    def test_popular_author_is_not_fanned_out(self):
+        authors = set(FeedEntry.objects.filter(
+            user=FollowTimelineTest.reader
+        ).values_list('post__author', flat=True))
+        self.assertEqual(authors, {FollowTimelineTest.regular.pk})
+
+    @mock.patch.object(
+        signals, 'submit_on_commit',
+        lambda func, *args, **kwargs: func(*args, **kwargs)
+    )
+    def test_posts_stay_in_feeds_after_author_stops_being_popular(self):
+        Follow.objects.filter(
+            user=FollowTimelineTest.fan, author=FollowTimelineTest.star
+        ).delete()
+        self.assertFalse(inbox.is_pulled(FollowTimelineTest.star.pk))
+        feed = timeline.FollowTimeline(FollowTimelineTest.reader, 100)
+        self.assertEqual(feed.pulled_ids, [])
+        self.assertEqual(
+            [post.pk for post in feed.page()], self.expected()
+        )
+
+    @mock.patch.object(
+        purge, 'submit_on_commit',
+        lambda func, *args, **kwargs: func(*args, **kwargs)
+    )
+    def test_purged_follower_brings_author_back_to_inboxes(self):
+        delete_user(FollowTimelineTest.fan)
+        Purger(pause=0).run()
+        feed = timeline.FollowTimeline(FollowTimelineTest.reader, 100)
+        self.assertEqual(feed.pulled_ids, [])
+        self.assertEqual(
+            [post.pk for post in feed.page()], self.expected()
+        )
+
+    def test_merge_matches_sql_order_both_ways(self):
+        feed = timeline.FollowTimeline(FollowTimelineTest.reader, 4)
+        self.assertEqual(feed.pulled_ids, [FollowTimelineTest.star.pk])
+        pages, page = self.collect(feed)
+        self.assertEqual(sum(pages, []), self.expected())
+        self.assertTrue(all(len(ids) == 4 for ids in pages[:-1]))
+
+        backwards = []
+        while page.has_previous():
+            page = feed.page(before=page.previous_cursor)
+            backwards.insert(0, [post.pk for post in page])
+        self.assertEqual(backwards, pages[:-1])
+
+    def test_rings_are_reused_and_reset_by_writes(self):
+        feed = timeline.FollowTimeline(FollowTimelineTest.reader, 2)
+        feed.page()
+        with self.assertNumQueries(2):
+            # FeedEntry и посты страницы, кольцо - из кэша
+            first = feed.page()
+        self.assertEqual([post.pk for post in first], self.expected()[:2])
+
+        post = Post.objects.create(
+            text='Новый', author=FollowTimelineTest.star
+        )
+        self.assertEqual(feed.page()[0], post)
+        delete_post(post)
+        self.assertNotEqual(feed.page()[0], post)
+
+    def test_follow_page_uses_cursor_for_pulled_authors(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertIsInstance(page_obj, CursorPage)
+        self.assertEqual(
+            [post.pk for post in page_obj], self.expected()[:10]
+        )
+        response = self.client.get(
+            reverse('posts:follow_index'), {'after': page_obj.next_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected()[10:20]
+        )
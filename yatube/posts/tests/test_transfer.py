@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import AuthorStats, Comment, FeedEntry, Follow, Group, Post
+from ..search import SearchPaginator
+from ..transfer import Importer
+
+User = get_user_model()
+
+
+class ContentTransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='transfer-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост про пироги {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(7)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'content.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def export(self):
+        call_command('export_content', self.path, chunk_size=3,
+                     stderr=StringIO())
+        with open(self.path, encoding='utf-8') as lines:
+            return lines.readlines()
+
+    def wipe(self):
+        Follow.objects.all().delete()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        FeedEntry.objects.all().delete()
+        AuthorStats.objects.all().delete()
+
+    def import_(self, **options):
+        out = StringIO()
+        call_command('import_content', self.path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_export_streams_all_models_in_order(self):
+        lines = self.export()
+        models = [json.loads(line)['model'] for line in lines]
+        self.assertEqual(
+            models, ['group'] + ['post'] * 7 + ['comment', 'follow']
+        )
+        post = json.loads(lines[1])['fields']
+        self.assertEqual(post['id'], self.posts[0].pk)
+        self.assertEqual(post['author'], 'writer')
+        self.assertEqual(post['group'], None)
+        self.assertEqual(
+            [json.loads(line)['fields']['id'] for line in lines[1:8]],
+            [post.pk for post in self.posts]
+        )
+
+    def test_round_trip_rebuilds_derived_data(self):
+        self.export()
+        dates = dict(Post.objects.values_list('pk', 'pub_date'))
+        self.wipe()
+        self.import_()
+        self.assertEqual(dict(Post.objects.values_list('pk', 'pub_date')),
+                         dates)
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 3)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk)
+                         .comments_count, 1)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 7
+        )
+        self.assertEqual(AuthorStats.objects.get(user=self.author)
+                         .posts_count, 7)
+        page = SearchPaginator(Post.objects.all(), 'пироги', 10).page()
+        self.assertEqual(len(page.object_list), 7)
+
+    def test_resume_from_checkpoint(self):
+        self.export()
+        self.wipe()
+        checkpoint = self.path + '.checkpoint'
+        with open(checkpoint, 'w') as output:
+            output.write('4')
+        self.import_(skip_rebuild=True)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)),
+            [post.pk for post in self.posts[3:]]
+        )
+        with open(checkpoint) as saved:
+            self.assertEqual(saved.read(), '10')
+
+        self.import_(skip_rebuild=True, restart=True)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(Group.objects.count(), 1)
+
+    def test_reimport_is_idempotent(self):
+        lines = self.export()
+        importer = Importer(batch_size=2)
+        importer.load(lines)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_skips_rows_of_unknown_users(self):
+        lines = self.export()
+        self.wipe()
+        self.reader.delete()
+        checkpoints = []
+        importer = Importer(batch_size=3)
+        last = importer.load(lines, checkpoint=checkpoints.append)
+        self.assertEqual(last, 10)
+        self.assertEqual(checkpoints, [1, 4, 7, 8, 9, 10])
+        self.assertEqual(importer.skipped, 2)
+        self.assertEqual(importer.loaded['post'], 7)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -214,3 +215,23 @@ class PostViewTest(TestCase):
             response.context['page_obj'][0].author.username,
             new_post.author.username
         )
+
+    def test_follow_is_idempotent(self):
+        """ Повторная подписка и отписка не меняют результат """
+        any_user = PostViewTest.any_user
+        url = reverse(
+            'posts:profile_follow',
+            kwargs={'username_follow': any_user.username}
+        )
+        self.authorized_client.get(url)
+        self.authorized_client.get(url)
+        self.assertEqual(any_user.following.count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=PostViewTest.user, author=any_user)
+        url = reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': any_user.username}
+        )
+        self.authorized_client.get(url)
+        self.authorized_client.get(url)
+        self.assertEqual(any_user.following.count(), 0)
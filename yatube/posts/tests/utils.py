@@ -0,0 +1,12 @@
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+
+def make_image(name='photo.jpg', size=(100, 100), mode='RGB',
+               image_format='JPEG', **params):
+    """Загружаемый файл с картинкой, закрашенной одним цветом."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format, **params)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
@@ -0,0 +1,160 @@
+"""Миниатюры картинок постов, подготовленные заранее.
+
+Шаблоны не вызывают генерацию sorl на пути запроса: они только ищут
+готовую миниатюру в хранилище ключей sorl и, пока ее нет, выводят
+заглушку. Миниатюры всех размеров строит фоновый поток после сохранения
+поста; одновременную генерацию для одной картинки отсекает блокировка
+в общем кэше. Построив миниатюры, задача сбрасывает кэш страниц с этой
+картинкой: в закэшированных копиях еще стоит заглушка.
+"""
+import hashlib
+import logging
+
+from django.core.cache import cache
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.tasks import submit_on_commit
+
+from .cache import (FEED_SCOPE, bump_generations, group_scope, post_scope,
+                    profile_scope)
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Все размеры, которые выводят шаблоны: псевдоним -> (геометрия, опции)
+THUMBNAIL_ALIASES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('960x339', {'upscale': True}),
+}
+
+LOCK_TIMEOUT = 60
+
+
+def _thumbnail_file(source, alias):
+    """ImageFile миниатюры с тем же именем, что выберет sorl."""
+    geometry, options = THUMBNAIL_ALIASES[alias]
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def cached_thumbnail(image, alias):
+    """Готовая миниатюра или None, если ее еще не построили."""
+    if not image:
+        return None
+    return default.kvstore.get(_thumbnail_file(ImageFile(image), alias))
+
+
+def cached_thumbnails(names, alias):
+    """cached_thumbnail для картинок страницы: имя -> миниатюра или None.
+
+    С хранилищем ключей cached_db (по умолчанию) - одно чтение кэша и
+    не больше одного запроса к БД вместо пары на каждую картинку.
+    """
+    files = {
+        name: _thumbnail_file(ImageFile(name), alias) for name in set(names)
+    }
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {name: kvstore.get(file) for name, file in files.items()}
+    keys = {add_prefix(file.key): name for name, file in files.items()}
+    found = kvstore.cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        # Как KVStore._get_raw: отсутствие тоже кэшируется
+        loaded = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            loaded, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        found.update(loaded)
+    return {
+        name: None if found[key] == EMPTY_VALUE or not found[key]
+        else deserialize_image_file(found[key])
+        for key, name in keys.items()
+    }
+
+
+def _lock_key(name):
+    return 'posts:thumbnail-lock:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def generate_thumbnails(name):
+    """Строит миниатюры всех размеров для картинки name.
+
+    Пока одна задача строит миниатюры картинки, остальные выходят сразу.
+    """
+    lock = _lock_key(name)
+    if not cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+        return
+    if not default.storage.exists(name):
+        # Блокировку не снимаем: повторим не раньше, чем через LOCK_TIMEOUT
+        logger.warning('Нет исходной картинки %s', name)
+        return
+    try:
+        for alias, (geometry, options) in THUMBNAIL_ALIASES.items():
+            get_thumbnail(name, geometry, **options)
+    finally:
+        cache.delete(lock)
+    refresh_pages(name)
+
+
+def refresh_pages(name):
+    """Сбрасывает кэш страниц с постами, у которых картинка name."""
+    scopes = set()
+    for post_id, username, slug in Post.objects.filter(
+        image=name
+    ).values_list('pk', 'author__username', 'group__slug'):
+        scopes.update((FEED_SCOPE, post_scope(post_id),
+                       profile_scope(username)))
+        if slug is not None:
+            scopes.add(group_scope(slug))
+    if scopes:
+        bump_generations(*scopes)
+
+
+def schedule_thumbnails(image):
+    """Ставит генерацию миниатюр после коммита текущей транзакции."""
+    if image:
+        submit_on_commit(generate_thumbnails, image.name)
+
+
+def ensure_thumbnail(image, alias):
+    """Миниатюра для шаблона: готовая или None с постановкой генерации."""
+    thumbnail = cached_thumbnail(image, alias)
+    if thumbnail is None and image:
+        # Картинки, загруженные до появления фоновой генерации
+        if not cache.get(_lock_key(image.name)):
+            submit_on_commit(generate_thumbnails, image.name)
+    return thumbnail
+
+
+def ensure_thumbnails(names, alias):
+    """ensure_thumbnail для картинок страницы: имя -> миниатюра или None."""
+    thumbnails = cached_thumbnails(names, alias)
+    locks = cache.get_many([
+        _lock_key(name) for name, thumbnail in thumbnails.items()
+        if thumbnail is None
+    ])
+    for name, thumbnail in thumbnails.items():
+        if thumbnail is None and _lock_key(name) not in locks:
+            submit_on_commit(generate_thumbnails, name)
+    return thumbnails
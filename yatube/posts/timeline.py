@@ -0,0 +1,190 @@
+"""Лента подписок для тех, кто подписан на популярных авторов.
+
+Посты обычных авторов раскладываются по лентам подписчиков при записи
+(posts.inbox). Для авторов, у которых больше FEED_FANOUT_LIMIT
+подписчиков, это слишком дорого: их посты в FeedEntry не пишутся, а для
+каждого такого автора в общем кэше лежит кольцо - последние
+FEED_AUTHOR_RING_SIZE пар (pub_date, id) его постов.
+
+Страница ленты собирается слиянием (heapq.merge) нескольких уже
+упорядоченных источников: записей FeedEntry пользователя и колец
+популярных авторов, на которых он подписан. Каждый источник отдает не
+больше per_page + 1 записей после курсора; к SQL по постам автора
+обращаемся, только если его кольцо кончилось раньше. Поэтому цена
+страницы не зависит ни от числа подписок, ни от глубины ленты.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.db import replicas
+
+from .inbox import pulled_author_ids
+from .models import FeedEntry, Post
+from .paginators import (AFTER_PARAM, BEFORE_PARAM, CursorPage,
+                         InvalidCursor, decode_cursor, encode_cursor)
+
+FEED_AUTHOR_RING_SIZE = getattr(settings, 'FEED_AUTHOR_RING_SIZE', 200)
+RING_TIMEOUT = 60 * 60 * 24
+
+
+def _ring_key(author_id):
+    return f'posts:ring:{author_id}'
+
+
+def forget_ring(author_id):
+    """Сбрасывает кольцо автора: его соберут заново при чтении."""
+    cache.delete(_ring_key(author_id))
+
+
+def get_rings(author_ids):
+    """Кольца авторов: author_id -> (полное ли, [(pub_date, id), ...]).
+
+    Записи идут от новых к старым. Полное кольцо содержит все посты
+    автора; в неполном старше последней записи могут быть еще посты.
+    """
+    keys = {_ring_key(author_id): author_id for author_id in author_ids}
+    found = cache.get_many(list(keys))
+    rings = {keys[key]: ring for key, ring in found.items()}
+    missing, size = {}, FEED_AUTHOR_RING_SIZE
+    for key, author_id in keys.items():
+        if author_id in rings:
+            continue
+        entries = list(
+            Post.objects.filter(author_id=author_id).values_list(
+                'pub_date', 'id'
+            )[:size + 1]
+        )
+        rings[author_id] = missing[key] = (
+            len(entries) <= size, entries[:size]
+        )
+    if missing:
+        # Кольцо, прочитанное с отставшей реплики, живет недолго
+        cache.set_many(
+            missing, timeout=replicas.cache_timeout(RING_TIMEOUT)
+        )
+    return rings
+
+
+def _seek(date_field, id_field, values, forward):
+    """Условие "строго после values" при обходе от новых к старым."""
+    lookup = 'lt' if forward else 'gt'
+    pub_date, pk = values
+    return (
+        Q(**{f'{date_field}__{lookup}': pub_date})
+        | Q(**{date_field: pub_date, f'{id_field}__{lookup}': pk})
+    )
+
+
+def _after(entries, values, forward):
+    """Записи кольца после values в направлении обхода."""
+    if values is None:
+        return list(entries)
+    values = tuple(values)
+    if forward:
+        return [entry for entry in entries if entry < values]
+    return [entry for entry in reversed(entries) if entry > values]
+
+
+class FollowTimeline:
+    """Лента подписок user: FeedEntry и кольца популярных авторов."""
+
+    def __init__(self, user, per_page):
+        self.user = user
+        self.per_page = int(per_page)
+        self.pulled_ids = pulled_author_ids(user.pk)
+
+    def _inbox(self, values, forward, need):
+        entries = FeedEntry.objects.filter(
+            user=self.user, post__deleted_at=None
+        )
+        if values is not None:
+            entries = entries.filter(
+                _seek('pub_date', 'post_id', values, forward)
+            )
+        order = (
+            ('-pub_date', '-post_id') if forward else ('pub_date', 'post_id')
+        )
+        return list(
+            entries.order_by(*order).values_list('pub_date', 'post_id')[
+                :need
+            ]
+        )
+
+    def _author(self, author_id, ring, values, forward, need):
+        complete, entries = ring
+        found = _after(entries, values, forward)
+        # Кольцо - непрерывный отрезок самых новых постов автора. Вперед
+        # его хватает, пока после курсора есть need записей, назад -
+        # пока курсор не старше самой старой записи кольца.
+        if forward:
+            enough = len(found) >= need
+        else:
+            enough = bool(entries) and tuple(values) >= entries[-1]
+        if complete or enough:
+            return found[:need]
+        posts = Post.objects.filter(author_id=author_id)
+        if values is not None:
+            posts = posts.filter(_seek('pub_date', 'id', values, forward))
+        order = ('-pub_date', '-id') if forward else ('pub_date', 'id')
+        return list(
+            posts.order_by(*order).values_list('pub_date', 'id')[:need]
+        )
+
+    def _entries(self, values, forward, need):
+        """Следующие need записей (pub_date, id) без повторов."""
+        sources = [self._inbox(values, forward, need)]
+        for author_id, ring in get_rings(self.pulled_ids).items():
+            sources.append(
+                self._author(author_id, ring, values, forward, need)
+            )
+        entries, seen = [], set()
+        for entry in heapq.merge(*sources, reverse=forward):
+            # Пост автора, ставшего популярным, может быть и в FeedEntry
+            if entry[1] in seen:
+                continue
+            seen.add(entry[1])
+            entries.append(entry)
+            if len(entries) == need:
+                break
+        return entries
+
+    def page(self, after=None, before=None):
+        """Страница после токена after или до before (как CursorPaginator)."""
+        forward = before is None
+        token = after if forward else before
+        values = None
+        if token:
+            try:
+                values = decode_cursor(token, ('pub_date', 'id'))
+            except InvalidCursor:
+                token, forward = None, True
+        entries = self._entries(values, forward, self.per_page + 1)
+        has_more = len(entries) > self.per_page
+        entries = entries[:self.per_page]
+        if not forward:
+            entries.reverse()
+        if not entries:
+            return CursorPage([], self, None, None)
+        posts = Post.objects.feed().in_bulk(
+            [post_id for _, post_id in entries]
+        )
+        object_list = [
+            posts[post_id] for _, post_id in entries if post_id in posts
+        ]
+        first, last = encode_cursor(entries[0]), encode_cursor(entries[-1])
+        if forward:
+            next_cursor = last if has_more else None
+            previous_cursor = first if token else None
+        else:
+            next_cursor = last
+            previous_cursor = first if has_more else None
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
+
+    def get_page(self, request):
+        return self.page(
+            after=request.GET.get(AFTER_PARAM),
+            before=request.GET.get(BEFORE_PARAM),
+        )
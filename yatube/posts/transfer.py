@@ -0,0 +1,193 @@
+"""Выгрузка и загрузка контента в JSONL.
+
+Одна строка - одна запись: {"model": "post", "fields": {...}}. Группы,
+посты, комментарии и подписки сохраняют свои id, пользователи
+указываются по username, поэтому файл можно загрузить в БД с другими
+id пользователей. Выгрузка читает таблицы кусками по первичному
+ключу, загрузка пишет bulk_create пачками в отдельных транзакциях и
+после каждой пачки запоминает номер строки в файле контрольной точки.
+Ленты подписок, счетчики и поисковый индекс пересобираются один раз
+в конце, а не на каждую строку.
+"""
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Порядок важен: записи ссылаются только на уже загруженные модели
+MODELS = {
+    'group': (Group, {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }),
+    'post': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group_id',
+        'image': 'image',
+        'image_width': 'image_width',
+        'image_height': 'image_height',
+    }),
+    'comment': (Comment, {
+        'id': 'id',
+        'text': 'text',
+        'created': 'created',
+        'post': 'post_id',
+        'author': 'author__username',
+    }),
+    'follow': (Follow, {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+
+# Комментарии удаленных постов ждут очистки (posts.purge)
+EXPORT_FILTERS = {
+    'comment': {'post__deleted_at': None},
+}
+
+USER_FIELDS = ('author', 'user')
+DATE_FIELDS = ('pub_date', 'created')
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add у полей, чтобы записать свои даты."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def _encode(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def export_rows(name, chunk_size=5000):
+    """Записи модели name по возрастанию id, кусками по chunk_size."""
+    model, fields = MODELS[name]
+    paths = list(fields.values())
+    queryset = model.objects.filter(**EXPORT_FILTERS.get(name, {}))
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values(
+                *paths
+            )[:chunk_size]
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield {
+                'model': name,
+                'fields': {
+                    field: _encode(row[path])
+                    for field, path in fields.items()
+                },
+            }
+        last_pk = rows[-1]['id']
+
+
+def export_lines(names, chunk_size=5000):
+    for name in names:
+        for record in export_rows(name, chunk_size):
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class Importer:
+    """Загружает строки JSONL пачками с контрольной точкой.
+
+    Повторная загрузка тех же строк безопасна: bulk_create пропускает
+    записи с уже занятыми id (ignore_conflicts).
+    """
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.loaded = {name: 0 for name in MODELS}
+        self.skipped = 0
+
+    def _build(self, name, batch):
+        model, _ = MODELS[name]
+        usernames = {
+            record[field] for record in batch for field in USER_FIELDS
+            if field in record
+        }
+        user_ids = dict(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'pk'))
+        objects = []
+        for record in batch:
+            values = dict(record)
+            missing = False
+            for field in USER_FIELDS:
+                if field in values:
+                    user_id = user_ids.get(values.pop(field))
+                    missing = missing or user_id is None
+                    values[field + '_id'] = user_id
+            if missing:
+                self.skipped += 1
+                continue
+            for field in DATE_FIELDS:
+                if field in values:
+                    values[field] = parse_datetime(values[field])
+            for field in ('group', 'post'):
+                if field in values:
+                    values[field + '_id'] = values.pop(field)
+            if model is Post:
+                values['image'] = values['image'] or ''
+            objects.append(model(**values))
+        return model, objects
+
+    def flush(self, name, batch):
+        model, objects = self._build(name, batch)
+        dates = [
+            field for field in model._meta.concrete_fields
+            if field.name in DATE_FIELDS
+        ]
+        with explicit_dates(*dates), transaction.atomic():
+            model.objects.bulk_create(
+                objects, batch_size=self.batch_size, ignore_conflicts=True
+            )
+        self.loaded[name] += len(objects)
+
+    def load(self, lines, start=0, checkpoint=None):
+        """Загружает lines, пропуская первые start строк.
+
+        checkpoint(number) вызывается после каждой записанной пачки с
+        номером последней загруженной строки.
+        """
+        name, batch, number = None, [], start
+        for number, line in enumerate(lines, 1):
+            if number <= start or not line.strip():
+                continue
+            record = json.loads(line)
+            if record['model'] not in MODELS:
+                raise ValueError(f'Строка {number}: неизвестная модель')
+            if batch and (record['model'] != name
+                          or len(batch) >= self.batch_size):
+                self.flush(name, batch)
+                if checkpoint is not None:
+                    checkpoint(number - 1)
+                batch = []
+            name = record['model']
+            batch.append(record['fields'])
+        if batch:
+            self.flush(name, batch)
+        if checkpoint is not None:
+            checkpoint(number)
+        return number
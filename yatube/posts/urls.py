@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
@@ -10,13 +10,27 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/delete/', views.post_delete, name='post_delete'),
     path('posts/<int:post_id>/', views.post_detail, name='posts'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('follow/', views.profile_index, name='follow_index'),
     path('profile/<str:username_follow>/follow/', views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
+    path('rss/', feeds.index_feed, {'feed_format': 'rss'}, name='index_rss'),
+    path('atom/', feeds.index_feed, {'feed_format': 'atom'},
+         name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_feed, {'feed_format': 'rss'},
+         name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_feed,
+         {'feed_format': 'atom'}, name='group_atom'),
+    path('profile/<str:username>/rss/', feeds.profile_feed,
+         {'feed_format': 'rss'}, name='profile_rss'),
+    path('profile/<str:username>/atom/', feeds.profile_feed,
+         {'feed_format': 'atom'}, name='profile_atom'),
 ]
@@ -1,24 +1,53 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from core.ratelimit import ratelimit
+
+from .cache import (FEED_SCOPE, PAGE_CACHE_TIMEOUT, cache_page_versioned,
+                    condition_versioned, group_scope, post_author_scope,
+                    post_scope, profile_scope)
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Comment, Follow, Group, Post, User
+from .paginators import (CursorPaginator, NumberedPaginator,
+                         is_cursor_request)
+from .purge import delete_post
+from .search import SearchPaginator
+from .stats import stats_for
+from .timeline import FollowTimeline
 
 DISPLAY_POST = 10
+FEED_ORDERING = ('pub_date', 'id')
+DISPLAY_COMMENTS = 20
+COMMENT_ORDERING = ('created', 'id')
+INBOX_ORDERING = {
+    'inbox_date': F('feed_entries__pub_date'),
+    'inbox_post': F('feed_entries__post'),
+}
+
 
+def get_page_objects(request, page_objects, display_post,
+                     ordering=FEED_ORDERING):
+    """Страница ленты: по номеру (?page=) или по курсору (?after=/?before=).
 
-def get_page_objects(request, page_objects, display_post):
-    paginator = Paginator(page_objects, display_post)
+    Курсорный режим не считает COUNT(*) и не использует OFFSET, поэтому
+    глубокие страницы стоят столько же, сколько первая. Страница по
+    номеру получает next_cursor: "Следующая" ведет уже в курсорный режим.
+    """
+    cursor_paginator = CursorPaginator(page_objects, display_post, ordering)
+    if is_cursor_request(request):
+        return cursor_paginator.get_page(request)
+    paginator = NumberedPaginator(page_objects, cursor_paginator)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(3)
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, FEED_SCOPE)
 def index(request):
-    posts = Post.objects.all()
+    posts = Post.objects.feed()
     page_obj = get_page_objects(request, posts, DISPLAY_POST)
     context = {
         'page_obj': page_obj,
@@ -26,9 +55,10 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, group_scope('{slug}'))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.feed()
     page_obj = get_page_objects(request, posts, DISPLAY_POST)
     context = {
         'page_obj': page_obj,
@@ -37,9 +67,12 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, profile_scope('{username}'))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    all_user_posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    all_user_posts = author.posts.feed()
     page_obj = get_page_objects(request, all_user_posts, DISPLAY_POST)
     following = (request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
@@ -49,20 +82,82 @@ def profile(request, username):
     context = {
         'page_obj': page_obj,
         'author': author,
+        'stats': stats_for(author),
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, post_scope('{post_id}'), post_author_scope
+)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.detail(), pk=post_id)
     form = CommentForm()
-    comments = post.comments.select_related('author').all()
-    context = {'post': post, 'form': form, 'comments': comments}
+    comments_page = get_comments_page(post.pk)
+    context = {
+        'post': post,
+        'form': form,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
+        'author_stats': stats_for(post.author),
+    }
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_page(post_id, after=None):
+    """Комментарии поста от старых к новым, по ключу (created, id)."""
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        DISPLAY_COMMENTS, COMMENT_ORDERING, descending=False,
+    ).page(after=after)
+
+
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, post_scope('{post_id}'), post_author_scope
+)
+def post_comments(request, post_id):
+    """Фрагмент HTML со следующей страницей комментариев."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments_page = get_comments_page(post.pk, request.GET.get('after'))
+    context = {
+        'post': post,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid() and form.cleaned_data['q']:
+        data = form.cleaned_data
+        group, author_id = data['group'], None
+        if data['author']:
+            author_id = User.objects.filter(
+                username=data['author']
+            ).values_list('pk', flat=True).first() or 0
+        page_obj = SearchPaginator(
+            Post.objects.feed(), data['q'], DISPLAY_POST,
+            group_id=group.pk if group else None, author_id=author_id,
+        ).get_page(request)
+    # Параметры поиска для ссылок на соседние страницы
+    query = QueryDict(mutable=True)
+    query.update({
+        key: value for key, value in request.GET.items()
+        if key in form.fields and value
+    })
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_query': query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@ratelimit('5/m')
 def post_create(request):
     template = 'posts/create_post.html'
     if request.method == 'POST':
@@ -106,12 +201,13 @@ def post_edit(request, post_id):
 def post_delete(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author.username == request.user.username:
-        post.delete()
+        delete_post(post)
         return redirect('posts:index')
     return redirect('posts:posts', post_id)
 
 
 @login_required
+@ratelimit('10/m')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -124,9 +220,18 @@ def add_comment(request, post_id):
 
 
 @login_required
+@condition_versioned(FEED_SCOPE, profile_scope('{request.user.username}'))
 def profile_index(request):
-    all_posts_subs = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_objects(request, all_posts_subs, DISPLAY_POST)
+    # С подписками на популярных авторов лента собирается слиянием
+    # FeedEntry и колец авторов, только по курсору
+    timeline = FollowTimeline(request.user, DISPLAY_POST)
+    if timeline.pulled_ids or is_cursor_request(request):
+        page_obj = timeline.get_page(request)
+    else:
+        page_obj = get_page_objects(
+            request, Post.objects.feed().inbox(request.user), DISPLAY_POST,
+            INBOX_ORDERING
+        )
     context = {
         'page_obj': page_obj
     }
@@ -134,30 +239,30 @@ def profile_index(request):
 
 
 @login_required
+@ratelimit('30/m', methods=None)
 def profile_follow(request, username_follow):
     user = request.user
     author = get_object_or_404(User, username=username_follow)
-    if not Follow.objects.filter(
-        user=user,
-        author=author
-    ).exists() and user != author:
-        Follow.objects.create(
-            user=user,
-            author=author
-        )
+    if user != author:
+        # Один INSERT: повторную подписку отсекает ограничение unique_follow
+        try:
+            with transaction.atomic():
+                Follow.objects.create(
+                    user=user,
+                    author=author
+                )
+        except IntegrityError:
+            pass
     return redirect('posts:profile', username_follow)
 
 
 @login_required
+@ratelimit('30/m', methods=None)
 def profile_unfollow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(
-            user=user,
-            author=author
-    ).exists():
-        Follow.objects.get(
-            user=user,
-            author=author
-        ).delete()
+    Follow.objects.filter(
+        user=user,
+        author=author
+    ).delete()
     return redirect('posts:profile', username)
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts.admin import TombstoneAdminMixin
+from posts.purge import delete_user
+
+User = get_user_model()
+
+
+class TombstoneUserAdmin(TombstoneAdminMixin, UserAdmin):
+    def delete_model(self, request, obj):
+        delete_user(obj)
+
+
+admin.site.unregister(User)
+admin.site.register(User, TombstoneUserAdmin)
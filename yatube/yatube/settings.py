@@ -10,11 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Запуск тестов: manage.py test или pytest
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -48,16 +55,23 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'benchmarks.apps.BenchmarksConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.MediaFilesMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -71,7 +85,7 @@ INTERNAL_IPS = [
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,13 +106,35 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# WAL, mmap и очередь писателей: core.db.backends.sqlite3
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'WRITE_TIMEOUT': 10,
+        },
     }
 }
 
+# Реплики для чтения (core.db): копии файла default, которые обновляет
+# SQLite backup API не чаще раза в REPLICA_SYNC_INTERVAL секунд после
+# записи и команда sync_replicas. Отставшая реплика читается, но
+# собранное по ней кэшируется не дольше REPLICA_SYNC_INTERVAL секунд;
+# записи в REPLICA_IGNORED_TABLES (по умолчанию сессии и хранилище sorl)
+# и last_login не делают реплики отставшими. Бенчмарк: bench_replicas.
+# Например:
+# DATABASES['replica'] = {
+#     'ENGINE': 'core.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'db-replica.sqlite3'),
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_SYNC_INTERVAL = 5
+# Сколько секунд после записи браузер читает только с основной БД
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -138,10 +174,37 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# collectstatic дает файлам имена с хешем содержимого и пишет рядом .gz
+# (и .br, если установлен brotli); отдает их
+# core.middleware.StaticFilesMiddleware: имена с хешем - с кэшем на год,
+# остальные - на STATIC_MAX_AGE секунд
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = 60
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# core.middleware.MediaFilesMiddleware: файлы кэшируются на MEDIA_MAX_AGE
+# секунд и потом сверяются по ETag. MEDIA_SENDFILE =
+# 'x-accel-redirect' (nginx, внутренний location MEDIA_ACCEL_PREFIX) или
+# 'x-sendfile' отдает байты файла прокси
+MEDIA_MAX_AGE = 60 * 60
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Загрузки пишутся во временный файл, а не держатся в памяти процесса
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Прием картинок постов (posts.images)
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40000000
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_QUALITY = 85
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -150,8 +213,77 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Общий кэш всех воркеров узла в файле SQLite (core.cache_backends)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+if TESTING:
+    # Тесты не должны читать и очищать кэш работающего сервера
+    _TEST_CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, _TEST_CACHE_DIR, True)
+    CACHES['default']['LOCATION'] = os.path.join(
+        _TEST_CACHE_DIR, 'default.sqlite3'
+    )
+
+# Сколько последних постов хранить в ленте подписок каждого пользователя
+FEED_INBOX_SIZE = 1000
+
+# Посты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT, не
+# раскладываются по лентам: лента читает их из кольца последних
+# FEED_AUTHOR_RING_SIZE постов автора в кэше (posts.timeline)
+FEED_FANOUT_LIMIT = 1000
+FEED_AUTHOR_RING_SIZE = 200
+
+# Сколько последних постов в лентах RSS и Atom (posts.feeds)
+FEED_ITEMS = 20
+
+# Время жизни кэшированных страниц: сбрасываются они сигналами при записи
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Пул потоков для фоновых задач (core.tasks): миниатюры, очистка
+BACKGROUND_WORKERS = 2
+
+# Замеры запросов (core.middleware.RequestMetricsMiddleware): доля
+# замеряемых запросов и заголовок Server-Timing в их ответах
+REQUEST_METRICS_SAMPLE_RATE = 0.01
+REQUEST_METRICS_SERVER_TIMING = True
+
+# Ограничения частоты запросов к вьюхам users (core.ratelimit):
+# имя вьюхи (view_name) -> [(правило, по пользователю или IP, методы)].
+# Вьюхи posts ограничены декоратором ratelimit.
+RATE_LIMITS = {
+    'auth:login': [('10/m', 'ip', ['POST'])],
+    'auth:signup': [('5/h', 'ip', ['POST'])],
+    'auth:password_reset_form': [('5/h', 'ip', ['POST'])],
+}
+# Адреса своих обратных прокси: для запросов с них адрес клиента для
+# ограничений берется из RATE_LIMIT_PROXY_HEADER (X-Forwarded-For)
+RATE_LIMIT_TRUSTED_PROXIES = []
+RATE_LIMIT_PROXY_HEADER = 'HTTP_X_FORWARDED_FOR'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'null': {
+            'class': 'logging.NullHandler',
+        },
+    },
+    'loggers': {
+        # В тестах строка замеров на каждый запрос только засоряет вывод
+        'core.metrics': {
+            'handlers': ['null' if TESTING else 'console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны разбираются при старте процесса, а не первыми запросами
+from core.template_backends import warm_up  # noqa: E402
+
+warm_up()